@@ -0,0 +1,50 @@
+import os
+import asyncio
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import httpx
+
+# Per-stage concurrency limits (per worker process)
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", 32))
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", 16))
+SEARCH_CONCURRENCY = int(os.getenv("SEARCH_CONCURRENCY", 4))
+
+# Threads for CPU-bound work (encoding, search, HTML parsing)
+EXECUTOR_WORKERS = int(os.getenv("EXECUTOR_WORKERS", max(SEARCH_CONCURRENCY, os.cpu_count() or 1)))
+
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", 10))
+
+LLM_SLOTS = asyncio.Semaphore(LLM_CONCURRENCY)
+FETCH_SLOTS = asyncio.Semaphore(FETCH_CONCURRENCY)
+SEARCH_SLOTS = asyncio.Semaphore(SEARCH_CONCURRENCY)
+
+_executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix="rag-cpu")
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking / CPU-bound call in the bounded executor without stalling the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, partial(fn, *args, **kwargs))
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared keep-alive HTTP client for outbound page fetches"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT_SECONDS,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=FETCH_CONCURRENCY, max_keepalive_connections=FETCH_CONCURRENCY)
+        )
+    return _http_client
+
+
+async def aclose_http_client():
+    """Close the shared HTTP client (FastAPI shutdown)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
@@ -0,0 +1,272 @@
+import os
+import re
+import json
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from rag_core import (
+    get_gemini_model,
+    analyze_query_focus,
+    analyze_query_focus_async,
+    finalize_query_analysis,
+    local_query_analyses,
+    parse_duration_max,
+    is_confident,
+    search_assessments_batch
+)
+from query_analyzer import merge_parsed_constraints
+from gemini_client import generate_text, agenerate_text
+from rate_limiter import estimate_tokens
+from retrieval_engine import RetrievalEngine
+from async_pipeline import SEARCH_SLOTS, run_blocking
+
+# Bump when the prompt template changes so cached responses are not reused
+QUERY_FOCUS_BATCH_PROMPT_VERSION = "query_focus_batch/v1"
+
+# Prompt + expected output tokens allowed per batched call
+ANALYSIS_BATCH_TOKEN_BUDGET = int(os.getenv("ANALYSIS_BATCH_TOKEN_BUDGET", 8000))
+ANALYSIS_BATCH_MAX_QUERIES = int(os.getenv("ANALYSIS_BATCH_MAX_QUERIES", 25))
+# Rough size of one JSON analysis object in the response
+OUTPUT_TOKENS_PER_QUERY = 120
+
+FOCUS_VALUES = ['TECHNICAL', 'BEHAVIORAL', 'BALANCED']
+SPECIFICITY_VALUES = ['HIGHLY_SPECIFIC', 'MODERATE', 'BROAD']
+
+BATCH_PROMPT_HEADER = """
+Analyze each hiring query below and determine its PRIMARY focus.
+
+For every query decide:
+1. primary_focus: TECHNICAL (programming, tools, specific technical knowledge),
+   BEHAVIORAL (personality, culture fit, leadership, communication) or BALANCED
+2. specificity: HIGHLY_SPECIFIC (exact technologies, tools or very specific traits),
+   MODERATE (general role requirements) or BROAD (general role title only)
+3. technical_skills: comma-separated technical skills, or "None" if behavioral focus
+4. soft_skills: comma-separated soft skills, or "None" if technical focus
+5. job_level: Entry/Junior/Mid-level/Senior/Executive/Manager, or null if not specified
+6. duration_max: maximum assessment length in minutes as a number, or null if not specified
+
+Return ONLY a JSON array with one object per query, in the same order:
+[{"index": 0, "primary_focus": "...", "specificity": "...", "technical_skills": "...",
+  "soft_skills": "...", "job_level": null, "duration_max": null}, ...]
+
+Queries:
+"""
+
+
+def build_batch_prompt(queries: List[str]) -> str:
+    lines = [f"{i}. {json.dumps(query)}" for i, query in enumerate(queries)]
+    return BATCH_PROMPT_HEADER + "\n".join(lines) + "\n"
+
+
+def plan_batches(queries: List[str]) -> List[List[int]]:
+    """Group query indices so each prompt + response stays inside the token budget"""
+    header_tokens = estimate_tokens(BATCH_PROMPT_HEADER)
+    batches = []
+    current = []
+    used = header_tokens
+
+    for i, query in enumerate(queries):
+        cost = estimate_tokens(query) + OUTPUT_TOKENS_PER_QUERY
+        if current and (used + cost > ANALYSIS_BATCH_TOKEN_BUDGET or len(current) >= ANALYSIS_BATCH_MAX_QUERIES):
+            batches.append(current)
+            current = []
+            used = header_tokens
+        current.append(i)
+        used += cost
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def skills_text(value) -> str:
+    if isinstance(value, list):
+        return ", ".join(str(v).strip() for v in value if str(v).strip())
+    return str(value).strip() if value is not None else ''
+
+
+def analysis_from_item(query: str, item: Dict) -> Optional[Dict]:
+    """Convert one JSON object into the analyze_query_focus dict shape (None if unusable)"""
+    focus = str(item.get('primary_focus', '')).strip().upper()
+    specificity = str(item.get('specificity', '')).strip().upper()
+    if focus not in FOCUS_VALUES or specificity not in SPECIFICITY_VALUES:
+        return None
+
+    job_level = item.get('job_level')
+    if job_level is not None:
+        job_level = str(job_level).strip()
+        if not job_level or job_level.lower() in ('not specified', 'null', 'none'):
+            job_level = None
+
+    analysis = {
+        'primary_focus': focus,
+        'specificity': specificity,
+        'technical_skills': skills_text(item.get('technical_skills')),
+        'soft_skills': skills_text(item.get('soft_skills')),
+        'job_level': job_level,
+        'duration_max': parse_duration_max(item.get('duration_max')),
+        'analysis_source': 'gemini'
+    }
+    return finalize_query_analysis(query, analysis)
+
+
+def parse_batch_response(queries: List[str], response_text: str) -> Dict[int, Dict]:
+    """Map batch-local index -> analysis for every well-formed item"""
+    text = response_text.replace("```json", "").replace("```", "")
+    match = re.search(r"\[.*\]", text, re.DOTALL)
+    if not match:
+        return {}
+
+    try:
+        items = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(items, list):
+        return {}
+
+    parsed = {}
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        try:
+            index = int(item.get('index', position))
+        except (TypeError, ValueError):
+            continue
+        if 0 <= index < len(queries) and index not in parsed:
+            analysis = analysis_from_item(queries[index], item)
+            if analysis is not None:
+                parsed[index] = analysis
+    return parsed
+
+
+def local_first(queries: List[str], local: List[Optional[Dict]]) -> Tuple[List[Optional[Dict]], List[int]]:
+    """Keep confident local analyses; return them with the indices that still need Gemini"""
+    results = [
+        finalize_query_analysis(query, analysis) if is_confident(analysis) else None
+        for query, analysis in zip(queries, local)
+    ]
+    pending = [i for i, analysis in enumerate(results) if analysis is None]
+    if len(pending) < len(queries):
+        print(f"Batch analysis: {len(queries) - len(pending)} of {len(queries)} answered locally")
+    return results, pending
+
+
+def with_constraints(analysis: Optional[Dict], local: Optional[Dict]) -> Optional[Dict]:
+    if analysis is None or local is None:
+        return analysis
+    return merge_parsed_constraints(analysis, local)
+
+
+def analyze_queries_batch(queries: List[str], engine: Optional[RetrievalEngine] = None) -> List[Dict]:
+    """
+    Analyze many queries with one Gemini call per batch.
+    Queries the local analyzer is confident about never reach Gemini;
+    items missing or malformed in a batch response are retried one by one.
+    """
+    model = get_gemini_model()
+    local = local_query_analyses(queries, engine)
+    results, pending = local_first(queries, local)
+
+    for batch in plan_batches([queries[i] for i in pending]):
+        batch = [pending[i] for i in batch]
+        batch_queries = [queries[i] for i in batch]
+        try:
+            response_text = generate_text(
+                model, build_batch_prompt(batch_queries), QUERY_FOCUS_BATCH_PROMPT_VERSION,
+                cache_input="\n".join(batch_queries)
+            )
+            parsed = parse_batch_response(batch_queries, response_text)
+        except Exception as e:
+            print(f"Error calling Gemini API for batch of {len(batch)}: {e}")
+            parsed = {}
+
+        for local_index, query_index in enumerate(batch):
+            results[query_index] = with_constraints(parsed.get(local_index), local[query_index])
+
+    failed = [i for i, analysis in enumerate(results) if analysis is None]
+    if failed:
+        print(f"Batch analysis: falling back to single-query calls for {len(failed)} of {len(queries)}")
+    for i in failed:
+        results[i] = analyze_query_focus(queries[i], engine)
+
+    return results
+
+
+async def analyze_queries_batch_async(queries: List[str],
+                                      engine: Optional[RetrievalEngine] = None) -> List[Dict]:
+    """Async variant of analyze_queries_batch; batches are sent concurrently"""
+    model = get_gemini_model()
+    local = await run_blocking(local_query_analyses, queries, engine)
+    results, pending = local_first(queries, local)
+
+    async def run_batch(batch: List[int]):
+        batch = [pending[i] for i in batch]
+        batch_queries = [queries[i] for i in batch]
+        try:
+            response_text = await agenerate_text(
+                model, build_batch_prompt(batch_queries), QUERY_FOCUS_BATCH_PROMPT_VERSION,
+                cache_input="\n".join(batch_queries)
+            )
+            parsed = parse_batch_response(batch_queries, response_text)
+        except Exception as e:
+            print(f"Error calling Gemini API for batch of {len(batch)}: {e}")
+            parsed = {}
+
+        for local_index, query_index in enumerate(batch):
+            results[query_index] = with_constraints(parsed.get(local_index), local[query_index])
+
+    await asyncio.gather(*(run_batch(batch) for batch in plan_batches([queries[i] for i in pending])))
+
+    failed = [i for i, analysis in enumerate(results) if analysis is None]
+    if failed:
+        print(f"Batch analysis: falling back to single-query calls for {len(failed)} of {len(queries)}")
+        fallbacks = await asyncio.gather(*(analyze_query_focus_async(queries[i], engine) for i in failed))
+        for i, analysis in zip(failed, fallbacks):
+            results[i] = analysis
+
+    return results
+
+
+def build_batch_responses(queries: List[str],
+                          analyses: List[Dict],
+                          search_results: List) -> List[Dict]:
+    """Wrap per-query search results in the get_recommendations response shape"""
+    responses = []
+    for query, query_analysis, (assessments, distribution) in zip(queries, analyses, search_results):
+        responses.append({
+            'original_query': query,
+            'query_analysis': query_analysis,
+            'recommendations': assessments,
+            'distribution': distribution,
+            'status': 'success'
+        })
+    return responses
+
+
+def get_recommendations_batch(queries: List[str],
+                              engine: Optional[RetrievalEngine] = None,
+                              analyses: Optional[List[Dict]] = None) -> List[Dict]:
+    """
+    get_recommendations for many queries: batched LLM analysis,
+    one encoder call and one batched search for the whole list.
+    """
+    try:
+        analyses = analyses or analyze_queries_batch(queries, engine)
+        search_results = search_assessments_batch(analyses, min_total=5, max_total=10, engine=engine)
+        return build_batch_responses(queries, analyses, search_results)
+    except Exception as e:
+        return [{'status': 'error', 'error_message': str(e), 'original_query': query} for query in queries]
+
+
+async def get_recommendations_batch_async(queries: List[str],
+                                          engine: Optional[RetrievalEngine] = None) -> List[Dict]:
+    """Non-blocking variant of get_recommendations_batch for the API"""
+    try:
+        analyses = await analyze_queries_batch_async(queries, engine)
+        async with SEARCH_SLOTS:
+            search_results = await run_blocking(
+                search_assessments_batch, analyses, min_total=5, max_total=10, engine=engine
+            )
+        return build_batch_responses(queries, analyses, search_results)
+    except Exception as e:
+        return [{'status': 'error', 'error_message': str(e), 'original_query': query} for query in queries]
@@ -0,0 +1,112 @@
+"""
+Parity and latency check: quantized ONNX encoder vs the PyTorch reference.
+
+    python benchmark_encoders.py
+
+Embeds every catalog text with both encoders and fails (exit code 1) if any
+pair falls below PARITY_MIN_COSINE, or if too many queries change their
+top-10 catalog neighbours. Then times single-query encoding, which is what
+the API does per request.
+"""
+import os
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from encoders import OnnxEncoder, SentenceTransformerEncoder
+from embedding_artifact import ARTIFACT_DIR, load_artifact
+
+EMBEDDING_MODEL = "BAAI/bge-base-en-v1.5"
+PARITY_MIN_COSINE = float(os.getenv("PARITY_MIN_COSINE", 0.98))
+PARITY_MIN_TOPK_OVERLAP = float(os.getenv("PARITY_MIN_TOPK_OVERLAP", 0.9))
+TOP_K = 10
+BATCH_SIZE = 32
+LATENCY_RUNS = 50
+
+SAMPLE_QUERIES = [
+    "Java developer who can collaborate with business teams, 40 minutes",
+    "Entry level sales associate with strong communication skills",
+    "Senior data analyst: SQL, Python, Excel and stakeholder management",
+    "Personality test for a team lead role",
+    "Numerical reasoning assessment under 30 minutes",
+]
+
+
+def encode_all(encoder, texts: List[str]) -> np.ndarray:
+    return np.vstack([encoder.encode(texts[i:i + BATCH_SIZE]) for i in range(0, len(texts), BATCH_SIZE)])
+
+
+def check_parity(reference: np.ndarray, candidate: np.ndarray, catalog: np.ndarray) -> Dict:
+    cosines = np.sum(reference * candidate, axis=1)
+
+    ref_top = np.argsort(-(reference @ catalog.T), axis=1)[:, :TOP_K]
+    cand_top = np.argsort(-(candidate @ catalog.T), axis=1)[:, :TOP_K]
+    overlap = np.array([len(set(a) & set(b)) / TOP_K for a, b in zip(ref_top, cand_top)])
+
+    return {
+        'min_cosine': float(cosines.min()),
+        'mean_cosine': float(cosines.mean()),
+        'mean_topk_overlap': float(overlap.mean()),
+        'worst_index': int(cosines.argmin())
+    }
+
+
+def time_queries(encoder, queries: List[str]) -> Dict:
+    encoder.encode(queries[:1])  # warm-up
+    samples = []
+    for i in range(LATENCY_RUNS):
+        start = time.perf_counter()
+        encoder.encode([queries[i % len(queries)]])
+        samples.append((time.perf_counter() - start) * 1000)
+    samples = np.array(samples)
+    return {'p50_ms': float(np.percentile(samples, 50)), 'p95_ms': float(np.percentile(samples, 95))}
+
+
+def main() -> int:
+    try:
+        texts = load_artifact(ARTIFACT_DIR, "float16")['documents']
+    except FileNotFoundError:
+        print(f"No embedding artifact at {ARTIFACT_DIR}; run embed_and_store.py first")
+        return 1
+
+    start = time.perf_counter()
+    reference_encoder = SentenceTransformerEncoder(EMBEDDING_MODEL)
+    reference_load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    onnx_encoder = OnnxEncoder(EMBEDDING_MODEL)
+    onnx_load = time.perf_counter() - start
+
+    print(f"Embedding {len(texts)} catalog texts with both encoders...")
+    reference = encode_all(reference_encoder, texts)
+    candidate = encode_all(onnx_encoder, texts)
+
+    queries = reference_encoder.encode(SAMPLE_QUERIES)
+    parity = check_parity(reference, candidate, reference)
+    query_parity = check_parity(queries, onnx_encoder.encode(SAMPLE_QUERIES), reference)
+
+    print("\nParity (catalog texts)")
+    print(f"   min cosine: {parity['min_cosine']:.4f} | mean cosine: {parity['mean_cosine']:.4f}")
+    print(f"   worst text: {texts[parity['worst_index']][:80]}")
+    print("Parity (sample queries vs catalog)")
+    print(f"   min cosine: {query_parity['min_cosine']:.4f} | "
+          f"mean top-{TOP_K} overlap: {query_parity['mean_topk_overlap']:.2%}")
+
+    print("\nLatency (single query)")
+    for name, encoder, load_seconds in (("sentence-transformers", reference_encoder, reference_load),
+                                        ("onnx int8", onnx_encoder, onnx_load)):
+        latency = time_queries(encoder, SAMPLE_QUERIES)
+        print(f"   {name:<22} load {load_seconds:6.2f}s | "
+              f"p50 {latency['p50_ms']:7.2f} ms | p95 {latency['p95_ms']:7.2f} ms")
+
+    ok = (min(parity['min_cosine'], query_parity['min_cosine']) >= PARITY_MIN_COSINE
+          and query_parity['mean_topk_overlap'] >= PARITY_MIN_TOPK_OVERLAP)
+    print(f"\n{'PASS' if ok else 'FAIL'}: min cosine >= {PARITY_MIN_COSINE}, "
+          f"top-{TOP_K} overlap >= {PARITY_MIN_TOPK_OVERLAP:.0%}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
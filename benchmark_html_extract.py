@@ -0,0 +1,90 @@
+"""
+Parity and latency check: selectolax (lexbor) job-page extraction vs BeautifulSoup.
+
+    python benchmark_html_extract.py [fixture_dir ...]
+
+Runs both extractors over every saved HTML page (data/html_fixtures plus the
+pages in the job page cache) and fails (exit code 1) if any page yields a
+different title or description. Then reports per-page latency of each engine.
+"""
+import os
+import sys
+import glob
+import json
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from html_extract import LexborHTMLParser, parse_job_page_bs4, parse_job_page_fast
+from job_fetcher import JOB_CACHE_DIR
+
+HTML_FIXTURE_DIR = os.getenv("HTML_FIXTURE_DIR", "./data/html_fixtures")
+LATENCY_RUNS = 20
+
+
+def load_fixtures(dirs: List[str]) -> List[Tuple[str, str]]:
+    fixtures = []
+    for directory in dirs:
+        for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+            with open(path, encoding="utf-8") as f:
+                fixtures.append((os.path.basename(path), f.read()))
+        for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+            # Job page cache entries (see job_fetcher.py)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if entry.get('html'):
+                fixtures.append((entry.get('url', os.path.basename(path)), entry['html']))
+    return fixtures
+
+
+def time_extractor(extract, html: str) -> float:
+    extract(html)  # warm-up
+    samples = []
+    for _ in range(LATENCY_RUNS):
+        start = time.perf_counter()
+        extract(html)
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples))
+
+
+def main() -> int:
+    if LexborHTMLParser is None:
+        print("selectolax is not installed; pip install selectolax")
+        return 1
+
+    fixtures = load_fixtures(sys.argv[1:] or [HTML_FIXTURE_DIR, JOB_CACHE_DIR])
+    if not fixtures:
+        print(f"No HTML fixtures found in {HTML_FIXTURE_DIR} or {JOB_CACHE_DIR}")
+        return 1
+
+    mismatches = 0
+    bs4_total = fast_total = 0.0
+    print(f"{'page':<50} {'KB':>7} {'bs4 ms':>9} {'fast ms':>9} {'speedup':>8}  parity")
+    for name, html in fixtures:
+        reference: Dict = parse_job_page_bs4(html)
+        candidate: Dict = parse_job_page_fast(html)
+        same = reference == candidate
+        if not same:
+            mismatches += 1
+
+        bs4_ms = time_extractor(parse_job_page_bs4, html)
+        fast_ms = time_extractor(parse_job_page_fast, html)
+        bs4_total += bs4_ms
+        fast_total += fast_ms
+        print(f"{name[:50]:<50} {len(html) / 1024:>7.1f} {bs4_ms:>9.2f} {fast_ms:>9.2f} "
+              f"{bs4_ms / fast_ms:>7.1f}x  {'ok' if same else 'MISMATCH'}")
+        if not same:
+            print(f"    bs4:  {json.dumps(reference)[:300]}")
+            print(f"    fast: {json.dumps(candidate)[:300]}")
+
+    print(f"\n{len(fixtures)} pages, total {bs4_total:.1f} ms (bs4) vs {fast_total:.1f} ms (selectolax), "
+          f"{bs4_total / fast_total:.1f}x faster; {mismatches} mismatches")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
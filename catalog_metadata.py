@@ -0,0 +1,173 @@
+import math
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# SHL test type codes; a catalog row can carry several ("A,B,C,D,E,P")
+TEST_TYPE_CODES = ['A', 'B', 'C', 'D', 'E', 'K', 'P', 'S']
+
+# Job levels used in the catalog's job_levels column
+CATALOG_JOB_LEVELS = [
+    'Director', 'Entry-Level', 'Executive', 'Front Line Manager', 'General Population', 'Graduate',
+    'Manager', 'Mid-Professional', 'Professional Individual Contributor', 'Supervisor'
+]
+
+# Query job levels (see query_analyzer.JOB_LEVEL_PATTERNS) -> matching catalog levels
+QUERY_JOB_LEVELS = {
+    'entry': ['Entry-Level', 'Graduate', 'General Population'],
+    'junior': ['Entry-Level', 'Graduate', 'Professional Individual Contributor'],
+    'mid-level': ['Mid-Professional', 'Professional Individual Contributor'],
+    'senior': ['Mid-Professional', 'Professional Individual Contributor', 'Front Line Manager'],
+    'manager': ['Manager', 'Front Line Manager', 'Supervisor'],
+    'executive': ['Executive', 'Director'],
+}
+
+# Stored in Chroma metadata instead of NaN, which Chroma does not accept
+MISSING_DURATION = -1.0
+
+DURATION_KEY = 'duration_minutes'
+REMOTE_KEY = 'remote'
+
+
+def tag_key(code: str) -> str:
+    return f"tag_{code}"
+
+
+def level_key(level: str) -> str:
+    return "level_" + re.sub(r"[^a-z0-9]+", "_", level.lower()).strip("_")
+
+
+def parse_test_types(raw) -> List[str]:
+    """'A,B,P' -> ['A', 'B', 'P'] (unknown codes dropped)"""
+    codes = str(raw or '').upper().replace(',', ' ').split()
+    return [c for c in codes if c in TEST_TYPE_CODES]
+
+
+def parse_duration(raw) -> float:
+    """'30.0' -> 30.0; missing or unparseable -> NaN"""
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        return math.nan
+    return value if value >= 0 else math.nan
+
+
+def parse_job_levels(raw) -> List[str]:
+    """'Graduate, Mid-Professional,' -> ['Graduate', 'Mid-Professional']"""
+    levels = [level.strip() for level in str(raw or '').split(',')]
+    return [level for level in levels if level in CATALOG_JOB_LEVELS]
+
+
+def parse_remote(raw) -> bool:
+    return str(raw or '').strip().lower() in ('yes', 'true', '1')
+
+
+def typed_metadata(metadata: Dict) -> Dict:
+    """Raw catalog metadata plus typed filter columns (booleans and a float duration)"""
+    tags = set(parse_test_types(metadata.get('test_type')))
+    levels = set(parse_job_levels(metadata.get('job_levels')))
+    duration = parse_duration(metadata.get('assessment_length_(mins)'))
+
+    typed = dict(metadata)
+    for code in TEST_TYPE_CODES:
+        typed[tag_key(code)] = code in tags
+    for level in CATALOG_JOB_LEVELS:
+        typed[level_key(level)] = level in levels
+    typed[DURATION_KEY] = MISSING_DURATION if math.isnan(duration) else duration
+    typed[REMOTE_KEY] = parse_remote(metadata.get('remote_testing'))
+    return typed
+
+
+def stored_duration(metadata: Dict) -> float:
+    """Duration from typed metadata when present, otherwise parsed from the raw column"""
+    value = metadata.get(DURATION_KEY)
+    if value is None:
+        return parse_duration(metadata.get('assessment_length_(mins)'))
+    return math.nan if value == MISSING_DURATION else float(value)
+
+
+def has_test_type(metadata: Dict, code: str) -> bool:
+    value = metadata.get(tag_key(code))
+    if value is None:
+        return code in parse_test_types(metadata.get('test_type'))
+    return bool(value)
+
+
+def query_levels(job_level: Optional[str]) -> List[str]:
+    """Catalog levels matching a query job level ('Senior' -> [...]); [] when unknown"""
+    if not job_level:
+        return []
+    return QUERY_JOB_LEVELS.get(str(job_level).strip().lower(), [])
+
+
+class CatalogColumns:
+    """
+    Typed filter columns for every catalog row: test-type and job-level bitmaps,
+    float durations (NaN when missing) and a remote flag. mask() turns filters
+    into one boolean row mask before any scoring happens.
+    """
+
+    def __init__(self, metadatas: List[Dict]):
+        n = len(metadatas)
+        self.tag_bits = np.zeros(n, dtype=np.uint8)
+        self.level_bits = np.zeros(n, dtype=np.uint16)
+        self.duration = np.full(n, np.nan, dtype=np.float32)
+        self.remote = np.zeros(n, dtype=bool)
+
+        for row, metadata in enumerate(metadatas):
+            for bit, code in enumerate(TEST_TYPE_CODES):
+                if has_test_type(metadata, code):
+                    self.tag_bits[row] |= 1 << bit
+            raw_levels = parse_job_levels(metadata.get('job_levels'))
+            for bit, level in enumerate(CATALOG_JOB_LEVELS):
+                stored = metadata.get(level_key(level))
+                if (bool(stored) if stored is not None else level in raw_levels):
+                    self.level_bits[row] |= 1 << bit
+            self.duration[row] = stored_duration(metadata)
+            remote = metadata.get(REMOTE_KEY)
+            self.remote[row] = bool(remote) if remote is not None else parse_remote(metadata.get('remote_testing'))
+
+    def mask(self,
+             test_type: Optional[str] = None,
+             duration_max: Optional[float] = None,
+             job_level: Optional[str] = None,
+             remote: Optional[bool] = None) -> np.ndarray:
+        keep = np.ones(len(self.duration), dtype=bool)
+        if test_type:
+            keep &= (self.tag_bits & (1 << TEST_TYPE_CODES.index(test_type))) != 0
+        if duration_max:
+            # Rows without a duration are kept, as before
+            keep &= np.isnan(self.duration) | (self.duration <= duration_max)
+        levels = query_levels(job_level)
+        if levels:
+            wanted = sum(1 << CATALOG_JOB_LEVELS.index(level) for level in levels)
+            keep &= ((self.level_bits & wanted) != 0) | (self.level_bits == 0)
+        if remote is not None:
+            keep &= self.remote == remote
+        return keep
+
+
+def chroma_where(test_type: Optional[str] = None,
+                 duration_max: Optional[float] = None,
+                 job_level: Optional[str] = None,
+                 remote: Optional[bool] = None) -> Optional[Dict]:
+    """Same filters as CatalogColumns.mask, as a Chroma where clause over the typed fields"""
+    clauses = []
+    if test_type:
+        clauses.append({tag_key(test_type): True})
+    if duration_max:
+        clauses.append({'$or': [{DURATION_KEY: {'$lte': float(duration_max)}},
+                                {DURATION_KEY: {'$eq': MISSING_DURATION}}]})
+    levels = query_levels(job_level)
+    if levels:
+        # Rows with no level at all stay eligible
+        options = [{level_key(level): True} for level in levels]
+        options.append({'$and': [{level_key(level): False} for level in CATALOG_JOB_LEVELS]})
+        clauses.append({'$or': options})
+    if remote is not None:
+        clauses.append({REMOTE_KEY: remote})
+
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {'$and': clauses}
@@ -1,11 +1,12 @@
 import os
-import re
-import time
 import random
 import pandas as pd
 import google.generativeai as genai
 from dotenv import load_dotenv
 
+from gemini_client import generate_text
+from rate_limiter import get_gemini_limiter, parse_retry_delay
+
 
 # -------------------- SETUP --------------------
 load_dotenv()
@@ -19,6 +20,8 @@ model = genai.GenerativeModel("gemini-2.0-flash")
 INPUT_FILE = "SHL_Product_Details_Final.csv"
 OUTPUT_FILE = "SHL_Product_Details_Final_Updated.csv"
 CHUNK_SIZE = 30 
+# Bump when the prompt template changes so cached labels are not reused
+CLASSIFY_PROMPT_VERSION = "classify_test_type/v1"
 
 
 # -------------------- LOAD DATA --------------------
@@ -69,8 +72,8 @@ def classify_with_gemini(row, retries=3):
 
     for attempt in range(retries):
         try:
-            res = model.generate_content(prompt)
-            label = res.text.strip().upper().replace(" ", "")
+            label = generate_text(model, prompt, CLASSIFY_PROMPT_VERSION)
+            label = label.upper().replace(" ", "")
             if label not in ["K", "P", "K,P"]:
                 label = "K"
             return label
@@ -79,16 +82,11 @@ def classify_with_gemini(row, retries=3):
             err_msg = str(e)
             print(f" Gemini error (attempt {attempt+1}/{retries}): {err_msg}")
 
-            # Detect rate-limit hint
-            match = re.search(r"retry in (\d+\.?\d*)s", err_msg)
-            if match:
-                delay = float(match.group(1))
-                print(f" API quota hit. Sleeping for {delay:.1f} seconds...")
-                time.sleep(delay + 2)
-            else:
+            # Rate-limit hints are already applied to the shared limiter by generate_text
+            if parse_retry_delay(err_msg) is None:
                 sleep_time = 2 ** attempt + random.uniform(0, 1)
                 print(f" Backoff for {sleep_time:.1f}s...")
-                time.sleep(sleep_time)
+                get_gemini_limiter().defer(sleep_time)
 
             if attempt == retries - 1:
                 print(" Giving up after retries.")
@@ -114,7 +112,6 @@ def classify_and_update(row):
 
     merged = ",".join(sorted(tags))
     print(f"Processed: {row.get('assessment_name','')} → {merged}")
-    time.sleep(1)
     return merged
 
 
@@ -133,7 +130,5 @@ for i in range(0, total_rows, CHUNK_SIZE):
     chunk.to_csv(OUTPUT_FILE, mode=mode, header=header, index=False)
 
     print(f" Saved progress to {OUTPUT_FILE}")
-    print(" Sleeping 60s before next chunk...")
-    time.sleep(60)
 
 print(f"\n All done! Classified file saved as: {OUTPUT_FILE}")
@@ -1,21 +1,28 @@
-import os
+import hashlib
+import numpy as np
 import pandas as pd
-from sentence_transformers import SentenceTransformer
 import chromadb
 from chromadb.utils import embedding_functions
-import shutil
+
+from embedding_artifact import ARTIFACT_DIR, write_artifact
+from lexical_index import write_lexical_index
+from skill_gazetteer import write_skill_gazetteer
+from catalog_metadata import typed_metadata
 
 CSV_PATH = "SHL_Product_Details_Final_Clean.csv"
 PERSIST_DIR = "./chroma_store"
 COLLECTION_NAME = "shl_assessments"
-
-if os.path.exists(PERSIST_DIR):
-    shutil.rmtree(PERSIST_DIR)
-    print(f" Deleted old Chroma store at: {PERSIST_DIR}")
+EMBEDDING_MODEL = "BAAI/bge-base-en-v1.5"
 
 df = pd.read_csv(CSV_PATH)
 df.columns = [c.strip().lower().replace(" ", "_") for c in df.columns]
 
+# Ids are derived from the URL, so the same assessment must not appear twice
+duplicates = df["url"].duplicated(keep="last")
+if duplicates.any():
+    print(f" Dropping {duplicates.sum()} rows with duplicate URLs")
+    df = df[~duplicates]
+
 # Combine key fields into one searchable text
 def combine_text(row):
     # Only include semantically meaningful content for embedding
@@ -27,22 +34,90 @@ def combine_text(row):
     ]
     return " | ".join(str(p) for p in semantic_parts if p)
 
+def assessment_id(url: str) -> str:
+    """Stable id: survives reordering of the CSV"""
+    return hashlib.sha1(url.strip().encode("utf-8")).hexdigest()
+
+def content_hash(text: str) -> str:
+    """Hash of the embedded text; a change means the row must be re-embedded"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
 df["combined_text"] = df.apply(combine_text, axis=1)
 
-model = SentenceTransformer("BAAI/bge-base-en-v1.5")
-embed_fn = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="BAAI/bge-base-en-v1.5")
+# Chroma metadata cannot hold NaN reliably, store missing values as ""
+metadatas = df.astype(object).where(df.notna(), "").to_dict(orient="records")
+# Typed filter columns: tag_<code>/level_<level> booleans, duration_minutes, remote
+metadatas = [typed_metadata(meta) for meta in metadatas]
+ids = [assessment_id(url) for url in df["url"]]
+documents = df["combined_text"].tolist()
+for meta, doc in zip(metadatas, documents):
+    meta.pop("combined_text", None)
+    meta["content_hash"] = content_hash(doc)
+
+embed_fn = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=EMBEDDING_MODEL)
 
 client = chromadb.PersistentClient(path=PERSIST_DIR)
-collection = client.create_collection(name=COLLECTION_NAME, embedding_function=embed_fn)
+collection = client.get_or_create_collection(name=COLLECTION_NAME, embedding_function=embed_fn)
 
-documents = df["combined_text"].tolist()
-ids = [str(i) for i in range(len(df))]
-metadatas = df.to_dict(orient="records")  # includes URL, test type, etc.
+existing = collection.get(include=["metadatas"])
+existing_meta = {i: (m or {}) for i, m in zip(existing["ids"], existing["metadatas"])}
 
-collection.add(
-    documents=documents,
+# Classify every row against what is already stored
+embed_ids, embed_docs, embed_metas = [], [], []
+meta_ids, meta_metas = [], []
+added = updated = refreshed = skipped = 0
+
+for row_id, doc, meta in zip(ids, documents, metadatas):
+    stored = existing_meta.get(row_id)
+    if stored is None or stored.get("content_hash") != meta["content_hash"]:
+        embed_ids.append(row_id)
+        embed_docs.append(doc)
+        embed_metas.append(meta)
+        if stored is None:
+            added += 1
+        else:
+            updated += 1
+    elif stored != meta:
+        # Same embedded text, only non-embedded metadata changed (e.g. URL flags)
+        meta_ids.append(row_id)
+        meta_metas.append(meta)
+        refreshed += 1
+    else:
+        skipped += 1
+
+current_ids = set(ids)
+stale_ids = [i for i in existing_meta if i not in current_ids]
+
+if embed_ids:
+    collection.upsert(ids=embed_ids, documents=embed_docs, metadatas=embed_metas)
+if meta_ids:
+    collection.update(ids=meta_ids, metadatas=meta_metas)
+if stale_ids:
+    collection.delete(ids=stale_ids)
+
+print(f" Indexed {len(ids)} assessments into persistent ChromaDB at: {PERSIST_DIR}")
+print(f"   added: {added} | updated (re-embedded): {updated} | metadata only: {refreshed} "
+      f"| skipped (unchanged): {skipped} | deleted: {len(stale_ids)}")
+
+# Export a compact, memory-mappable copy of the index in CSV row order
+stored = collection.get(ids=ids, include=["embeddings", "metadatas", "documents"])
+position = {row_id: i for i, row_id in enumerate(stored["ids"])}
+order = [position[row_id] for row_id in ids]
+
+manifest = write_artifact(
     ids=ids,
-    metadatas=metadatas
+    documents=[stored["documents"][i] for i in order],
+    metadatas=[stored["metadatas"][i] for i in order],
+    embeddings=np.asarray(stored["embeddings"], dtype=np.float32)[order],
+    model_name=EMBEDDING_MODEL
 )
+print(f" Wrote embedding artifact ({manifest['count']} x {manifest['dimension']}, "
+      f"catalog {manifest['catalog_hash'][:12]}) to: {ARTIFACT_DIR}")
+
+# BM25 postings over name + description, in the same row order
+lexical = write_lexical_index(ids, [stored["metadatas"][i] for i in order])
+print(f" Wrote lexical index ({len(lexical.vocabulary)} terms, {len(lexical.weights)} postings) to: {ARTIFACT_DIR}")
 
-print(f" Stored {len(df)} assessments into persistent ChromaDB at: {PERSIST_DIR}")
\ No newline at end of file
+# Skill vocabulary (assessment names, description topics, curated synonyms) for offline skill extraction
+gazetteer = write_skill_gazetteer([stored["metadatas"][i] for i in order])
+print(f" Wrote skill gazetteer ({len(gazetteer.terms)} terms) to: {ARTIFACT_DIR}")
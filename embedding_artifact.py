@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import hashlib
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Compact, memory-mappable copy of the catalog embeddings
+ARTIFACT_DIR = os.getenv("EMBEDDING_ARTIFACT_DIR", "./vectorstore/catalog_embeddings")
+# "float16" or "int8" (per-vector scales)
+ARTIFACT_PRECISION = os.getenv("EMBEDDING_ARTIFACT_PRECISION", "float16")
+
+MANIFEST_FILE = "manifest.json"
+CATALOG_FILE = "catalog.json"
+FLOAT16_FILE = "embeddings_f16.npy"
+INT8_FILE = "embeddings_i8.npy"
+INT8_SCALES_FILE = "embeddings_i8_scales.npy"
+
+
+def catalog_hash(ids: List[str], content_hashes: List[str]) -> str:
+    """Order-independent fingerprint of the indexed catalog"""
+    digest = hashlib.sha256()
+    for row_id, row_hash in sorted(zip(ids, content_hashes)):
+        digest.update(f"{row_id}:{row_hash}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def quantize_int8(embeddings: np.ndarray):
+    """Symmetric per-vector int8 quantization; returns (codes, scales)"""
+    scales = np.abs(embeddings).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(embeddings / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def write_artifact(ids: List[str],
+                   documents: List[str],
+                   metadatas: List[Dict],
+                   embeddings: np.ndarray,
+                   model_name: str,
+                   artifact_dir: str = ARTIFACT_DIR,
+                   include_int8: bool = True) -> Dict:
+    """Write normalized embeddings (float16 + optional int8), catalog rows and manifest"""
+    os.makedirs(artifact_dir, exist_ok=True)
+
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    embeddings = embeddings / norms
+
+    files = {'float16': FLOAT16_FILE}
+    np.save(os.path.join(artifact_dir, FLOAT16_FILE), embeddings.astype(np.float16))
+    if include_int8:
+        codes, scales = quantize_int8(embeddings)
+        np.save(os.path.join(artifact_dir, INT8_FILE), codes)
+        np.save(os.path.join(artifact_dir, INT8_SCALES_FILE), scales)
+        files['int8'] = INT8_FILE
+        files['int8_scales'] = INT8_SCALES_FILE
+
+    with open(os.path.join(artifact_dir, CATALOG_FILE), "w", encoding="utf-8") as f:
+        json.dump({'documents': documents, 'metadatas': metadatas}, f, ensure_ascii=False)
+
+    manifest = {
+        'model_name': model_name,
+        'dimension': int(embeddings.shape[1]),
+        'count': int(embeddings.shape[0]),
+        'catalog_hash': catalog_hash(ids, [m.get('content_hash', '') for m in metadatas]),
+        'row_order': list(ids),
+        'files': files,
+        'created_at': time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    }
+    with open(os.path.join(artifact_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def read_manifest(artifact_dir: str = ARTIFACT_DIR) -> Optional[Dict]:
+    path = os.path.join(artifact_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_artifact(artifact_dir: str = ARTIFACT_DIR, precision: str = ARTIFACT_PRECISION) -> Dict:
+    """
+    Memory-map the embedding matrix; nothing is copied or deserialized.
+    Returns manifest, ids, documents, metadatas, embeddings and (for int8) scales.
+    """
+    manifest = read_manifest(artifact_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No embedding artifact at {artifact_dir}")
+    if precision not in manifest['files']:
+        raise ValueError(f"Artifact at {artifact_dir} has no {precision} embeddings")
+
+    embeddings = np.load(os.path.join(artifact_dir, manifest['files'][precision]), mmap_mode='r')
+    scales = None
+    if precision == 'int8':
+        scales = np.load(os.path.join(artifact_dir, manifest['files']['int8_scales']), mmap_mode='r')
+
+    with open(os.path.join(artifact_dir, CATALOG_FILE), encoding="utf-8") as f:
+        catalog = json.load(f)
+
+    return {
+        'manifest': manifest,
+        'ids': manifest['row_order'],
+        'documents': catalog['documents'],
+        'metadatas': catalog['metadatas'],
+        'embeddings': embeddings,
+        'scales': scales
+    }
@@ -0,0 +1,91 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Memory budget and storage precision for cached query embeddings
+EMBEDDING_CACHE_MAX_MB = float(os.getenv("EMBEDDING_CACHE_MAX_MB", 32))
+EMBEDDING_CACHE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float16")
+
+
+def normalize_query_text(text: str) -> str:
+    """Cache key for a query string (bge is uncased and whitespace-insensitive)"""
+    return " ".join(str(text).split()).lower()
+
+
+class EmbeddingCache:
+    """
+    Size-bounded LRU of query text -> embedding vector.
+    Vectors are stored as compact float16/float32 arrays; the byte budget,
+    not the entry count, decides when to evict.
+    """
+
+    def __init__(self, max_bytes: int = int(EMBEDDING_CACHE_MAX_MB * 1024 * 1024),
+                 dtype: str = EMBEDDING_CACHE_DTYPE):
+        self.max_bytes = max_bytes
+        self.dtype = np.dtype(dtype)
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, key: str, vector: np.ndarray):
+        stored = np.ascontiguousarray(vector, dtype=self.dtype)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes_used -= previous.nbytes
+            self._entries[key] = stored
+            self.bytes_used += stored.nbytes
+
+            while self.bytes_used > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes_used -= evicted.nbytes
+                self.evictions += 1
+
+    def encode(self, texts: List[str], encode_fn) -> np.ndarray:
+        """
+        Embed texts, running encode_fn only on strings not already cached.
+        Returns a float32 matrix in input order.
+        """
+        keys = [normalize_query_text(t) for t in texts]
+        vectors: List[Optional[np.ndarray]] = [self.get(k) for k in keys]
+
+        missing = list(dict.fromkeys(k for k, v in zip(keys, vectors) if v is None))
+        if missing:
+            encoded = np.asarray(encode_fn(missing), dtype=np.float32)
+            fresh = dict(zip(missing, encoded))
+            for key, vector in fresh.items():
+                self.put(key, vector)
+            vectors = [fresh[k] if v is None else v for k, v in zip(keys, vectors)]
+
+        return np.vstack(vectors).astype(np.float32, copy=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes_used': self.bytes_used,
+                'max_bytes': self.max_bytes,
+                'dtype': self.dtype.name,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
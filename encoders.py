@@ -0,0 +1,99 @@
+import os
+from typing import List
+
+import numpy as np
+from chromadb.api.types import EmbeddingFunction
+
+# "sentence-transformers" (PyTorch) or "onnx" (int8-quantized ONNX Runtime, CPU)
+ENCODER_BACKEND = os.getenv("ENCODER_BACKEND", "sentence-transformers").lower()
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "./models/bge-base-en-v1.5-onnx-int8")
+ONNX_MODEL_FILE = "model_quantized.onnx"
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", 0))  # 0 lets ONNX Runtime decide
+
+# bge models were trained with 512-token inputs
+MAX_SEQUENCE_LENGTH = 512
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+class SentenceTransformerEncoder:
+    """Reference encoder: the full PyTorch model through sentence-transformers"""
+
+    name = "sentence-transformers"
+
+    def __init__(self, model_name: str):
+        # Imported here so the ONNX path never pulls in torch
+        from sentence_transformers import SentenceTransformer
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        vectors = self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class OnnxEncoder:
+    """
+    Same model exported to ONNX and dynamically quantized to int8
+    (see export_onnx_encoder.py). Uses CLS pooling like bge.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_name: str, model_dir: str = ONNX_MODEL_DIR):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_name = model_name
+        self.model_dir = model_dir
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQUENCE_LENGTH)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if ONNX_THREADS:
+            options.intra_op_num_threads = ONNX_THREADS
+
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, ONNX_MODEL_FILE),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(list(texts))
+        feed = {
+            'input_ids': np.array([e.ids for e in encodings], dtype=np.int64),
+            'attention_mask': np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        }
+        if 'token_type_ids' in self.input_names:
+            feed['token_type_ids'] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        last_hidden_state = self.session.run(None, feed)[0]
+        return normalize(last_hidden_state[:, 0])
+
+
+class ChromaEmbeddingAdapter(EmbeddingFunction):
+    """Lets Chroma embed with whichever encoder the engine is using"""
+
+    def __init__(self, encoder):
+        self.encoder = encoder
+
+    def __call__(self, input):
+        return self.encoder.encode(list(input)).tolist()
+
+
+def load_encoder(model_name: str, backend: str = ENCODER_BACKEND):
+    """Build the query encoder selected by ENCODER_BACKEND"""
+    if backend == "onnx":
+        return OnnxEncoder(model_name)
+    if backend == "sentence-transformers":
+        return SentenceTransformerEncoder(model_name)
+    raise ValueError(f"Unknown ENCODER_BACKEND: {backend}")
@@ -0,0 +1,64 @@
+"""
+Export BAAI/bge-base-en-v1.5 to ONNX and quantize it to int8 for CPU inference.
+
+    python export_onnx_encoder.py [output_dir]
+
+Writes model.onnx, model_quantized.onnx and tokenizer.json to output_dir
+(default ONNX_MODEL_DIR). Needs torch + transformers, which the serving
+image does not need once the quantized model exists.
+"""
+import os
+import sys
+
+import torch
+from transformers import AutoModel, AutoTokenizer
+from onnxruntime.quantization import QuantType, quantize_dynamic
+
+from encoders import ONNX_MODEL_DIR, ONNX_MODEL_FILE
+
+EMBEDDING_MODEL = "BAAI/bge-base-en-v1.5"
+ONNX_OPSET = 17
+
+
+def export(model_name: str = EMBEDDING_MODEL, output_dir: str = ONNX_MODEL_DIR):
+    os.makedirs(output_dir, exist_ok=True)
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    int8_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+
+    sample = tokenizer(["Java developer who can collaborate with business teams"], return_tensors="pt")
+    input_names = ['input_ids', 'attention_mask', 'token_type_ids']
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes,
+            opset_version=ONNX_OPSET,
+            do_constant_folding=True
+        )
+    print(f" Exported {model_name} to: {fp32_path}")
+
+    # Weights-only int8; activations are quantized on the fly at inference time
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    print(f" Quantized model written to: {int8_path}")
+
+    # Fast tokenizer in a single file, loadable without transformers
+    tokenizer.backend_tokenizer.save(os.path.join(output_dir, "tokenizer.json"))
+    print(f" Tokenizer written to: {os.path.join(output_dir, 'tokenizer.json')}")
+
+    fp32_mb = os.path.getsize(fp32_path) / (1024 * 1024)
+    int8_mb = os.path.getsize(int8_path) / (1024 * 1024)
+    print(f"   model size: {fp32_mb:.1f} MB (fp32) -> {int8_mb:.1f} MB (int8)")
+
+
+if __name__ == "__main__":
+    export(output_dir=sys.argv[1] if len(sys.argv) > 1 else ONNX_MODEL_DIR)
@@ -0,0 +1,68 @@
+from typing import Optional
+
+from llm_cache import get_llm_cache, make_cache_key
+from rate_limiter import get_gemini_limiter, estimate_tokens
+from async_pipeline import LLM_SLOTS, run_blocking
+
+
+def model_name_of(model) -> str:
+    """Model identifier used in cache keys"""
+    return str(getattr(model, "model_name", model))
+
+
+def generate_text(model,
+                  prompt: str,
+                  prompt_version: str,
+                  cache_input: Optional[str] = None) -> str:
+    """
+    Call Gemini through the shared LLM cache and rate limiter.
+    cache_input defaults to the full prompt; only cache misses consume quota.
+    """
+    cache = get_llm_cache()
+    model_name = model_name_of(model)
+    key = make_cache_key(prompt_version, model_name, prompt if cache_input is None else cache_input)
+
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    limiter = get_gemini_limiter()
+    limiter.acquire(estimate_tokens(prompt))
+    try:
+        response = model.generate_content(prompt)
+        text = response.text.strip()
+    except Exception as e:
+        # Quota hints hold back every other caller until the window reopens
+        limiter.defer_from_error(e)
+        raise
+
+    cache.set(key, text, prompt_version, model_name)
+    return text
+
+
+async def agenerate_text(model,
+                         prompt: str,
+                         prompt_version: str,
+                         cache_input: Optional[str] = None) -> str:
+    """Async variant of generate_text using Gemini's async client"""
+    cache = get_llm_cache()
+    model_name = model_name_of(model)
+    key = make_cache_key(prompt_version, model_name, prompt if cache_input is None else cache_input)
+
+    # The cache is SQLite behind a lock; keep its reads and commits off the event loop
+    cached = await run_blocking(cache.get, key)
+    if cached is not None:
+        return cached
+
+    limiter = get_gemini_limiter()
+    await limiter.acquire_async(estimate_tokens(prompt))
+    async with LLM_SLOTS:
+        try:
+            response = await model.generate_content_async(prompt)
+            text = response.text.strip()
+        except Exception as e:
+            limiter.defer_from_error(e)
+            raise
+
+    await run_blocking(cache.set, key, text, prompt_version, model_name)
+    return text
@@ -0,0 +1,170 @@
+import os
+from typing import Dict, Iterator, List, Optional
+
+from bs4 import BeautifulSoup, NavigableString
+
+try:
+    # C-backed (lexbor) HTML5 parser; optional, BeautifulSoup is the fallback
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+# "auto" (selectolax when installed), "selectolax" or "bs4"
+HTML_EXTRACTOR = os.getenv("HTML_EXTRACTOR", "auto").lower()
+
+TITLE_SELECTORS = ["h1", "h2[class*=top-card-layout__title]", "title"]
+DESCRIPTION_SELECTORS = ["div.mt4", "div[class*=description]"]
+SKIP_TAGS = ["script", "style", "noscript"]
+# Shorter containers are navigation/boilerplate, not a job description
+MIN_DESCRIPTION_WORDS = 50
+
+# Subtrees that never hold job text (visible_text_lines skips them)
+BOILERPLATE_TAGS = {
+    "script", "style", "noscript", "template", "svg", "iframe", "nav", "footer", "form", "button", "select"
+}
+BOILERPLATE_HINTS = (
+    "cookie", "consent", "similar-jobs", "related", "share", "social", "breadcrumb",
+    "footer", "navbar", "nav__", "sign-in", "signup", "modal"
+)
+
+
+def parse_job_page_bs4(html: str) -> Dict:
+    """Reference extraction: whole page through BeautifulSoup's html.parser"""
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(SKIP_TAGS):
+        tag.decompose()
+
+    title_tag = None
+    for selector in TITLE_SELECTORS:
+        title_tag = soup.select_one(selector)
+        if title_tag:
+            break
+    job_title = title_tag.get_text(strip=True) if title_tag else "Unknown Title"
+
+    jd_div = soup.select_one(DESCRIPTION_SELECTORS[0]) or soup.select_one(DESCRIPTION_SELECTORS[1])
+    if jd_div:
+        jd_text = jd_div.get_text(separator="\n", strip=True)
+        if len(jd_text.split()) > MIN_DESCRIPTION_WORDS:
+            return {"title": job_title, "description": jd_text}
+
+    return {"title": job_title, "description": None}
+
+
+def _strings(node) -> Iterator[str]:
+    """Stripped, non-empty text nodes under node (same as BeautifulSoup's stripped_strings)"""
+    for skipped in node.css(", ".join(SKIP_TAGS)):
+        skipped.decompose()
+    for child in node.traverse(include_text=True):
+        if child.tag == "-text":
+            text = child.text_content.strip()
+            if text:
+                yield text
+
+
+def parse_job_page_fast(html: str) -> Dict:
+    """
+    Same output as parse_job_page_bs4, but only the title and description
+    containers are walked in Python; parsing and CSS matching happen in lexbor.
+    """
+    tree = LexborHTMLParser(html)
+
+    title_node = None
+    for selector in TITLE_SELECTORS:
+        title_node = tree.css_first(selector)
+        if title_node is not None:
+            break
+    job_title = "".join(_strings(title_node)) if title_node is not None else "Unknown Title"
+
+    jd_div = tree.css_first(DESCRIPTION_SELECTORS[0])
+    if jd_div is None:
+        jd_div = tree.css_first(DESCRIPTION_SELECTORS[1])
+    if jd_div is not None:
+        jd_text = "\n".join(_strings(jd_div))
+        if len(jd_text.split()) > MIN_DESCRIPTION_WORDS:
+            return {"title": job_title, "description": jd_text}
+
+    return {"title": job_title, "description": None}
+
+
+def _is_boilerplate(tag: str, class_and_id: str) -> bool:
+    if tag in BOILERPLATE_TAGS:
+        return True
+    class_and_id = class_and_id.lower()
+    return any(hint in class_and_id for hint in BOILERPLATE_HINTS)
+
+
+def _visible_lines_fast(html: str) -> List[str]:
+    tree = LexborHTMLParser(html)
+    title = tree.css_first("title")
+    lines = [title.text(strip=True)] if title is not None else []
+
+    # Iterative pre-order walk so boilerplate subtrees are skipped whole
+    stack = [tree.body if tree.body is not None else tree.root]
+    while stack:
+        node = stack.pop()
+        if node.tag == "-text":
+            lines.append(node.text_content)
+            continue
+        attributes = node.attributes
+        if _is_boilerplate(node.tag, f"{attributes.get('class') or ''} {attributes.get('id') or ''}"):
+            continue
+        stack.extend(reversed(list(node.iter(include_text=True))))
+    return lines
+
+
+def _visible_lines_bs4(html: str) -> List[str]:
+    soup = BeautifulSoup(html, "html.parser")
+    lines = [soup.title.get_text(strip=True)] if soup.title else []
+
+    stack = [soup.body or soup]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, NavigableString):
+            if type(node) is NavigableString:  # skips comments, CDATA, doctype
+                lines.append(str(node))
+            continue
+        class_and_id = " ".join(node.get("class") or []) + " " + (node.get("id") or "")
+        if node.name != "[document]" and _is_boilerplate(node.name, class_and_id):
+            continue
+        stack.extend(reversed(node.contents))
+    return lines
+
+
+def visible_text_lines(html: str, extractor: Optional[str] = None) -> List[str]:
+    """
+    Page title plus the text a reader would see, one line per text node with
+    whitespace collapsed; scripts, navigation, footers, forms, cookie banners
+    and "similar jobs" lists are left out.
+    """
+    if extractor_name(extractor) == "bs4":
+        raw_lines = _visible_lines_bs4(html)
+    else:
+        raw_lines = _visible_lines_fast(html)
+    lines = (" ".join(line.split()) for line in raw_lines)
+    return [line for line in lines if line]
+
+
+def extractor_name(extractor: Optional[str] = None) -> str:
+    extractor = (extractor or HTML_EXTRACTOR).lower()
+    if extractor == "bs4" or LexborHTMLParser is None:
+        return "bs4"
+    return "selectolax"
+
+
+def extract_job_page(html: str, extractor: Optional[str] = None) -> Dict:
+    """
+    Title + description from job page HTML with the configured engine.
+    The fast path falls back to BeautifulSoup if it finds no description,
+    so markup lexbor parses differently never costs an LLM call.
+    """
+    if extractor_name(extractor) == "bs4":
+        return parse_job_page_bs4(html)
+
+    try:
+        job_data = parse_job_page_fast(html)
+    except Exception as e:
+        print(f" Fast HTML extraction failed ({e}), using BeautifulSoup")
+        return parse_job_page_bs4(html)
+    if job_data["description"]:
+        return job_data
+    return parse_job_page_bs4(html)
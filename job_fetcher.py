@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from async_pipeline import FETCH_CONCURRENCY, FETCH_SLOTS, get_http_client, run_blocking
+
+# On-disk cache of fetched job pages (raw HTML + extracted title/description)
+JOB_CACHE_DIR = os.getenv("JOB_CACHE_DIR", "./cache/job_pages")
+# Pages younger than this are served without any network I/O;
+# older ones are revalidated with a conditional GET
+JOB_CACHE_TTL_SECONDS = float(os.getenv("JOB_CACHE_TTL_SECONDS", 24 * 3600))
+
+REQUEST_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+    )
+}
+
+# Query parameters that identify the visit, not the page
+TRACKING_PARAMS = {
+    'refid', 'trackingid', 'trk', 'trkinfo', 'lipi', 'alternatechannel', 'ebp', 'position',
+    'pagenum', 'originalsubdomain', 'gclid', 'fbclid', 'msclkid', 'mc_cid', 'mc_eid', 'src', 'source'
+}
+TRACKING_PREFIXES = ('utm_',)
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Stable form of a job URL: lowercase host, no fragment, tracking params removed,
+    remaining params sorted. LinkedIn search links with currentJobId become /jobs/view/<id>/.
+    """
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    host = parts.netloc.lower()
+    path = parts.path or "/"
+
+    params = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+
+    if host.endswith("linkedin.com"):
+        host = "www.linkedin.com"
+        job_id = dict(params).get("currentJobId")
+        if job_id and job_id.isdigit():
+            path, params = f"/jobs/view/{job_id}/", []
+        elif path.startswith("/jobs/view/") and not path.endswith("/"):
+            path += "/"
+
+    return urlunsplit((scheme, host, path, urlencode(sorted(params)), ""))
+
+
+class JobPageCache:
+    """One JSON file per canonical URL; writes are atomic (temp file + rename)"""
+
+    def __init__(self, cache_dir: str = JOB_CACHE_DIR, ttl_seconds: float = JOB_CACHE_TTL_SECONDS):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+        self.fresh_hits = 0
+        self.revalidated = 0
+        self.downloads = 0
+
+    def _path(self, canonical_url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(canonical_url.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, canonical_url: str) -> Optional[Dict]:
+        try:
+            with open(self._path(canonical_url), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, canonical_url: str, entry: Dict):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(canonical_url)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def is_fresh(self, entry: Dict) -> bool:
+        return time.time() - entry.get('fetched_at', 0) < self.ttl_seconds
+
+    def count(self, outcome: str):
+        with self._lock:
+            if outcome == "fresh":
+                self.fresh_hits += 1
+            elif outcome == "revalidated":
+                self.revalidated += 1
+            else:
+                self.downloads += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'fresh_hits': self.fresh_hits,
+                'revalidated': self.revalidated,
+                'downloads': self.downloads,
+                'ttl_seconds': self.ttl_seconds
+            }
+
+
+def conditional_headers(entry: Optional[Dict]) -> Dict:
+    headers = dict(REQUEST_HEADERS)
+    if entry:
+        if entry.get('etag'):
+            headers["If-None-Match"] = entry['etag']
+        if entry.get('last_modified'):
+            headers["If-Modified-Since"] = entry['last_modified']
+    return headers
+
+
+def updated_entry(canonical_url: str, entry: Optional[Dict], status_code: int, headers, text: str) -> Dict:
+    """Cache entry after a (conditional) GET; 304 keeps the stored HTML and extraction"""
+    if status_code == 304 and entry:
+        return {**entry, 'fetched_at': time.time()}
+    return {
+        'url': canonical_url,
+        'fetched_at': time.time(),
+        'etag': headers.get("ETag"),
+        'last_modified': headers.get("Last-Modified"),
+        'html': text,
+        'job_data': None
+    }
+
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_cache: Optional[JobPageCache] = None
+
+
+def get_session() -> requests.Session:
+    """Shared keep-alive session for synchronous page fetches"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=FETCH_CONCURRENCY, pool_maxsize=FETCH_CONCURRENCY)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def get_job_cache() -> JobPageCache:
+    global _cache
+    if _cache is None:
+        with _session_lock:
+            if _cache is None:
+                _cache = JobPageCache()
+    return _cache
+
+
+def fetch_page(url: str, timeout: float = 10) -> Dict:
+    """
+    Cache entry for a job URL: fresh entries cost no I/O, stale ones are
+    revalidated (ETag / Last-Modified), missing ones are downloaded.
+    """
+    canonical_url = canonicalize_url(url)
+    cache = get_job_cache()
+    entry = cache.get(canonical_url)
+    if entry and cache.is_fresh(entry):
+        cache.count("fresh")
+        return entry
+
+    resp = get_session().get(canonical_url, headers=conditional_headers(entry), timeout=timeout)
+    if resp.status_code != 304:
+        resp.raise_for_status()
+
+    entry = updated_entry(canonical_url, entry, resp.status_code, resp.headers, resp.text)
+    cache.count("revalidated" if resp.status_code == 304 else "download")
+    cache.put(canonical_url, entry)
+    return entry
+
+
+async def fetch_page_async(url: str) -> Dict:
+    """Non-blocking variant of fetch_page using the shared async HTTP client"""
+    canonical_url = canonicalize_url(url)
+    cache = get_job_cache()
+    entry = await run_blocking(cache.get, canonical_url)
+    if entry and cache.is_fresh(entry):
+        cache.count("fresh")
+        return entry
+
+    async with FETCH_SLOTS:
+        resp = await get_http_client().get(canonical_url, headers=conditional_headers(entry))
+    if resp.status_code != 304:
+        resp.raise_for_status()
+
+    entry = updated_entry(canonical_url, entry, resp.status_code, resp.headers, resp.text)
+    cache.count("revalidated" if resp.status_code == 304 else "download")
+    await run_blocking(cache.put, canonical_url, entry)
+    return entry
+
+
+def remember_job_data(entry: Dict, job_data: Dict):
+    """Store the extracted title/description so a cached page skips parsing and LLM extraction"""
+    get_job_cache().put(entry['url'], {**entry, 'job_data': job_data})
@@ -4,10 +4,6 @@ import time
 import json
 import re
 from urllib.parse import urlparse
-from collections import Counter
-
-import requests
-from bs4 import BeautifulSoup
 
 import nltk
 from nltk.corpus import stopwords
@@ -15,8 +11,22 @@ from nltk.corpus import stopwords
 import google.generativeai as genai
 from dotenv import load_dotenv
 
-from typing import Dict, List
-from rag_core import analyze_query_focus, search_assessments
+from typing import Dict, List, Optional
+from rag_core import (
+    analyze_query_focus,
+    analyze_query_focus_async,
+    finalize_query_analysis,
+    parse_duration_max,
+    search_assessments
+)
+from retrieval_engine import RetrievalEngine
+from gemini_client import generate_text, agenerate_text
+from async_pipeline import run_blocking
+from job_fetcher import fetch_page, fetch_page_async, remember_job_data
+from html_extract import extract_job_page
+from text_budget import budget_html, budget_text
+from skill_gazetteer import get_skill_gazetteer
+from query_analyzer import BEHAVIORAL_LEXICON, get_query_analyzer, match_terms, parse_job_level
 
 load_dotenv()
 API_KEY = os.getenv("GOOGLE_API_KEY")
@@ -26,45 +36,24 @@ if not API_KEY:
 genai.configure(api_key=API_KEY)
 client = genai.GenerativeModel("gemini-2.5-flash")
 
+# Bump when a prompt template changes so cached responses are not reused
+JOB_DATA_PROMPT_VERSION = "job_data/v2"
+SKILLS_PROMPT_VERSION = "skills/v1"
+JOB_ANALYSIS_PROMPT_VERSION = "job_analysis/v1"
+
+# "fused": one LLM call returns skills + query analysis for a job posting;
+# "sequential": skills call, then analyze_query_focus on the joined skills;
+# "offline": skill gazetteer + local query analyzer, no LLM call at all
+URL_ANALYSIS_MODE = os.getenv("URL_ANALYSIS_MODE", "fused").lower()
+
 try:
     nltk.data.find("corpora/stopwords")
 except LookupError:
     nltk.download("stopwords")
 
-from collections import Counter
-import numpy as np
-
-
-def extract_common_skills(skills: list[str], emb_model, top_k=15):
-    """
-    Dynamically determine 'common' or dominant skill clusters for the JD.
-    Uses frequency + embedding similarity to group related skills.
-    """
-    # Step 1: Normalize and count frequency
-    cleaned = [s.lower().strip() for s in skills]
-    freq = Counter(cleaned)
-
-    # Step 2: Compute embeddings for each skill
-    embs = np.array([emb_model(s) for s in cleaned])
-
-    # Step 3: Cluster by cosine similarity
-    common_indices = []
-    for i, e1 in enumerate(embs):
-        sims = np.dot(embs, e1) / (np.linalg.norm(embs, axis=1) * np.linalg.norm(e1) + 1e-6)
-        if np.mean(sims) > 0.65:  # Adjust threshold
-            common_indices.append(i)
-
-    # Step 4: Select top-k frequent + central skills
-    ranked = [skill for skill, _ in freq.most_common(top_k)]
-    dynamic_common = list(set([cleaned[i] for i in common_indices] + ranked))
-    return dynamic_common
-
-
-def extract_job_data_llm(html: str) -> dict:
-    """LLM-based fallback for extracting job data from raw HTML."""
-    prompt = """
+JOB_DATA_PROMPT = """
     You are an expert web parser.
-    Given the HTML of a job page, extract:
+    Given the visible text of a job page, extract:
     1. Job Title
     2. Company (if present)
     3. Job Description (main text)
@@ -74,22 +63,45 @@ def extract_job_data_llm(html: str) -> dict:
 
     Only return the JSON object, nothing else.
     """
+
+def parse_job_data_output(text_output: str) -> dict:
+    text_output = text_output.replace("```json", "").replace("```", "")
+    return json.loads(text_output)
+
+
+def extract_job_data_llm(html: str) -> dict:
+    """LLM-based fallback for extracting job data from raw HTML."""
+    page_text = budget_html(html)
     try:
-        response = client.generate_content(f"{prompt}\n\nHTML:\n{html[:8000]}")
-        text_output = response.text.strip().replace("```json", "").replace("```", "")
-        job_data = json.loads(text_output)
-        return job_data
+        text_output = generate_text(
+            client, f"{JOB_DATA_PROMPT}\n\nPAGE TEXT:\n{page_text}", JOB_DATA_PROMPT_VERSION,
+            cache_input=page_text
+        )
+        return parse_job_data_output(text_output)
     except Exception as e:
         print(f" LLM extraction failed: {e}.")
         return {"title": None, "company": None, "description": None}
 
 
-def extract_skills_llm(job_data: dict, top_k: int = 25) -> list[str]:
-    """Extract key technical + soft skills from structured job data using LLM."""
+async def extract_job_data_llm_async(html: str) -> dict:
+    """Non-blocking variant of extract_job_data_llm."""
+    page_text = await run_blocking(budget_html, html)
+    try:
+        text_output = await agenerate_text(
+            client, f"{JOB_DATA_PROMPT}\n\nPAGE TEXT:\n{page_text}", JOB_DATA_PROMPT_VERSION,
+            cache_input=page_text
+        )
+        return parse_job_data_output(text_output)
+    except Exception as e:
+        print(f" LLM extraction failed: {e}.")
+        return {"title": None, "company": None, "description": None}
+
+
+def build_skills_prompt(job_data: dict, top_k: int) -> str:
     title = job_data.get("title", "")
-    description = job_data.get("description", "")
+    description = budget_text(job_data.get("description") or "")
 
-    prompt = f"""
+    return f"""
     You are an expert HR and AI analyst.
     Analyze the following job posting and extract the top {top_k} most important skills.
 
@@ -99,73 +111,255 @@ def extract_skills_llm(job_data: dict, top_k: int = 25) -> list[str]:
     - Job-specific domain expertise (e.g., robotics, research, automation)
 
     Job Title: {title}
-    Job Description: {description[:7000]}
+    Job Description: {description}
 
     Return strictly valid JSON:
     {{ "skills": ["skill1", "skill2", "skill3", ...] }}
     """
+
+
+def parse_skills_output(text_output: str) -> list[str]:
+    text_output = text_output.replace("```json", "").replace("```", "")
+    match = re.search(r"\{.*\}", text_output, re.DOTALL)
+    if match:
+        text_output = match.group(0)
+    data = json.loads(text_output)
+    return [s.strip() for s in data.get("skills", []) if len(s.strip()) > 2]
+
+
+def extract_skills_llm(job_data: dict, top_k: int = 25) -> list[str]:
+    """Extract key technical + soft skills from structured job data using LLM."""
+    try:
+        text_output = generate_text(client, build_skills_prompt(job_data, top_k), SKILLS_PROMPT_VERSION)
+        return parse_skills_output(text_output)
+    except Exception as e:
+        print(f" LLM skill extraction failed: {e}, using the skill gazetteer")
+        return get_skill_gazetteer().extract(posting_text(job_data), top_k)
+
+
+async def extract_skills_llm_async(job_data: dict, top_k: int = 25) -> list[str]:
+    """Non-blocking variant of extract_skills_llm."""
     try:
-        response = client.generate_content(prompt)
-        text_output = response.text.strip().replace("```json", "").replace("```", "")
-        match = re.search(r"\{.*\}", text_output, re.DOTALL)
-        if match:
-            text_output = match.group(0)
-        data = json.loads(text_output)
-        return [s.strip() for s in data.get("skills", []) if len(s.strip()) > 2]
+        text_output = await agenerate_text(client, build_skills_prompt(job_data, top_k), SKILLS_PROMPT_VERSION)
+        return parse_skills_output(text_output)
     except Exception as e:
-        print(f" LLM skill extraction failed: {e}")
-        return extract_common_skills(description, top_k)
+        print(f" LLM skill extraction failed: {e}, using the skill gazetteer")
+        return get_skill_gazetteer().extract(posting_text(job_data), top_k)
+
+
+def posting_text(job_data: dict) -> str:
+    """Description, or the budgeted page text when HTML extraction found none"""
+    return job_data.get("description") or job_data.get("page_text") or ""
+
 
+def build_job_analysis_prompt(job_data: dict, top_k: int) -> str:
+    title = job_data.get("title", "")
+    description = budget_text(posting_text(job_data))
+
+    return f"""
+    You are an expert HR and AI analyst preparing a search for pre-employment assessments.
+    Analyze the following job posting.
 
-def fetch_job_description(url: str, timeout: int = 10) -> dict:
+    Job Title: {title}
+    Job Posting: {description}
+
+    Return strictly valid JSON with these keys:
+    {{
+      "title": "job title as written in the posting",
+      "skills": ["the {top_k} most important skills: technical, soft and domain expertise"],
+      "primary_focus": "TECHNICAL or BEHAVIORAL or BALANCED",
+      "specificity": "HIGHLY_SPECIFIC or MODERATE or BROAD",
+      "technical_skills": ["technical skills, empty if the role is behavioral"],
+      "soft_skills": ["soft skills, empty if the role is technical"],
+      "job_level": "Entry/Junior/Mid-level/Senior/Executive/Manager or null",
+      "duration_max": "maximum assessment length in minutes if the posting states one, else null"
+    }}
+    """
+
+
+def skill_list(value) -> str:
+    if isinstance(value, list):
+        return ", ".join(str(v).strip() for v in value if str(v).strip())
+    return str(value or "").strip()
+
+
+def parse_job_analysis_output(text_output: str, job_data: dict) -> dict:
+    """Skills + a query analysis in the same shape analyze_query_focus returns"""
+    text_output = text_output.replace("```json", "").replace("```", "")
+    match = re.search(r"\{.*\}", text_output, re.DOTALL)
+    if match:
+        text_output = match.group(0)
+    data = json.loads(text_output)
+
+    skills = [str(s).strip() for s in data.get("skills", []) if len(str(s).strip()) > 2]
+    if not skills:
+        raise ValueError("no skills in fused analysis")
+    skills_query = ", ".join(skills)
+
+    focus = str(data.get("primary_focus", "")).upper()
+    specificity = str(data.get("specificity", "")).upper()
+    level = data.get("job_level")
+
+    analysis = {
+        'primary_focus': focus if focus in ('TECHNICAL', 'BEHAVIORAL', 'BALANCED') else 'BALANCED',
+        'specificity': specificity if specificity in ('HIGHLY_SPECIFIC', 'MODERATE', 'BROAD') else 'MODERATE',
+        'technical_skills': skill_list(data.get("technical_skills")),
+        'soft_skills': skill_list(data.get("soft_skills")),
+        'job_level': level if level and str(level).lower() not in ("null", "not specified") else None,
+        'duration_max': parse_duration_max(data.get("duration_max")),
+        'analysis_source': 'gemini_fused'
+    }
+    title = job_data.get("title")
+    if not title or title == "Unknown Title":
+        title = data.get("title") or title
+
+    return {
+        'title': title,
+        'skills': skills,
+        'skills_query': skills_query,
+        'query_analysis': finalize_query_analysis(skills_query, analysis)
+    }
+
+
+def sequential_job_analysis(job_data: dict, skills: list[str], query_analysis: dict) -> dict:
+    skills_query = ", ".join(skills)
+    return {
+        'title': job_data.get("title"),
+        'skills': skills,
+        'skills_query': skills_query,
+        'query_analysis': query_analysis
+    }
+
+
+def offline_job_analysis(job_data: dict, top_k: int = 20, engine: Optional[RetrievalEngine] = None) -> dict:
+    """Gazetteer skills + local query analysis; no network calls"""
+    skills = get_skill_gazetteer().extract(f"{job_data.get('title') or ''}\n{posting_text(job_data)}", top_k)
+    if not skills:
+        skills = [job_data.get("title") or "general aptitude"]
+    skills_query = ", ".join(skills)
+
+    # The analyzer only decides focus and level; the search text is the gazetteer's own
+    # catalog-aligned skills, split into soft skills and everything else
+    analysis = get_query_analyzer().analyze(skills_query, engine)
+    soft_skills = [skill for skill in skills if match_terms(skill, BEHAVIORAL_LEXICON)]
+    analysis['technical_skills'] = ", ".join(skill for skill in skills if skill not in soft_skills)
+    analysis['soft_skills'] = ", ".join(soft_skills)
+    if analysis['job_level'] is None:
+        analysis['job_level'] = parse_job_level(job_data.get("title") or "")
+    return sequential_job_analysis(job_data, skills, finalize_query_analysis(skills_query, analysis))
+
+
+def analyze_job_posting(job_data: dict, top_k: int = 20, engine: Optional[RetrievalEngine] = None) -> dict:
+    """
+    Skills and query analysis for a job posting. In fused mode this is one LLM
+    call; on failure (or in sequential mode) it falls back to the skills call
+    followed by analyze_query_focus. Offline mode never calls the LLM.
+    """
+    if URL_ANALYSIS_MODE == "offline":
+        return offline_job_analysis(job_data, top_k, engine)
+    if URL_ANALYSIS_MODE == "fused":
+        try:
+            text_output = generate_text(client, build_job_analysis_prompt(job_data, top_k), JOB_ANALYSIS_PROMPT_VERSION)
+            return parse_job_analysis_output(text_output, job_data)
+        except Exception as e:
+            print(f" Fused job analysis failed ({e}), falling back to sequential calls")
+
+    job_data = {**job_data, "description": posting_text(job_data)}
+    skills = extract_skills_llm(job_data, top_k=top_k)
+    return sequential_job_analysis(job_data, skills, analyze_query_focus(", ".join(skills), engine))
+
+
+async def analyze_job_posting_async(job_data: dict, top_k: int = 20,
+                                    engine: Optional[RetrievalEngine] = None) -> dict:
+    """Non-blocking variant of analyze_job_posting."""
+    if URL_ANALYSIS_MODE == "offline":
+        return await run_blocking(offline_job_analysis, job_data, top_k, engine)
+    if URL_ANALYSIS_MODE == "fused":
+        try:
+            text_output = await agenerate_text(
+                client, build_job_analysis_prompt(job_data, top_k), JOB_ANALYSIS_PROMPT_VERSION
+            )
+            return parse_job_analysis_output(text_output, job_data)
+        except Exception as e:
+            print(f" Fused job analysis failed ({e}), falling back to sequential calls")
+
+    job_data = {**job_data, "description": posting_text(job_data)}
+    skills = await extract_skills_llm_async(job_data, top_k=top_k)
+    return sequential_job_analysis(job_data, skills, await analyze_query_focus_async(", ".join(skills), engine))
+
+
+def parse_job_page(html: str) -> dict:
+    """
+    Extract title + JD from job page HTML (fast lexbor path, BeautifulSoup fallback).
+    description is None when no container holds enough text.
+    """
+    job_data = extract_job_page(html)
+    if job_data["description"]:
+        print(" Extracted job description from <div class='mt4'> successfully.")
+    return job_data
+
+
+def fetch_job_description(url: str, timeout: int = 10, llm_fallback: bool = True) -> dict:
     """
     Scrape a LinkedIn or similar job posting and extract:
     - Job title
     - Job description (from <div class="mt4"> or similar)
+    Pages and extractions are cached on disk per canonical URL (see job_fetcher).
+    Without llm_fallback, a page with no description container comes back with
+    its budgeted visible text as "page_text" instead of an extra LLM call.
     """
+    try:
+        page = fetch_page(url, timeout=timeout)
+    except Exception as e:
+        raise RuntimeError(f"Failed to fetch URL: {e}")
+    if page.get("job_data"):
+        return page["job_data"]
+
+    job_data = parse_job_page(page["html"])
+    if not job_data["description"] and not llm_fallback:
+        return {**job_data, "page_text": budget_html(page["html"])}
+    if not job_data["description"]:
+        # Fallback to LLM extraction
+        print(" Fallback to LLM-based extraction...")
+        llm_data = extract_job_data_llm(page["html"])
+        if not llm_data.get("title"):
+            llm_data["title"] = job_data["title"]
+        job_data = llm_data
+
+    remember_job_data(page, job_data)
+    return job_data
 
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
-        )
-    }
 
+async def fetch_job_description_async(url: str, llm_fallback: bool = True) -> dict:
+    """
+    Non-blocking variant of fetch_job_description.
+    Uses the shared async HTTP client; HTML parsing runs in the executor.
+    """
     try:
-        resp = requests.get(url, headers=headers, timeout=timeout)
-        resp.raise_for_status()
+        page = await fetch_page_async(url)
     except Exception as e:
         raise RuntimeError(f"Failed to fetch URL: {e}")
-
-    soup = BeautifulSoup(resp.text, "html.parser")
-    for tag in soup(["script", "style", "noscript"]):
-        tag.decompose()
-
-    # --- Extract title ---
-    title_tag = (
-        soup.select_one("h1")
-        or soup.select_one("h2[class*=top-card-layout__title]")
-        or soup.find("title")
-    )
-    job_title = title_tag.get_text(strip=True) if title_tag else "Unknown Title"
-
-    # --- Extract JD from <div class="mt4"> or fallback containers ---
-    jd_div = soup.select_one("div.mt4") or soup.select_one("div[class*=description]")
-    if jd_div:
-        jd_text = jd_div.get_text(separator="\n", strip=True)
-        if len(jd_text.split()) > 50:
-            print(" Extracted job description from <div class='mt4'> successfully.")
-            return {"title": job_title, "description": jd_text}
-
-    # Fallback to LLM extraction
-    print(" Fallback to LLM-based extraction...")
-    job_data = extract_job_data_llm(resp.text)
-    if not job_data.get("title"):
-        job_data["title"] = job_title
+    if page.get("job_data"):
+        return page["job_data"]
+
+    job_data = await run_blocking(parse_job_page, page["html"])
+    if not job_data["description"] and not llm_fallback:
+        return {**job_data, "page_text": await run_blocking(budget_html, page["html"])}
+    if not job_data["description"]:
+        # Fallback to LLM extraction
+        print(" Fallback to LLM-based extraction...")
+        llm_data = await extract_job_data_llm_async(page["html"])
+        if not llm_data.get("title"):
+            llm_data["title"] = job_data["title"]
+        job_data = llm_data
+
+    await run_blocking(remember_job_data, page, job_data)
     return job_data
 
 
-def get_recommendations_v2(skills_query: str, min_results: int = 5, max_results: int = 10) -> Dict:
+def get_recommendations_v2(skills_query: str, min_results: int = 5, max_results: int = 10,
+                           engine: Optional[RetrievalEngine] = None,
+                           query_analysis: Optional[Dict] = None) -> Dict:
     response = {
         'original_query': skills_query,
         'status': 'error',
@@ -176,13 +370,15 @@ def get_recommendations_v2(skills_query: str, min_results: int = 5, max_results:
     }
 
     try:
-        query_analysis = analyze_query_focus(skills_query)
+        if query_analysis is None:
+            query_analysis = analyze_query_focus(skills_query, engine)
         response['query_analysis'] = query_analysis
 
         assessments, distribution = search_assessments(
             query_analysis,
             min_total=min_results,
-            max_total=max_results
+            max_total=max_results,
+            engine=engine
         )
 
         response.update({
@@ -205,11 +401,11 @@ def safe_filename_from_url(url: str) -> str:
     return f"{domain}_{path[:80]}_{timestamp}.csv"
 
 
-def process_job_url(url: str, output_file: str | None = None, rate_limit: float = 1.0):
+def process_job_url(url: str, output_file: str | None = None):
     print(f"\nFetching job posting: {url}")
 
-    job_data = fetch_job_description(url)
-    jd_text = job_data.get("description", "")
+    job_data = fetch_job_description(url, llm_fallback=URL_ANALYSIS_MODE == "sequential")
+    jd_text = posting_text(job_data)
 
     if not jd_text or len(jd_text.strip()) < 30:
         raise RuntimeError("Extracted job description is too short or invalid.")
@@ -217,15 +413,15 @@ def process_job_url(url: str, output_file: str | None = None, rate_limit: float
     print(f"Extracted Job Title: {job_data.get('title', 'N/A')}")
     print(f"Extracted {len(jd_text.split())} words from job description.\n")
 
-    print("Extracting skills using LLM...")
-    significant_skills = extract_skills_llm(job_data, top_k=25)
-    print("Extracted skills/keywords:", ", ".join(significant_skills))
+    print(f"Analyzing job posting using LLM ({URL_ANALYSIS_MODE})...")
+    job_analysis = analyze_job_posting(job_data, top_k=25)
+    print("Extracted skills/keywords:", ", ".join(job_analysis['skills']))
 
     print("\nRunning RAG pipeline using extracted skills only...")
-    skills_query = ", ".join(significant_skills)
+    skills_query = job_analysis['skills_query']
     print(f"Skills Query: {skills_query[:250]}{'...' if len(skills_query) > 250 else ''}")
 
-    recommendations = get_recommendations_v2(skills_query)
+    recommendations = get_recommendations_v2(skills_query, query_analysis=job_analysis['query_analysis'])
 
     if output_file is None:
         filename = safe_filename_from_url(url)
@@ -245,7 +441,6 @@ def process_job_url(url: str, output_file: str | None = None, rate_limit: float
             writer.writerow([url, f"Error: {recommendations.get('error_message', 'No results')}"])
 
     print(f"\nResults saved to: {output_file}\n")
-    time.sleep(rate_limit)
 
     return recommendations
 
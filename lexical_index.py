@@ -0,0 +1,138 @@
+import os
+import re
+import math
+from collections import Counter
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from embedding_artifact import ARTIFACT_DIR
+
+LEXICAL_INDEX_FILE = "lexical_index.npz"
+# Weight of the normalized BM25 score added to the cosine similarity (0 disables)
+HYBRID_LEXICAL_WEIGHT = float(os.getenv("HYBRID_LEXICAL_WEIGHT", 0.15))
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Keeps technology tokens intact: c++, c#, .net, asp.net, node.js
+TOKEN_PATTERN = re.compile(r"[a-z0-9+#]+(?:\.[a-z0-9+#]+)*")
+STOP_WORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'for', 'from', 'has', 'have', 'in',
+    'is', 'it', 'its', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'which', 'will',
+    'with', 'who', 'you', 'your', 'their', 'test', 'tests', 'assessment', 'assessments'
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased unigrams plus adjacent bigrams ("spring boot", "sql server")"""
+    words = [w for w in TOKEN_PATTERN.findall(str(text).lower()) if w not in STOP_WORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class LexicalIndex:
+    """
+    BM25 over assessment name + description, stored as term -> postings arrays.
+    Every posting already holds its final BM25 weight, so scoring a query is a
+    handful of slice-adds into one score vector per query.
+    """
+
+    def __init__(self, ids: List[str], vocabulary: List[str],
+                 term_offsets: np.ndarray, doc_rows: np.ndarray, weights: np.ndarray):
+        self.ids = list(ids)
+        self.vocabulary = list(vocabulary)
+        self.term_index = {term: i for i, term in enumerate(self.vocabulary)}
+        self.term_offsets = term_offsets
+        self.doc_rows = doc_rows
+        self.weights = weights
+
+    @classmethod
+    def build(cls, ids: List[str], texts: List[str]) -> "LexicalIndex":
+        doc_terms = [Counter(tokenize(text)) for text in texts]
+        lengths = np.array([sum(c.values()) for c in doc_terms], dtype=np.float32)
+        avg_length = float(lengths.mean()) if len(lengths) else 0.0
+
+        postings: Dict[str, List] = {}
+        for row, counts in enumerate(doc_terms):
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((row, tf))
+
+        vocabulary = sorted(postings)
+        offsets = [0]
+        doc_rows, weights = [], []
+        n_docs = len(texts)
+        for term in vocabulary:
+            entries = postings[term]
+            idf = math.log(1 + (n_docs - len(entries) + 0.5) / (len(entries) + 0.5))
+            for row, tf in entries:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[row] / (avg_length or 1.0))
+                doc_rows.append(row)
+                weights.append(idf * tf * (BM25_K1 + 1) / (tf + norm))
+            offsets.append(len(doc_rows))
+
+        return cls(ids, vocabulary,
+                   np.array(offsets, dtype=np.int64),
+                   np.array(doc_rows, dtype=np.int32),
+                   np.array(weights, dtype=np.float32))
+
+    def save(self, path: str):
+        np.savez(path,
+                 ids=np.array(self.ids),
+                 vocabulary=np.array(self.vocabulary),
+                 term_offsets=self.term_offsets,
+                 doc_rows=self.doc_rows,
+                 weights=self.weights)
+
+    @classmethod
+    def load(cls, path: str) -> "LexicalIndex":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['ids'].tolist(), data['vocabulary'].tolist(),
+                       data['term_offsets'], data['doc_rows'], data['weights'])
+
+    def reordered(self, ids: List[str]) -> "LexicalIndex":
+        """Same index with rows renumbered to match another id order (unknown ids dropped)"""
+        if list(ids) == self.ids:
+            return self
+        position = {row_id: i for i, row_id in enumerate(ids)}
+        mapping = np.array([position.get(row_id, -1) for row_id in self.ids], dtype=np.int32)
+        new_rows = mapping[self.doc_rows]
+        keep = new_rows >= 0
+        term_of = np.repeat(np.arange(len(self.vocabulary)), np.diff(self.term_offsets))
+        counts = np.bincount(term_of[keep], minlength=len(self.vocabulary))
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return LexicalIndex(ids, self.vocabulary, offsets, new_rows[keep], self.weights[keep])
+
+    def score(self, texts: List[str]) -> np.ndarray:
+        """(len(texts), n_docs) BM25 scores, each row scaled so its best document is 1"""
+        scores = np.zeros((len(texts), len(self.ids)), dtype=np.float32)
+        for q, text in enumerate(texts):
+            for term in set(tokenize(text)):
+                t = self.term_index.get(term)
+                if t is None:
+                    continue
+                start, end = self.term_offsets[t], self.term_offsets[t + 1]
+                # A term lists each document once, so a plain fancy-index add is safe
+                scores[q, self.doc_rows[start:end]] += self.weights[start:end]
+
+        best = scores.max(axis=1, keepdims=True) if len(self.ids) else np.ones((len(texts), 1))
+        best[best == 0] = 1.0
+        return scores / best
+
+
+def lexical_text(metadata: Dict) -> str:
+    """Fields indexed lexically: name and description only"""
+    return f"{metadata.get('assessment_name', '')} {metadata.get('description', '')}"
+
+
+def write_lexical_index(ids: List[str], metadatas: List[Dict], artifact_dir: str = ARTIFACT_DIR) -> LexicalIndex:
+    os.makedirs(artifact_dir, exist_ok=True)
+    index = LexicalIndex.build(ids, [lexical_text(m) for m in metadatas])
+    index.save(os.path.join(artifact_dir, LEXICAL_INDEX_FILE))
+    return index
+
+
+def load_lexical_index(artifact_dir: str = ARTIFACT_DIR) -> Optional[LexicalIndex]:
+    path = os.path.join(artifact_dir, LEXICAL_INDEX_FILE)
+    if not os.path.exists(path):
+        return None
+    return LexicalIndex.load(path)
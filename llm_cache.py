@@ -0,0 +1,212 @@
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Cache setup
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./cache/llm_cache.sqlite3")
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 2048))
+# How often the in-memory layer re-reads invalidations made by other processes
+LLM_CACHE_INVALIDATION_POLL_SECONDS = float(os.getenv("LLM_CACHE_INVALIDATION_POLL_SECONDS", 5))
+
+
+def normalize_input(text: str) -> str:
+    """Collapse whitespace and case so trivially different inputs share an entry"""
+    return " ".join(str(text).split()).lower()
+
+
+def make_cache_key(prompt_version: str, model_name: str, text: str) -> str:
+    """Hash of prompt template version, model name and normalized input"""
+    payload = "\x1f".join([prompt_version, model_name, normalize_input(text)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Two-level memoization for LLM responses.
+    An in-process LRU with TTL sits in front of a SQLite store that survives
+    restarts and is shared by every worker process on the host. Invalidations
+    are recorded in SQLite as well, so every worker drops its in-memory copies
+    within LLM_CACHE_INVALIDATION_POLL_SECONDS.
+    """
+
+    def __init__(self,
+                 db_path: str = LLM_CACHE_PATH,
+                 ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        # key -> (value, expires_at, prompt_version, stored_at)
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # prompt_version -> time of its last invalidation (any process)
+        self._invalidated: Dict[str, float] = {}
+        self._invalidations_read_at = 0.0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        # WAL lets several uvicorn workers read while one writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                prompt_version TEXT NOT NULL,
+                model_name TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_cache_prompt_version ON llm_cache (prompt_version)"
+        )
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache_invalidations (
+                prompt_version TEXT PRIMARY KEY,
+                invalidated_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def _read_invalidations(self, now: float):
+        # Caller holds the lock
+        if now - self._invalidations_read_at < LLM_CACHE_INVALIDATION_POLL_SECONDS:
+            return
+        self._invalidations_read_at = now
+        self._invalidated = dict(self._conn.execute(
+            "SELECT prompt_version, invalidated_at FROM llm_cache_invalidations"
+        ).fetchall())
+
+    def _remember(self, key: str, value: str, expires_at: float, prompt_version: str, stored_at: float):
+        self._memory[key] = (value, expires_at, prompt_version, stored_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._read_invalidations(now)
+                value, expires_at, prompt_version, stored_at = entry
+                if expires_at > now and stored_at > self._invalidated.get(prompt_version, 0.0):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+                self.expirations += 1
+
+            row = self._conn.execute(
+                "SELECT value, created_at, prompt_version FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created_at, prompt_version = row
+            expires_at = created_at + self.ttl_seconds
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._remember(key, value, expires_at, prompt_version, created_at)
+            self.disk_hits += 1
+            return value
+
+    def set(self, key: str, value: str, prompt_version: str, model_name: str):
+        """Store a value in memory and in the durable store"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now + self.ttl_seconds, prompt_version, now)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, prompt_version, model_name, value, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, prompt_version, model_name, value, now)
+            )
+            self._conn.commit()
+
+    def invalidate(self, prompt_version: str) -> int:
+        """
+        Drop every entry produced by one prompt template version, here and (via
+        the invalidation record) in the memory layer of every other process
+        """
+        now = time.time()
+        with self._lock:
+            stale = [k for k, (_, _, version, _) in self._memory.items() if version == prompt_version]
+            for key in stale:
+                del self._memory[key]
+            self._invalidated[prompt_version] = now
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache_invalidations (prompt_version, invalidated_at) VALUES (?, ?)",
+                (prompt_version, now)
+            )
+            cursor = self._conn.execute(
+                "DELETE FROM llm_cache WHERE prompt_version = ?", (prompt_version,)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def stats(self) -> Dict:
+        """Hit/miss/eviction counters"""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                'memory_entries': len(self._memory),
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0
+            }
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """Return the process-wide LLM cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache()
+    return _cache
+
+
+if __name__ == "__main__":
+    # Usage: python llm_cache.py [stats | invalidate <prompt_version>]
+    cache = get_llm_cache()
+    if len(sys.argv) == 3 and sys.argv[1] == "invalidate":
+        removed = cache.invalidate(sys.argv[2])
+        print(f" Removed {removed} cached responses for prompt version '{sys.argv[2]}'")
+    else:
+        rows = cache._conn.execute(
+            "SELECT prompt_version, model_name, COUNT(*) FROM llm_cache GROUP BY prompt_version, model_name"
+        ).fetchall()
+        for prompt_version, model_name, count in rows:
+            print(f" {prompt_version} [{model_name}]: {count} entries")
@@ -1,20 +1,46 @@
 import os
 import json
-import time
 import io
+import asyncio
 import csv
 import pandas as pd
-from typing import List, Optional, Dict, Any, Union
-from fastapi import FastAPI, HTTPException, File, UploadFile, Form
-from fastapi.responses import StreamingResponse, JSONResponse
+from contextlib import asynccontextmanager
+from typing import List, Optional, Dict, Any, Union, AsyncIterator
+from fastapi import FastAPI, HTTPException, File, UploadFile, Form, Request
+from fastapi.responses import StreamingResponse, JSONResponse, Response
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 
 
-from rag_core import get_recommendations
-from job_rag_new import fetch_job_description, extract_skills_llm
+from rag_core import get_recommendations_async, CACHEABLE_ANALYSIS_SOURCES, QUERY_FOCUS_PROMPT_VERSION
+from query_analyzer import QUERY_ANALYZER_MODE
+from response_cache import get_response_cache, etag_matches
+from semantic_cache import get_semantic_cache
+from skill_gazetteer import get_skill_gazetteer
+from job_fetcher import get_job_cache
+from job_rag_new import URL_ANALYSIS_MODE, fetch_job_description_async, analyze_job_posting_async, posting_text
+from retrieval_engine import get_engine
+from batch_analysis import analyze_queries_batch_async, get_recommendations_batch_async, plan_batches
+from url_pipeline import run_url_pipeline
+import async_pipeline
 
-app = FastAPI(title="SHL Assessment Recommendation API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load Chroma + the embedding model once, before serving traffic
+    app.state.engine = await async_pipeline.run_blocking(get_engine)
+    await async_pipeline.run_blocking(get_skill_gazetteer)
+    yield
+    await async_pipeline.aclose_http_client()
+
+app = FastAPI(title="SHL Assessment Recommendation API", lifespan=lifespan)
+
+# Queries of one /recommend/file upload processed in parallel
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 8))
+# Largest query list accepted by /recommend/batch
+MAX_BATCH_QUERIES = int(os.getenv("MAX_BATCH_QUERIES", 100))
+# Largest URL list accepted by /recommend/urls
+MAX_BATCH_URLS = int(os.getenv("MAX_BATCH_URLS", 50))
 
 # --- CORS Middleware ---
 # crucial for allowing your Streamlit frontend to talk to this API
@@ -26,6 +52,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 class RecommendRequest(BaseModel):
@@ -34,6 +61,12 @@ class RecommendRequest(BaseModel):
 class UrlRecommendRequest(BaseModel):
     url: str
 
+class BatchRecommendRequest(BaseModel):
+    queries: List[str]
+
+class UrlsRecommendRequest(BaseModel):
+    urls: List[str]
+
 
 def map_test_type(type_code: Union[str, List[str], None]) -> List[str]:
     if not type_code:
@@ -72,7 +105,7 @@ def format_assessment_for_api(assessment: Dict[str, Any]) -> Dict[str, Any]:
         "name": assessment.get("assessment_name", ""),
         "adaptive_support": assessment.get("adaptive_support", "No"), # Default as it's missing in source
         "description": assessment.get("description", ""),
-        "duration": safe_duration(assessment.get("length_minutes")),
+        "duration": safe_duration(assessment.get("duration_minutes", assessment.get("length_minutes"))),
         "remote_support": assessment.get("remote_testing", "Yes"),
         "test_type": map_test_type(assessment.get("test_type", ""))
     }
@@ -80,15 +113,44 @@ def format_assessment_for_api(assessment: Dict[str, Any]) -> Dict[str, Any]:
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    engine = getattr(app.state, "engine", None)
+    return {
+        "status": "healthy",
+        "engine": engine.stats() if engine else None,
+        "response_cache": get_response_cache().stats(),
+        "semantic_cache": get_semantic_cache().stats(),
+        "job_page_cache": get_job_cache().stats()
+    }
+
+def response_cache_version(engine) -> str:
+    """Everything a cached /recommend body depends on besides the query itself"""
+    return "|".join([
+        str(engine.check_index()), engine.model_name, engine.encoder_backend,
+        QUERY_FOCUS_PROMPT_VERSION, QUERY_ANALYZER_MODE
+    ])
+
+def cached_json_response(body: bytes, etag: str, if_none_match: Optional[str]) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @app.post("/recommend")
-async def recommend(request: RecommendRequest):
+async def recommend(request: RecommendRequest, http_request: Request):
     if not request.query.strip():
          raise HTTPException(status_code=400, detail="Query cannot be empty")
 
+    cache = get_response_cache()
+    # May reopen a rebuilt index, so it runs off the event loop
+    version = await async_pipeline.run_blocking(response_cache_version, app.state.engine)
+    if_none_match = http_request.headers.get("if-none-match")
+
+    cached = cache.get(request.query, version)
+    if cached is not None:
+        return cached_json_response(*cached, if_none_match)
+
     try:
-        core_response = get_recommendations(request.query)
+        core_response = await get_recommendations_async(request.query, engine=app.state.engine)
         
         if core_response['status'] == 'error':
              print(f"RAG Core Error: {core_response.get('error_message')}")
@@ -98,13 +160,44 @@ async def recommend(request: RecommendRequest):
             format_assessment_for_api(rec) for rec in core_response.get('recommendations', [])
         ]
 
-        return {"recommended_assessments": formatted_recs}
+        body = json.dumps({"recommended_assessments": formatted_recs}).encode("utf-8")
+        # Answers built on the generic fallback analysis (Gemini failed) are not pinned
+        analysis_source = core_response.get('query_analysis', {}).get('analysis_source')
+        if analysis_source not in CACHEABLE_ANALYSIS_SOURCES + ('semantic_cache',):
+            return Response(content=body, media_type="application/json", headers={"Cache-Control": "no-store"})
+        etag = cache.put(request.query, version, body)
+        return cached_json_response(body, etag, if_none_match)
     except HTTPException as he:
         raise he
     except Exception as e:
         print(f"Unexpected error in /recommend: {e}")
         raise HTTPException(status_code=500, detail="An unexpected error occurred.")
 
+@app.post("/recommend/batch")
+async def recommend_batch(request: BatchRecommendRequest):
+    queries = [q.strip() for q in request.queries]
+    if not queries or not all(queries):
+        raise HTTPException(status_code=400, detail="Queries cannot be empty")
+    if len(queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_QUERIES} queries per request")
+
+    core_responses = await get_recommendations_batch_async(queries, engine=app.state.engine)
+
+    results = []
+    for query, core_response in zip(queries, core_responses):
+        if core_response['status'] == 'error':
+            print(f"RAG Core Error: {core_response.get('error_message')}")
+            results.append({"query": query, "error": "Internal recommendation engine error."})
+            continue
+        results.append({
+            "query": query,
+            "recommended_assessments": [
+                format_assessment_for_api(rec) for rec in core_response.get('recommendations', [])
+            ]
+        })
+
+    return {"results": results}
+
 # --- ADDITIONAL ENDPOINTS (For your full Frontend features) ---
 
 @app.post("/recommend/url")
@@ -114,18 +207,20 @@ async def recommend_from_url(request: UrlRecommendRequest):
         raise HTTPException(status_code=400, detail="URL cannot be empty")
 
     try:
-        # 1. Fetch JD
-        job_data = fetch_job_description(url)
-        jd_text = job_data.get("description", "")
+        # 1. Fetch JD (fused/offline modes read page text themselves instead of a separate LLM extraction)
+        job_data = await fetch_job_description_async(url, llm_fallback=URL_ANALYSIS_MODE == "sequential")
+        jd_text = posting_text(job_data)
         if not jd_text or len(jd_text) < 50:
              raise HTTPException(status_code=422, detail="Could not extract sufficient text from URL.")
 
-        # 2. Extract skills
-        extracted_skills = extract_skills_llm(job_data, top_k=20)
-        skills_query = ", ".join(extracted_skills)
+        # 2. Extract skills + query analysis (one LLM call in fused mode, none offline)
+        job_analysis = await analyze_job_posting_async(job_data, top_k=20, engine=app.state.engine)
+        skills_query = job_analysis['skills_query']
 
         # 3. Get recommendations
-        core_response = get_recommendations(skills_query)
+        core_response = await get_recommendations_async(
+            skills_query, engine=app.state.engine, query_analysis=job_analysis['query_analysis']
+        )
         
         if core_response['status'] == 'error':
              raise HTTPException(status_code=500, detail=core_response.get('error_message'))
@@ -136,7 +231,7 @@ async def recommend_from_url(request: UrlRecommendRequest):
 
         return {
             "source_url": url,
-            "extracted_job_title": job_data.get('title'),
+            "extracted_job_title": job_analysis['title'],
             "extracted_query": skills_query,
             "recommended_assessments": formatted_recs
         }
@@ -145,6 +240,96 @@ async def recommend_from_url(request: UrlRecommendRequest):
         print(f"Error in URL processing: {e}")
         raise HTTPException(status_code=400, detail=f"Failed to process URL: {str(e)}")
 
+async def stream_url_results(urls: List[str], engine) -> AsyncIterator[str]:
+    """
+    One NDJSON line per URL, in completion order ("index" is the position in the request).
+    Successful lines use the /recommend/url field names; failed ones carry "error".
+    """
+    async for result in run_url_pipeline(urls, engine):
+        if result['status'] == 'error':
+            line = {
+                "index": result['index'],
+                "source_url": result['url'],
+                "status": "error",
+                "error": result['error_message']
+            }
+        else:
+            line = {
+                "index": result['index'],
+                "source_url": result['url'],
+                "status": "success",
+                "extracted_job_title": result['title'],
+                "extracted_query": result['skills_query'],
+                "recommended_assessments": [format_assessment_for_api(rec) for rec in result['recommendations']]
+            }
+        yield json.dumps(line) + "\n"
+
+@app.post("/recommend/urls")
+async def recommend_from_urls(request: UrlsRecommendRequest):
+    urls = [u.strip() for u in request.urls]
+    if not urls or not all(urls):
+        raise HTTPException(status_code=400, detail="URLs cannot be empty")
+    if len(urls) > MAX_BATCH_URLS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_URLS} URLs per request")
+
+    return StreamingResponse(stream_url_results(urls, app.state.engine), media_type="application/x-ndjson")
+
+def csv_line(row: List[Any]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(row)
+    return buffer.getvalue()
+
+def batch_rows(query: str, response: Dict[str, Any]) -> List[List[str]]:
+    """CSV rows for one query of a batch upload; failures are reported inline"""
+    if response['status'] != 'success':
+        return [[query, f"Error processing query: {response.get('error_message', 'unknown error')}"]]
+
+    recs = response.get('recommendations', [])
+    if not recs:
+        return [[query, "No recommendations found"]]
+    return [[query, rec.get('url', 'N/A')] for rec in recs]
+
+async def stream_batch_results(queries: List[str], engine) -> AsyncIterator[str]:
+    """
+    Analyze the queries one LLM batch at a time, start each batch's searches as soon
+    as its analysis arrives (up to BATCH_CONCURRENCY at once) and yield CSV rows in
+    input order as soon as each query (and everything before it) finishes.
+    """
+    yield csv_line(['Query', 'Assessment_url'])
+
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+    search_tasks: List[asyncio.Task] = []
+
+    async def run(query: str, query_analysis: Dict[str, Any]) -> Dict[str, Any]:
+        async with slots:
+            try:
+                return await get_recommendations_async(query, engine=engine, query_analysis=query_analysis)
+            except Exception as e:
+                return {'status': 'error', 'error_message': str(e), 'original_query': query}
+
+    async def run_chunk(chunk: List[str]) -> List[Any]:
+        # One LLM call per chunk instead of one per query; a failed chunk becomes error rows
+        try:
+            analyses = await analyze_queries_batch_async(chunk, engine)
+        except Exception as e:
+            print(f"Batch analysis failed for {len(chunk)} queries: {e}")
+            return [{'status': 'error', 'error_message': str(e), 'original_query': query} for query in chunk]
+        tasks = [asyncio.create_task(run(query, analysis)) for query, analysis in zip(chunk, analyses)]
+        search_tasks.extend(tasks)
+        return tasks
+
+    chunks = [[queries[i] for i in batch] for batch in plan_batches(queries)]
+    chunk_tasks = [asyncio.create_task(run_chunk(chunk)) for chunk in chunks]
+    try:
+        for chunk, chunk_task in zip(chunks, chunk_tasks):
+            for query, item in zip(chunk, await chunk_task):
+                response = await item if isinstance(item, asyncio.Task) else item
+                yield "".join(csv_line(row) for row in batch_rows(query, response))
+    finally:
+        # Client went away (or we finished): don't leave work running
+        for task in chunk_tasks + search_tasks:
+            task.cancel()
+
 @app.post("/recommend/file")
 async def process_batch_file(file: UploadFile = File(...)):
     try:
@@ -153,9 +338,9 @@ async def process_batch_file(file: UploadFile = File(...)):
         
         # 1. Read file into DataFrame
         if filename.endswith('.xlsx') or filename.endswith('.xls'):
-            df = pd.read_excel(io.BytesIO(contents))
+            df = await async_pipeline.run_blocking(pd.read_excel, io.BytesIO(contents))
         elif filename.endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(contents))
+            df = await async_pipeline.run_blocking(pd.read_csv, io.BytesIO(contents))
         else:
             raise HTTPException(status_code=400, detail="Invalid file type. Please upload .csv or .xlsx")
 
@@ -168,36 +353,13 @@ async def process_batch_file(file: UploadFile = File(...)):
         query_col_idx = cols_lower.index('query')
         query_col = df.columns[query_col_idx]
 
-        # 3. Process rows
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['Query', 'Assessment_url'])
-
-        unique_queries = df[query_col].dropna().unique().tolist()
-        
-        for query in unique_queries:
-            query_str = str(query).strip()
-            if not query_str:
-                continue
-                
-            response = get_recommendations(query_str)
-            
-            if response['status'] == 'success':
-                recs = response.get('recommendations', [])
-                if not recs:
-                     writer.writerow([query_str, "No recommendations found"])
-                else:
-                    for rec in recs:
-                        writer.writerow([query_str, rec.get('url', 'N/A')])
-            else:
-                 writer.writerow([query_str, "Error processing query"])
-            
-            time.sleep(0.05)
+        # 3. Process rows concurrently, streaming CSV rows back in input order
+        unique_queries = [str(q).strip() for q in df[query_col].dropna().unique().tolist()]
+        unique_queries = [q for q in unique_queries if q]
 
         # 4. Return as downloadable CSV
-        output.seek(0)
         return StreamingResponse(
-            iter([output.getvalue()]),
+            stream_batch_results(unique_queries, app.state.engine),
             media_type="text/csv",
             headers={"Content-Disposition": f"attachment; filename=processed_results.csv"}
         )
@@ -0,0 +1,288 @@
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# "local-first" (Gemini only when unsure), "gemini" (always) or "local" (never)
+QUERY_ANALYZER_MODE = os.getenv("QUERY_ANALYZER_MODE", "local-first").lower()
+# Local answers below this confidence are escalated to Gemini
+LOCAL_ANALYSIS_MIN_CONFIDENCE = float(os.getenv("LOCAL_ANALYSIS_MIN_CONFIDENCE", 0.6))
+# Use query embeddings against focus prototypes in addition to the lexicons
+LOCAL_ANALYSIS_USE_EMBEDDINGS = os.getenv("LOCAL_ANALYSIS_USE_EMBEDDINGS", "1") == "1"
+
+# |score| needed for TECHNICAL / BEHAVIORAL; anything closer to 0 is BALANCED
+FOCUS_THRESHOLD = 0.35
+# Share of the focus score taken from the lexicons (rest from embeddings)
+LEXICON_WEIGHT = 0.7
+# bge similarity gap between the two prototypes that counts as a clear signal
+EMBEDDING_MARGIN_SCALE = 0.08
+# Lexicon hits needed before the lexicon vote is fully trusted
+MIN_EVIDENCE = 2
+
+# Named tools / languages: strong technical signal and a sign of specificity
+TOOL_TERMS = [
+    'java', 'javascript', 'typescript', 'python', 'sql', 'mysql', 'postgresql', 'nosql', 'c++', 'c#',
+    '.net', 'asp.net', 'php', 'ruby', 'golang', 'scala', 'kotlin', 'swift', 'r programming',
+    'html', 'css', 'react', 'angular', 'node.js', 'spring', 'hibernate', 'django', 'flask',
+    'selenium', 'jenkins', 'docker', 'kubernetes', 'aws', 'azure', 'gcp', 'linux', 'unix',
+    'excel', 'tableau', 'power bi', 'sap', 'salesforce', 'hadoop', 'spark', 'tensorflow',
+    'pytorch', 'git', 'jira', 'rest api', 'microsoft office', 'powerpoint', 'seo'
+]
+TECHNICAL_TERMS = [
+    'programming', 'coding', 'developer', 'development', 'software', 'engineer', 'engineering',
+    'technical', 'technology', 'data', 'database', 'analytics', 'analyst', 'machine learning',
+    'automation', 'testing', 'qa', 'cloud', 'devops', 'network', 'security', 'framework',
+    'algorithm', 'statistics', 'accounting', 'finance', 'financial', 'numerical', 'reasoning',
+    'cognitive', 'aptitude', 'computer', 'backend', 'frontend', 'full stack', 'web'
+]
+BEHAVIORAL_TERMS = [
+    'communication', 'leadership', 'teamwork', 'team player', 'collaboration', 'collaborate',
+    'interpersonal', 'personality', 'behavior', 'behaviour', 'behavioral', 'behavioural',
+    'culture', 'cultural fit', 'attitude', 'motivation', 'motivated', 'empathy', 'emotional',
+    'stakeholder', 'customer service', 'customer', 'sales', 'negotiation', 'persuasion',
+    'influence', 'integrity', 'adaptability', 'resilience', 'work ethic', 'people management',
+    'coaching', 'mentoring', 'presentation', 'relationship', 'soft skills', 'situational',
+    'judgement', 'judgment', 'decision making', 'problem solving', 'creativity', 'verbal'
+]
+
+# Checked in order; the first level found wins ("Senior Manager" -> Manager)
+JOB_LEVEL_PATTERNS: List[Tuple[str, str]] = [
+    ('Executive', r"\b(executive|director|vp|vice president|chief|c-level|cxo|ceo|cto|cfo|coo|head of)\b"),
+    ('Manager', r"\b(manager|management role|supervisor|team lead(er)?)\b"),
+    ('Senior', r"\b(senior|sr\.?|lead|principal|experienced|[5-9]\+? years|1\d\+? years)\b"),
+    ('Mid-level', r"\b(mid[- ]?level|mid[- ]senior|intermediate|[2-4]\+? years)\b"),
+    ('Entry', r"\b(entry[- ]?level|graduate|fresher|freshers|intern|internship|trainee|new grad|no experience)\b"),
+    ('Junior', r"\b(junior|jr\.?|associate)\b"),
+]
+
+NUMBER_WORDS = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'half': 0.5,
+                'a': 1, 'an': 1, 'half an': 0.5, 'half a': 0.5}
+NUMBER = r"(\d+(?:\.\d+)?|one|two|three|four|five|six|half)"
+# "40 minutes", "1-2 hours", "30 to 45 mins", "1h30m"; articles only before a spelled-out
+# unit ("an hour", "half an hour") so "a min of 3 years" is not a duration
+DURATION_PATTERN = re.compile(
+    r"(?:(?<![\w.])|(?<=\dh))(?:" + NUMBER + r"\s*(?:-|–|to)\s*)?" + NUMBER +
+    r"(?:\s*(hours?|hrs?)|(h)|\s*(minutes?|mins?(?!\s+of\b))|(m))(?![a-z])"
+    r"|\b(half an|half a|an|a)\s+(hour|minute)s?\b",
+    re.IGNORECASE
+)
+# Text allowed between the hour and minute parts of one duration ("1 hour and 30 minutes")
+COMPOUND_JOINER = re.compile(r"\s*(?:,|and|&)?\s*", re.IGNORECASE)
+# Words that only introduce a duration ("within 40 minutes", "max 1 hour")
+DURATION_LEAD = re.compile(
+    r"(?:\b(?:within|under|in|of|for|max(?:imum)?|up to|less than|at most|about|around|"
+    r"approximately|no more than|not more than|duration|time limit)\s*:?\s*)*$",
+    re.IGNORECASE
+)
+
+TECHNICAL_PROTOTYPES = [
+    "programming languages, software development and coding skills",
+    "knowledge of specific tools, frameworks and technologies",
+    "data analysis, SQL, Excel and quantitative skills",
+    "technical knowledge test for engineers and analysts"
+]
+BEHAVIORAL_PROTOTYPES = [
+    "personality, behaviour and culture fit",
+    "leadership, communication and teamwork",
+    "interpersonal skills, customer service and sales attitude",
+    "motivation, work style and emotional intelligence"
+]
+
+
+def _term_pattern(term: str) -> str:
+    # \b does not work around symbols such as c++ or .net
+    return r"(?<![\w.+#])" + re.escape(term) + r"(?![\w+#])"
+
+
+def _compile_lexicon(terms: List[str]) -> List[Tuple[str, re.Pattern]]:
+    return [(term, re.compile(_term_pattern(term), re.IGNORECASE)) for term in terms]
+
+
+TOOL_LEXICON = _compile_lexicon(TOOL_TERMS)
+TECHNICAL_LEXICON = _compile_lexicon(TECHNICAL_TERMS)
+BEHAVIORAL_LEXICON = _compile_lexicon(BEHAVIORAL_TERMS)
+JOB_LEVEL_REGEXES = [(level, re.compile(pattern, re.IGNORECASE)) for level, pattern in JOB_LEVEL_PATTERNS]
+
+
+def _number(token: Optional[str]) -> Optional[float]:
+    if not token:
+        return None
+    token = token.lower()
+    if token in NUMBER_WORDS:
+        return NUMBER_WORDS[token]
+    return float(token)
+
+
+def duration_spans(query: str) -> List[Tuple[int, int, float]]:
+    """(start, end, minutes) of every duration in the query; "1h 30m" is one span of 90"""
+    parts = []
+    for match in DURATION_PATTERN.finditer(query):
+        low, amount, hours, h, minutes, m, article, article_unit = match.groups()
+        if article:
+            value, unit = NUMBER_WORDS[article.lower()], article_unit.lower()[0]
+        else:
+            value = _number(amount)
+            if low and _number(low) > value:
+                value = _number(low)
+            unit = 'h' if (hours or h) else 'm'
+        parts.append([match.start(), match.end(), value * 60 if unit == 'h' else value, unit, bool(m)])
+
+    spans = []
+    for part in parts:
+        previous = spans[-1] if spans else None
+        if (previous and previous[3] == 'h' and part[3] == 'm'
+                and COMPOUND_JOINER.fullmatch(query[previous[1]:part[0]])):
+            previous[1] = part[1]
+            previous[2] += part[2]
+            previous[3] = 'hm'
+        elif not part[4]:
+            # A bare "m" is only a unit right after hours ("1h 30m"), never on its own ("5m users")
+            spans.append(part)
+    return [(start, end, minutes) for start, end, minutes, _, _ in spans]
+
+
+def parse_duration(query: str) -> Optional[int]:
+    """Largest duration mentioned ("40 minutes", "1-2 hours", "1 hour and 30 minutes"), in minutes"""
+    durations = [int(round(minutes)) for _, _, minutes in duration_spans(query) if minutes]
+    return max(durations) if durations else None
+
+
+def parse_job_level(query: str) -> Optional[str]:
+    """First matching level in JOB_LEVEL_PATTERNS order, or None"""
+    for level, regex in JOB_LEVEL_REGEXES:
+        if regex.search(query):
+            return level
+    return None
+
+
+def match_terms(query: str, lexicon: List[Tuple[str, re.Pattern]]) -> List[str]:
+    return [term for term, regex in lexicon if regex.search(query)]
+
+
+def search_text(query: str) -> str:
+    """The query without its duration and job level phrases, used as the search string"""
+    cuts = []
+    for start, end, _ in duration_spans(query):
+        lead = DURATION_LEAD.search(query[:start])
+        cuts.append((lead.start() if lead else start, end))
+    for _, regex in JOB_LEVEL_REGEXES:
+        cuts += [match.span() for match in regex.finditer(query)]
+
+    text = query
+    for start, end in sorted(cuts, reverse=True):
+        text = text[:start] + " " + text[end:]
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s+([,.;:])", r"\1", text)
+    text = re.sub(r"([,;:])(?:\s*[,;:])+", r"\1", text)
+    text = text.strip(" ,.;:-")
+    return text or query
+
+
+class LocalQueryAnalyzer:
+    """
+    Rule-based analyzer returning the analyze_query_focus dict shape plus
+    'analysis_confidence'. Focus comes from keyword lexicons, optionally blended
+    with the query's similarity to technical vs behavioral prototype sentences.
+    """
+
+    def __init__(self, use_embeddings: bool = LOCAL_ANALYSIS_USE_EMBEDDINGS):
+        self.use_embeddings = use_embeddings
+        self._prototypes: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def _prototype_gap(self, query: str, engine, query_vector: Optional[np.ndarray] = None) -> Optional[float]:
+        """sim(query, technical prototype) - sim(query, behavioral prototype)"""
+        if not self.use_embeddings or engine is None:
+            return None
+
+        key = f"{engine.model_name}:{getattr(engine, 'encoder_backend', '')}"
+        prototypes = self._prototypes.get(key)
+        if prototypes is None:
+            with self._lock:
+                prototypes = self._prototypes.get(key)
+                if prototypes is None:
+                    vectors = engine.encode(TECHNICAL_PROTOTYPES + BEHAVIORAL_PROTOTYPES)
+                    split = len(TECHNICAL_PROTOTYPES)
+                    prototypes = np.vstack([vectors[:split].mean(axis=0), vectors[split:].mean(axis=0)])
+                    prototypes /= np.linalg.norm(prototypes, axis=1, keepdims=True)
+                    self._prototypes[key] = prototypes
+
+        if query_vector is None:
+            query_vector = engine.encode([query])[0]
+        query_vector = query_vector / (np.linalg.norm(query_vector) or 1.0)
+        technical, behavioral = prototypes @ query_vector
+        return float(technical - behavioral)
+
+    def analyze(self, query: str, engine=None, query_vector: Optional[np.ndarray] = None) -> Dict:
+        """query_vector skips encoding the query when the caller already has its embedding"""
+        tools = match_terms(query, TOOL_LEXICON)
+        technical = tools + [t for t in match_terms(query, TECHNICAL_LEXICON) if t not in tools]
+        behavioral = match_terms(query, BEHAVIORAL_LEXICON)
+
+        evidence = len(technical) + len(behavioral)
+        # Named tools count double: "Java developer" is unambiguous
+        tech_weight = len(technical) + len(tools)
+        lexicon_score = (tech_weight - len(behavioral)) / (tech_weight + len(behavioral)) if evidence else 0.0
+
+        gap = self._prototype_gap(query, engine, query_vector)
+        if gap is None:
+            score = lexicon_score
+        else:
+            embedding_score = float(np.clip(gap / EMBEDDING_MARGIN_SCALE, -1.0, 1.0))
+            score = LEXICON_WEIGHT * lexicon_score + (1 - LEXICON_WEIGHT) * embedding_score
+
+        if score >= FOCUS_THRESHOLD:
+            focus = 'TECHNICAL'
+            focus_confidence = 0.5 + 0.5 * (score - FOCUS_THRESHOLD) / (1 - FOCUS_THRESHOLD)
+        elif score <= -FOCUS_THRESHOLD:
+            focus = 'BEHAVIORAL'
+            focus_confidence = 0.5 + 0.5 * (-score - FOCUS_THRESHOLD) / (1 - FOCUS_THRESHOLD)
+        else:
+            focus = 'BALANCED'
+            # Only a confident BALANCED when both sides actually appear
+            focus_confidence = (1 - abs(score) / FOCUS_THRESHOLD) if technical and behavioral else 0.0
+        focus_confidence *= min(1.0, evidence / MIN_EVIDENCE)
+
+        if len(tools) >= 2 or evidence >= 5:
+            specificity, specificity_confidence = 'HIGHLY_SPECIFIC', 1.0
+        elif evidence == 0 and len(query.split()) <= 6:
+            specificity, specificity_confidence = 'BROAD', 0.6
+        else:
+            specificity, specificity_confidence = 'MODERATE', 0.8
+
+        # Lexicon hits only steer focus and specificity; the search uses the query's own words
+        text = search_text(query)
+        return {
+            'primary_focus': focus,
+            'specificity': specificity,
+            'technical_skills': text,
+            'soft_skills': text if behavioral else '',
+            'job_level': parse_job_level(query),
+            'duration_max': parse_duration(query),
+            'analysis_confidence': round(min(focus_confidence, specificity_confidence), 3),
+            'analysis_source': 'local'
+        }
+
+
+def merge_parsed_constraints(analysis: Dict, local: Dict) -> Dict:
+    """Fill job level / duration the LLM left empty from the regex parser"""
+    for key in ('job_level', 'duration_max'):
+        if analysis.get(key) is None and local.get(key) is not None:
+            analysis[key] = local[key]
+    return analysis
+
+
+_analyzer: Optional[LocalQueryAnalyzer] = None
+_analyzer_lock = threading.Lock()
+
+
+def get_query_analyzer() -> LocalQueryAnalyzer:
+    """Return the process-wide local analyzer"""
+    global _analyzer
+    if _analyzer is None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                _analyzer = LocalQueryAnalyzer()
+    return _analyzer
@@ -1,11 +1,26 @@
 import os
 import json
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 from dotenv import load_dotenv
 import google.generativeai as genai
-import chromadb
-from chromadb.utils import embedding_functions
-import time
+
+from retrieval_engine import SIMILARITY_KEY, RetrievalEngine, get_engine
+from gemini_client import generate_text, agenerate_text
+from async_pipeline import SEARCH_SLOTS, run_blocking
+from catalog_metadata import has_test_type, stored_duration
+from semantic_cache import (
+    SEMANTIC_CACHE_ENABLED,
+    SEMANTIC_CACHE_REUSE_RECOMMENDATIONS,
+    get_semantic_cache
+)
+from query_analyzer import (
+    QUERY_ANALYZER_MODE,
+    LOCAL_ANALYSIS_MIN_CONFIDENCE,
+    LOCAL_ANALYSIS_USE_EMBEDDINGS,
+    get_query_analyzer,
+    merge_parsed_constraints
+)
 
 # Load environment variables
 load_dotenv()
@@ -16,19 +31,22 @@ if not GOOGLE_API_KEY:
     raise ValueError("GOOGLE_API_KEY not found in environment variables.")
 genai.configure(api_key=GOOGLE_API_KEY)
 
-# ChromaDB setup
-PERSIST_DIR = "./chroma_store"
-COLLECTION_NAME = "shl_assessments"
+# Bump when the prompt template changes so cached responses are not reused
+QUERY_FOCUS_PROMPT_VERSION = "query_focus/v1"
+
+# Analyses worth remembering; 'fallback' is the generic answer used when Gemini fails
+CACHEABLE_ANALYSIS_SOURCES = ('local', 'gemini')
+
+# Also restrict candidates to the query's job level (duration is always a hard filter)
+FILTER_BY_JOB_LEVEL = os.getenv("FILTER_BY_JOB_LEVEL", "0") == "1"
 
 def get_gemini_model():
     """Initialize and return the Gemini model"""
     return genai.GenerativeModel('gemini-2.5-flash')
 
-def analyze_query_focus(query: str) -> Dict:
-    """Analyze query to determine technical vs behavioral focus"""
-    model = get_gemini_model()
-    
-    prompt = f"""
+def build_query_focus_prompt(query: str) -> str:
+    """Prompt asking Gemini for the technical vs behavioral focus of a query"""
+    return f"""
 Analyze this hiring query and determine the PRIMARY focus:
 
 Query: {query}
@@ -54,22 +72,31 @@ SOFT_SKILLS: list of soft skills (or "None" if technical focus)
 JOB_LEVEL: Entry/Junior/Mid-level/Senior/Executive/Manager or "Not specified"
 DURATION_MAX: number or "Not specified"
 """
-    
+
+def parse_duration_max(value) -> Optional[int]:
+    """LLM duration field ("40", 40.0, "45 minutes") as whole minutes; None when it is not a number"""
+    if value is None:
+        return None
     try:
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-        time.sleep(1)  # Rate limit protection
-    except Exception as e:
-        print(f"Error calling Gemini API: {e}")
-        return {
-            'primary_focus': 'BALANCED',
-            'specificity': 'MODERATE',
-            'technical_skills': query,
-            'soft_skills': 'communication, teamwork',
-            'job_level': None,
-            'duration_max': None
-        }
+        return int(float(str(value).split()[0]))
+    except (ValueError, IndexError):
+        return None
+
+def default_query_analysis(query: str, local: Optional[Dict] = None) -> Dict:
+    """Analysis used when the LLM cannot be reached (keeps regex-parsed constraints)"""
+    analysis = {
+        'primary_focus': 'BALANCED',
+        'specificity': 'MODERATE',
+        'technical_skills': query,
+        'soft_skills': 'communication, teamwork',
+        'job_level': None,
+        'duration_max': None,
+        'analysis_source': 'fallback'
+    }
+    return merge_parsed_constraints(analysis, local) if local else analysis
 
+def parse_query_focus_response(query: str, response_text: str) -> Dict:
+    """Parse the line-based PRIMARY_FOCUS/SPECIFICITY/... response format"""
     # Parse response
     analysis = {
         'primary_focus': 'BALANCED',
@@ -77,7 +104,8 @@ DURATION_MAX: number or "Not specified"
         'technical_skills': '',
         'soft_skills': '',
         'job_level': None,
-        'duration_max': None
+        'duration_max': None,
+        'analysis_source': 'gemini'
     }
     
     for line in response_text.split('\n'):
@@ -99,261 +127,380 @@ DURATION_MAX: number or "Not specified"
             if level and level.lower() != "not specified":
                 analysis['job_level'] = level
         elif line.startswith('DURATION_MAX:'):
-            duration = line.replace('DURATION_MAX:', '').strip()
-            if duration and duration.lower() != "not specified":
-                try:
-                    analysis['duration_max'] = int(duration.split()[0])
-                except:
-                    pass
+            analysis['duration_max'] = parse_duration_max(line.replace('DURATION_MAX:', '').strip())
     
-    # Fallbacks
+    return finalize_query_analysis(query, analysis)
+
+def finalize_query_analysis(query: str, analysis: Dict) -> Dict:
+    """Fill empty/None skill fields and log the analysis"""
     if not analysis['technical_skills'] or analysis['technical_skills'].lower() == 'none':
         analysis['technical_skills'] = query
     if not analysis['soft_skills'] or analysis['soft_skills'].lower() == 'none':
         analysis['soft_skills'] = 'communication, collaboration, teamwork'
     
-    print(f"Query Analysis: Focus={analysis['primary_focus']}, Specificity={analysis['specificity']}")
+    print(f"Query Analysis: Focus={analysis['primary_focus']}, Specificity={analysis['specificity']}, "
+          f"Source={analysis.get('analysis_source', 'gemini')}")
     print(f"Technical: {analysis['technical_skills'][:60]}...")
     print(f"Soft Skills: {analysis['soft_skills'][:60]}...")
     
     return analysis
 
-def apply_metadata_filters(assessments: List[Dict], duration_max: int) -> List[Dict]:
-    """Apply metadata filters - duration is HARD constraint"""
-    if not duration_max:
-        return assessments
+def local_query_analysis(query: str, engine: Optional[RetrievalEngine] = None) -> Optional[Dict]:
+    """Rule/embedding-based analysis; None when QUERY_ANALYZER_MODE=gemini"""
+    if QUERY_ANALYZER_MODE == "gemini":
+        return None
+    if engine is None and LOCAL_ANALYSIS_USE_EMBEDDINGS:
+        engine = get_engine()
+    return get_query_analyzer().analyze(query, engine)
+
+def local_query_analyses(queries: List[str], engine: Optional[RetrievalEngine] = None) -> List[Optional[Dict]]:
+    """local_query_analysis for many queries with a single encoder call"""
+    if QUERY_ANALYZER_MODE == "gemini":
+        return [None] * len(queries)
+    vectors = [None] * len(queries)
+    if LOCAL_ANALYSIS_USE_EMBEDDINGS and queries:
+        engine = engine or get_engine()
+        vectors = engine.encode(queries)
+    analyzer = get_query_analyzer()
+    return [analyzer.analyze(query, engine, vector) for query, vector in zip(queries, vectors)]
+
+def is_confident(local: Optional[Dict]) -> bool:
+    """True when the local analysis can be used without asking Gemini"""
+    if local is None:
+        return False
+    return QUERY_ANALYZER_MODE == "local" or local['analysis_confidence'] >= LOCAL_ANALYSIS_MIN_CONFIDENCE
+
+def semantic_cache_version(engine: RetrievalEngine) -> str:
+    """Cached analyses/recommendations are only valid for this index, encoder and prompt"""
+    return "|".join([str(engine.check_index()), engine.model_name, engine.encoder_backend, QUERY_FOCUS_PROMPT_VERSION])
+
+def semantic_lookup(query: str, engine: Optional[RetrievalEngine] = None) -> Optional[Dict]:
+    """Cache entry of a near-duplicate earlier query, or None"""
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    engine = engine or get_engine()
+    hit = get_semantic_cache().lookup(query, engine.encode([query])[0], semantic_cache_version(engine))
+    if hit:
+        print(f"Semantic cache hit (similarity={hit['similarity']:.3f}): {hit['query'][:60]}")
+    return hit
+
+def semantic_store(query: str, analysis: Dict, engine: Optional[RetrievalEngine] = None):
+    """Remember a real (local or Gemini) analysis for near-duplicate queries"""
+    if not SEMANTIC_CACHE_ENABLED or analysis.get('analysis_source') not in CACHEABLE_ANALYSIS_SOURCES:
+        return
+    engine = engine or get_engine()
+    get_semantic_cache().store(query, engine.encode([query])[0], semantic_cache_version(engine), analysis)
+
+def semantic_store_recommendations(query: str, assessments: List[Dict], distribution: Dict,
+                                   engine: Optional[RetrievalEngine] = None):
+    if not (SEMANTIC_CACHE_ENABLED and SEMANTIC_CACHE_REUSE_RECOMMENDATIONS):
+        return
+    engine = engine or get_engine()
+    get_semantic_cache().attach_recommendations(query, semantic_cache_version(engine), assessments, distribution)
+
+def analysis_from_hit(hit: Dict) -> Dict:
+    analysis = dict(hit['analysis'])
+    analysis['analysis_source'] = 'semantic_cache'
+    return analysis
+
+def analyze_query_focus(query: str,
+                        engine: Optional[RetrievalEngine] = None,
+                        use_semantic_cache: bool = True) -> Dict:
+    """
+    Analyze query to determine technical vs behavioral focus.
+    Near-duplicates of earlier queries reuse their analysis, clear-cut queries
+    are answered locally and the rest go to Gemini.
+    """
+    hit = semantic_lookup(query, engine) if use_semantic_cache else None
+    if hit:
+        return analysis_from_hit(hit)
+
+    analysis = analyze_query_focus_uncached(query, engine)
+    semantic_store(query, analysis, engine)
+    return analysis
+
+def analyze_query_focus_uncached(query: str, engine: Optional[RetrievalEngine] = None) -> Dict:
+    """Local analyzer first, Gemini when it is not confident"""
+    local = local_query_analysis(query, engine)
+    if is_confident(local):
+        return finalize_query_analysis(query, local)
+
+    model = get_gemini_model()
+    prompt = build_query_focus_prompt(query)
     
-    filtered = []
-    for assessment in assessments:
-        try:
-            assessment_duration = assessment.get('length_minutes', '')
-            if assessment_duration and str(assessment_duration).replace('.', '').isdigit():
-                duration = float(assessment_duration)
-                if duration <= duration_max:
-                    filtered.append(assessment)
-            else:
-                # Include if duration not specified
-                filtered.append(assessment)
-        except:
-            filtered.append(assessment)
+    try:
+        response_text = generate_text(model, prompt, QUERY_FOCUS_PROMPT_VERSION, cache_input=query)
+    except Exception as e:
+        print(f"Error calling Gemini API: {e}")
+        return default_query_analysis(query, local)
+
+    analysis = parse_query_focus_response(query, response_text)
+    return merge_parsed_constraints(analysis, local) if local else analysis
+
+async def analyze_query_focus_async(query: str,
+                                    engine: Optional[RetrievalEngine] = None,
+                                    use_semantic_cache: bool = True) -> Dict:
+    """Non-blocking variant of analyze_query_focus"""
+    hit = await run_blocking(semantic_lookup, query, engine) if use_semantic_cache else None
+    if hit:
+        return analysis_from_hit(hit)
+
+    analysis = await analyze_query_focus_uncached_async(query, engine)
+    await run_blocking(semantic_store, query, analysis, engine)
+    return analysis
+
+async def analyze_query_focus_uncached_async(query: str, engine: Optional[RetrievalEngine] = None) -> Dict:
+    """Non-blocking variant of analyze_query_focus_uncached"""
+    local = await run_blocking(local_query_analysis, query, engine)
+    if is_confident(local):
+        return finalize_query_analysis(query, local)
+
+    model = get_gemini_model()
+    prompt = build_query_focus_prompt(query)
     
-    return filtered
+    try:
+        response_text = await agenerate_text(model, prompt, QUERY_FOCUS_PROMPT_VERSION, cache_input=query)
+    except Exception as e:
+        print(f"Error calling Gemini API: {e}")
+        return default_query_analysis(query, local)
 
-def adaptive_threshold_selection(assessments: List[Dict], 
+    analysis = parse_query_focus_response(query, response_text)
+    return merge_parsed_constraints(analysis, local) if local else analysis
+
+def candidate_arrays(results: Dict) -> Dict:
+    """
+    Compact view of one search result: row ids, rounded ranking scores and
+    cosine similarities, durations and K/P masks. Metadata stays in the result
+    and is only read for the final picks. 'scores' include any lexical boost
+    and drive ordering/thresholds; 'similarity' is what gets reported.
+    """
+    metadatas = results['metadatas'][0] if results.get('metadatas') else []
+    distances = results['distances'][0] if results.get('distances') else []
+    scores = np.round(1 - np.asarray(distances, dtype=np.float64) / 2, 4)
+    similarities = results.get(SIMILARITY_KEY)
+    return {
+        'ids': np.array(results['ids'][0] if results.get('ids') else [], dtype=object),
+        'scores': scores,
+        'similarity': np.round(np.asarray(similarities[0], dtype=np.float64), 4) if similarities else scores,
+        'duration': np.array([stored_duration(m) for m in metadatas], dtype=np.float64),
+        'is_k': np.array([has_test_type(m, 'K') for m in metadatas], dtype=bool),
+        'is_p': np.array([has_test_type(m, 'P') for m in metadatas], dtype=bool),
+        'rank': np.arange(1, len(metadatas) + 1),
+        'metadatas': metadatas
+    }
+
+def concat_candidates(*tables: Dict) -> Dict:
+    """One candidate table from several search results (K rows first, then P rows)"""
+    combined = {key: np.concatenate([t[key] for t in tables]) for key in ('ids', 'scores', 'similarity', 'duration', 'is_k', 'is_p', 'rank')}
+    combined['metadatas'] = [m for t in tables for m in t['metadatas']]
+    return combined
+
+def apply_metadata_filters(duration: np.ndarray, duration_max: int) -> np.ndarray:
+    """
+    Apply metadata filters - duration is HARD constraint.
+    Both backends already push this down; this only matters for untyped stores.
+    Returns a keep-mask; rows without a duration are kept.
+    """
+    if not duration_max:
+        return np.ones(len(duration), dtype=bool)
+    return np.isnan(duration) | (duration <= duration_max)
+
+def by_score(rows: np.ndarray, scores: np.ndarray) -> np.ndarray:
+    """Rows sorted by descending score; ties keep their current order"""
+    return rows[np.argsort(-scores[rows], kind="stable")]
+
+def unique_rows(rows: np.ndarray, ids: np.ndarray, exclude: Optional[set] = None) -> np.ndarray:
+    """First occurrence of each row id, in order, skipping ids in exclude"""
+    seen = set(exclude or ())
+    keep = []
+    for row in rows:
+        if ids[row] not in seen:
+            seen.add(ids[row])
+            keep.append(row)
+    return np.array(keep, dtype=np.int64)
+
+def threshold_steps(start: float = 0.90, minimum: float = 0.45, step: float = 0.05) -> np.ndarray:
+    """Thresholds tried by adaptive_threshold_selection, lowered by step from start"""
+    thresholds = []
+    threshold = start
+    while threshold >= minimum:
+        thresholds.append(threshold)
+        threshold -= step
+    return np.array(thresholds)
+
+THRESHOLD_STEPS = threshold_steps()
+
+def adaptive_threshold_selection(scores: np.ndarray,
                                  assessment_type: str,
                                  min_count: int,
-                                 max_count: int,
-                                 start_threshold: float = 0.90) -> List[Dict]:
+                                 max_count: int) -> int:
     """
-    Iteratively lower threshold from 0.90 until we get min_count assessments
+    Lower the threshold from 0.90 until at least min_count scores pass.
+    scores must be sorted descending; returns how many of the leading rows to keep.
     """
-    if not assessments:
-        return []
-    
-    threshold = start_threshold
-    min_threshold = 0.45
-    step = 0.05
+    if not len(scores):
+        return 0
     
-    while threshold >= min_threshold:
-        filtered = [a for a in assessments if a['similarity_score'] >= threshold]
-        
-        if len(filtered) >= min_count:
-            print(f"  {assessment_type}: threshold={threshold:.2f}, found {len(filtered)}")
-            return filtered[:max_count]
-        
-        threshold -= step
+    # Number of scores >= each threshold, for all thresholds at once
+    counts = np.searchsorted(-scores, -THRESHOLD_STEPS, side='right')
+    met = np.flatnonzero(counts >= min_count)
+    if len(met):
+        threshold, found = THRESHOLD_STEPS[met[0]], counts[met[0]]
+        print(f"  {assessment_type}: threshold={threshold:.2f}, found {found}")
+        return int(min(found, max_count))
     
     # If still not enough, return top min_count
-    print(f"  {assessment_type}: Using top {min(min_count, len(assessments))} (no threshold met)")
-    return assessments[:min_count]
+    print(f"  {assessment_type}: Using top {min(min_count, len(scores))} (no threshold met)")
+    return int(min(min_count, len(scores)))
+
+def assessment_record(metadata: Dict, score: float, rank: int) -> Dict:
+    """Full recommendation dict for one selected candidate"""
+    return {
+        'rank': int(rank),
+        'similarity_score': float(score),
+        'assessment_name': metadata.get('assessment_name', ''),
+        'test_type': metadata.get('test_type', ''),
+        'description': metadata.get('description', ''),
+        'url': metadata.get('url', ''),
+        'job_levels': metadata.get('job_levels', ''),
+        'length_minutes': metadata.get('assessment_length_(mins)', ''),
+        'duration_minutes': stored_duration(metadata),
+        'remote_testing': metadata.get('remote_testing', '')
+    }
+
+def search_filters(query_analysis: Dict) -> Dict:
+    """Hard constraints from the analysis, pushed down into the retrieval engine"""
+    query_filter = {'duration_max': query_analysis.get('duration_max')}
+    if FILTER_BY_JOB_LEVEL:
+        query_filter['job_level'] = query_analysis.get('job_level')
+    return query_filter
 
 def search_assessments(query_analysis: Dict,
                        min_total: int = 5, 
-                       max_total: int = 10) -> Tuple[List[Dict], Dict]:
+                       max_total: int = 10,
+                       engine: Optional[RetrievalEngine] = None) -> Tuple[List[Dict], Dict]:
     """
     Smart search with strict thresholds and guaranteed minimums
     """
-    try:
-        client = chromadb.PersistentClient(path=PERSIST_DIR)
-        embed_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name="BAAI/bge-base-en-v1.5"
-        )
-        collection = client.get_collection(
-            name=COLLECTION_NAME,
-            embedding_function=embed_fn
-        )
-    except Exception as e:
-        print(f"Error connecting to ChromaDB: {e}")
-        raise
+    engine = engine or get_engine()
     
-    primary_focus = query_analysis['primary_focus']
-    specificity = query_analysis['specificity']
-    technical_query = query_analysis['technical_skills']
-    soft_skills_query = query_analysis['soft_skills']
-    duration_max = query_analysis['duration_max']
-    
-    # Search for K and P assessments
-    k_results = collection.query(
-        query_texts=[technical_query],
+    # Search for K and P assessments, with filters applied inside the search
+    query_filter = search_filters(query_analysis)
+    k_results, p_results = engine.search(
+        [(query_analysis['technical_skills'], "K"), (query_analysis['soft_skills'], "P")],
         n_results=50,
-        where={"test_type": "K"}
+        filters=[query_filter, query_filter]
     )
     
-    p_results = collection.query(
-        query_texts=[soft_skills_query],
-        n_results=50,
-        where={"test_type": "P"}
-    )
-    
-    # Process K-type results
-    k_assessments = []
-    if k_results['documents'] and k_results['documents'][0]:
-        for idx, (doc, metadata, distance) in enumerate(zip(
-            k_results['documents'][0],
-            k_results['metadatas'][0],
-            k_results['distances'][0]
-        )):
-            similarity = 1 - (distance / 2)
-            assessment = {
-                'rank': idx + 1,
-                'similarity_score': round(similarity, 4),
-                'assessment_name': metadata.get('assessment_name', ''),
-                'test_type': metadata.get('test_type', ''),
-                'description': metadata.get('description', ''),
-                'url': metadata.get('url', ''),
-                'job_levels': metadata.get('job_levels', ''),
-                'length_minutes': metadata.get('assessment_length_(mins)', ''),
-                'remote_testing': metadata.get('remote_testing', '')
-            }
-            k_assessments.append(assessment)
-    
-    # Process P-type results
-    p_assessments = []
-    if p_results['documents'] and p_results['documents'][0]:
-        for idx, (doc, metadata, distance) in enumerate(zip(
-            p_results['documents'][0],
-            p_results['metadatas'][0],
-            p_results['distances'][0]
-        )):
-            similarity = 1 - (distance / 2)
-            assessment = {
-                'rank': idx + 1,
-                'similarity_score': round(similarity, 4),
-                'assessment_name': metadata.get('assessment_name', ''),
-                'test_type': metadata.get('test_type', ''),
-                'description': metadata.get('description', ''),
-                'url': metadata.get('url', ''),
-                'job_levels': metadata.get('job_levels', ''),
-                'length_minutes': metadata.get('assessment_length_(mins)', ''),
-                'remote_testing': metadata.get('remote_testing', '')
-            }
-            p_assessments.append(assessment)
-    
-    # Apply duration filter (HARD constraint)
-    k_assessments = apply_metadata_filters(k_assessments, duration_max)
-    p_assessments = apply_metadata_filters(p_assessments, duration_max)
-    
-    # Sort by similarity
-    k_assessments.sort(key=lambda x: x['similarity_score'], reverse=True)
-    p_assessments.sort(key=lambda x: x['similarity_score'], reverse=True)
-    
-    print(f"\nAvailable after filters - K: {len(k_assessments)}, P: {len(p_assessments)}")
-    
-    # DETERMINE TARGET DISTRIBUTION based on query focus
+    return select_assessments(query_analysis, k_results, p_results, min_total, max_total)
+
+def search_assessments_batch(query_analyses: List[Dict],
+                             min_total: int = 5,
+                             max_total: int = 10,
+                             engine: Optional[RetrievalEngine] = None) -> List[Tuple[List[Dict], Dict]]:
+    """
+    search_assessments for many queries at once.
+    All technical and soft-skill strings are encoded in one call and scored in one batched search.
+    """
+    engine = engine or get_engine()
+    
+    pairs = []
+    filters = []
+    for query_analysis in query_analyses:
+        pairs.append((query_analysis['technical_skills'], "K"))
+        pairs.append((query_analysis['soft_skills'], "P"))
+        filters.extend([search_filters(query_analysis)] * 2)
+    results = engine.search(pairs, n_results=50, filters=filters)
+    
+    return [
+        select_assessments(query_analysis, results[2 * i], results[2 * i + 1], min_total, max_total)
+        for i, query_analysis in enumerate(query_analyses)
+    ]
+
+def target_distribution(primary_focus: str, specificity: str) -> Tuple[int, int, int, int]:
+    """(min_k, max_k, min_p, max_p) for a query focus"""
     if primary_focus == 'TECHNICAL':
         if specificity == 'HIGHLY_SPECIFIC':
-            min_k, max_k = 6, 9
-            min_p, max_p = 1, 2
-        else:
-            min_k, max_k = 4, 7
-            min_p, max_p = 1, 3
-    elif primary_focus == 'BEHAVIORAL':
+            return 6, 9, 1, 2
+        return 4, 7, 1, 3
+    if primary_focus == 'BEHAVIORAL':
         if specificity == 'HIGHLY_SPECIFIC':
-            min_k, max_k = 1, 2
-            min_p, max_p = 6, 9
-        else:
-            min_k, max_k = 1, 3
-            min_p, max_p = 4, 7
-    else:  # BALANCED
-        min_k, max_k = 3, 6
-        min_p, max_p = 3, 6
+            return 1, 2, 6, 9
+        return 1, 3, 4, 7
+    # BALANCED
+    return 3, 6, 3, 6
+
+def select_assessments(query_analysis: Dict,
+                       k_results: Dict,
+                       p_results: Dict,
+                       min_total: int = 5,
+                       max_total: int = 10) -> Tuple[List[Dict], Dict]:
+    """
+    Turn raw K/P search results into the final, balanced recommendation list.
+    Selection works on row indices into one candidate table; full dicts are
+    built only for the final picks.
+    """
+    primary_focus = query_analysis['primary_focus']
+    specificity = query_analysis['specificity']
+    duration_max = query_analysis['duration_max']
     
-    print(f"Target distribution - K: {min_k}-{max_k}, P: {min_p}-{max_p}")
+    k_table = candidate_arrays(k_results)
+    candidates = concat_candidates(k_table, candidate_arrays(p_results))
+    ids, scores = candidates['ids'], candidates['scores']
+    is_k, is_p = candidates['is_k'], candidates['is_p']
+    from_k = np.arange(len(ids)) < len(k_table['ids'])
     
-    # ADAPTIVE THRESHOLD SELECTION
-    selected_k = adaptive_threshold_selection(k_assessments, 'K', min_k, max_k, start_threshold=0.90)
-    selected_p = adaptive_threshold_selection(p_assessments, 'P', min_p, max_p, start_threshold=0.90)
+    # Apply duration filter (HARD constraint), then sort by similarity
+    keep = apply_metadata_filters(candidates['duration'], duration_max)
+    k_rows = by_score(np.flatnonzero(keep & from_k), scores)
+    p_rows = by_score(np.flatnonzero(keep & ~from_k), scores)
     
-    # GUARANTEE MINIMUM REQUIREMENTS: At least 1 K and 1 P
-    if len(selected_k) == 0 and len(k_assessments) > 0:
-        selected_k = [k_assessments[0]]
-        print("  Forcing minimum 1 K assessment")
+    print(f"\nAvailable after filters - K: {len(k_rows)}, P: {len(p_rows)}")
     
-    if len(selected_p) == 0 and len(p_assessments) > 0:
-        selected_p = [p_assessments[0]]
-        print("  Forcing minimum 1 P assessment")
+    # DETERMINE TARGET DISTRIBUTION based on query focus
+    min_k, max_k, min_p, max_p = target_distribution(primary_focus, specificity)
+    print(f"Target distribution - K: {min_k}-{max_k}, P: {min_p}-{max_p}")
     
-    # Combine and sort by similarity
-    combined = selected_k + selected_p
-    combined.sort(key=lambda x: x['similarity_score'], reverse=True)
+    # ADAPTIVE THRESHOLD SELECTION (always keeps at least 1 K and 1 P when available)
+    selected_k = k_rows[:adaptive_threshold_selection(scores[k_rows], 'K', min_k, max_k)]
+    selected_p = p_rows[:adaptive_threshold_selection(scores[p_rows], 'P', min_p, max_p)]
     
-    # Remove duplicates
-    seen = set()
-    unique_assessments = []
-    for assessment in combined:
-        name = assessment['assessment_name']
-        if name not in seen:
-            seen.add(name)
-            unique_assessments.append(assessment)
+    # Combine, sort by similarity and remove duplicates
+    selected = unique_rows(by_score(np.concatenate([selected_k, selected_p]), scores), ids)
     
     # GUARANTEE MINIMUM TOTAL: At least min_total assessments
-    if len(unique_assessments) < min_total:
-        print(f"  Need more assessments ({len(unique_assessments)} < {min_total})")
-        remaining = []
-        seen_names = {a['assessment_name'] for a in unique_assessments}
-        
+    if len(selected) < min_total:
+        print(f"  Need more assessments ({len(selected)} < {min_total})")
         # Pool remaining assessments prioritized by focus
-        if primary_focus == 'TECHNICAL':
-            pool = k_assessments + p_assessments
-        elif primary_focus == 'BEHAVIORAL':
-            pool = p_assessments + k_assessments
-        else:
-            pool = k_assessments + p_assessments
-        
-        for a in pool:
-            if a['assessment_name'] not in seen_names:
-                remaining.append(a)
-        
-        remaining.sort(key=lambda x: x['similarity_score'], reverse=True)
-        needed = min_total - len(unique_assessments)
-        unique_assessments.extend(remaining[:needed])
+        pool = np.concatenate([p_rows, k_rows] if primary_focus == 'BEHAVIORAL' else [k_rows, p_rows])
+        remaining = by_score(unique_rows(pool, ids, exclude={ids[r] for r in selected}), scores)
+        selected = np.concatenate([selected, remaining[:min_total - len(selected)]])
     
     # Apply max cap
-    unique_assessments = unique_assessments[:max_total]
-    
-    # Final verification: ensure at least 1 K and 1 P
-    final_k = sum(1 for a in unique_assessments if a['test_type'].upper() == 'K')
-    final_p = sum(1 for a in unique_assessments if a['test_type'].upper() == 'P')
+    selected = selected[:max_total]
     
     # Emergency fix: if somehow we still don't have both types
-    if final_k == 0 and len(k_assessments) > 0:
+    if not is_k[selected].any() and len(k_rows):
         # Remove lowest P, add top K
-        unique_assessments = [a for a in unique_assessments if a['test_type'].upper() != 'P'][:max_total-1]
-        unique_assessments.append(k_assessments[0])
+        selected = np.append(selected[~is_p[selected]][:max_total - 1], k_rows[0])
         print("  Emergency: Added K assessment")
     
-    if final_p == 0 and len(p_assessments) > 0:
+    if not is_p[selected].any() and len(p_rows):
         # Remove lowest K, add top P
-        unique_assessments = [a for a in unique_assessments if a['test_type'].upper() != 'K'][:max_total-1]
-        unique_assessments.append(p_assessments[0])
+        selected = np.append(selected[~is_k[selected]][:max_total - 1], p_rows[0])
         print("  Emergency: Added P assessment")
     
-    # Re-sort and recalculate
-    unique_assessments.sort(key=lambda x: x['similarity_score'], reverse=True)
-    final_k = sum(1 for a in unique_assessments if a['test_type'].upper() == 'K')
-    final_p = sum(1 for a in unique_assessments if a['test_type'].upper() == 'P')
+    # Re-sort and count, then materialize only the final rows
+    selected = by_score(selected.astype(np.int64), scores)
+    final_k = int(is_k[selected].sum())
+    final_p = int(is_p[selected].sum())
     
-    print(f"Final Selection - Total: {len(unique_assessments)}, K: {final_k}, P: {final_p}")
+    print(f"Final Selection - Total: {len(selected)}, K: {final_k}, P: {final_p}")
+    
+    unique_assessments = [
+        assessment_record(candidates['metadatas'][r], candidates['similarity'][r], candidates['rank'][r])
+        for r in selected
+    ]
     
     distribution_info = {
         'total_results': len(unique_assessments),
@@ -364,16 +511,42 @@ def search_assessments(query_analysis: Dict,
     
     return unique_assessments, distribution_info
 
-def get_recommendations(query: str) -> Dict:
-    """Main function to get assessment recommendations"""
+def reusable_recommendations(hit: Optional[Dict]) -> bool:
+    return bool(hit) and SEMANTIC_CACHE_REUSE_RECOMMENDATIONS and hit['recommendations'] is not None
+
+def response_from_hit(query: str, hit: Dict) -> Dict:
+    """get_recommendations response served entirely from the semantic cache"""
+    return {
+        'original_query': query,
+        'query_analysis': analysis_from_hit(hit),
+        'recommendations': list(hit['recommendations']),
+        'distribution': dict(hit['distribution']),
+        'status': 'success'
+    }
+
+def get_recommendations(query: str,
+                        engine: Optional[RetrievalEngine] = None,
+                        query_analysis: Optional[Dict] = None) -> Dict:
+    """
+    Main function to get assessment recommendations.
+    Pass query_analysis to reuse an analysis computed elsewhere (e.g. in a batch).
+    """
     try:
-        query_analysis = analyze_query_focus(query)
+        hit = None
+        if query_analysis is None:
+            hit = semantic_lookup(query, engine)
+            if reusable_recommendations(hit):
+                return response_from_hit(query, hit)
+            query_analysis = analysis_from_hit(hit) if hit else analyze_query_focus(query, engine, use_semantic_cache=False)
         
         assessments, distribution = search_assessments(
             query_analysis,
             min_total=5,
-            max_total=10
+            max_total=10,
+            engine=engine
         )
+        if hit is None:
+            semantic_store_recommendations(query, assessments, distribution, engine)
         
         response = {
             'original_query': query,
@@ -392,6 +565,48 @@ def get_recommendations(query: str) -> Dict:
             'original_query': query
         }
 
+async def get_recommendations_async(query: str,
+                                    engine: Optional[RetrievalEngine] = None,
+                                    query_analysis: Optional[Dict] = None) -> Dict:
+    """
+    Non-blocking variant of get_recommendations for the API.
+    The LLM call is awaited; encoding and search run in the bounded executor.
+    """
+    try:
+        hit = None
+        if query_analysis is None:
+            hit = await run_blocking(semantic_lookup, query, engine)
+            if reusable_recommendations(hit):
+                return response_from_hit(query, hit)
+            query_analysis = (analysis_from_hit(hit) if hit
+                              else await analyze_query_focus_async(query, engine, use_semantic_cache=False))
+        
+        async with SEARCH_SLOTS:
+            assessments, distribution = await run_blocking(
+                search_assessments,
+                query_analysis,
+                min_total=5,
+                max_total=10,
+                engine=engine
+            )
+        if hit is None:
+            await run_blocking(semantic_store_recommendations, query, assessments, distribution, engine)
+        
+        return {
+            'original_query': query,
+            'query_analysis': query_analysis,
+            'recommendations': assessments,
+            'distribution': distribution,
+            'status': 'success'
+        }
+        
+    except Exception as e:
+        return {
+            'status': 'error',
+            'error_message': str(e),
+            'original_query': query
+        }
+
 if __name__ == "__main__":
     # Example usage
     sample_query = "Looking for a Senior Java Developer with Spring Boot experience and strong team leadership skills. Must complete assessment within 40 minutes."
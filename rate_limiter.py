@@ -0,0 +1,133 @@
+import os
+import re
+import time
+import asyncio
+import threading
+from typing import Dict, Optional
+
+# Gemini quota (per process)
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_RPM", 60))
+GEMINI_TOKENS_PER_MINUTE = float(os.getenv("GEMINI_TPM", 1_000_000))
+
+# Extra wait on top of a server-provided "retry in Ns" hint
+RETRY_HINT_MARGIN_SECONDS = 2.0
+
+RETRY_HINT_PATTERNS = [
+    re.compile(r"retry in (\d+\.?\d*)s"),
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)")
+]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for quota accounting (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def parse_retry_delay(message: str) -> Optional[float]:
+    """Extract the server's suggested retry delay in seconds, if any"""
+    for pattern in RETRY_HINT_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+class TokenBucket:
+    """Classic token bucket; tokens may go negative to queue reservations"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated_at = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take `amount` tokens and return how long the caller must wait for them"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+        self.tokens -= min(amount, self.capacity)
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class RateLimiter:
+    """
+    Requests/min + tokens/min limiter shared by every Gemini caller.
+    Reservations are made under a thread lock and the wait happens outside it,
+    so callers queue fairly across threads and asyncio tasks.
+    """
+
+    def __init__(self,
+                 requests_per_minute: float = GEMINI_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = GEMINI_TOKENS_PER_MINUTE):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+        self.acquired = 0
+        self.throttled = 0
+        self.total_wait_seconds = 0.0
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            wait = max(
+                self.requests.reserve(1, now),
+                self.tokens.reserve(tokens, now),
+                self.blocked_until - now
+            )
+            self.acquired += 1
+            if wait > 0:
+                self.throttled += 1
+                self.total_wait_seconds += wait
+            return wait
+
+    def acquire(self, tokens: int = 1):
+        """Block the current thread until a request of `tokens` fits the quota"""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int = 1):
+        """Asyncio variant of acquire that does not block the event loop"""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def defer(self, seconds: float):
+        """Hold every caller back for at least `seconds`"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def defer_from_error(self, error: Exception) -> Optional[float]:
+        """Honor a "retry in Ns" hint from an API error; returns the delay if one was found"""
+        delay = parse_retry_delay(str(error))
+        if delay is not None:
+            print(f" API quota hit. Holding Gemini calls for {delay:.1f} seconds...")
+            self.defer(delay + RETRY_HINT_MARGIN_SECONDS)
+        return delay
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'acquired': self.acquired,
+                'throttled': self.throttled,
+                'total_wait_seconds': round(self.total_wait_seconds, 3)
+            }
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_gemini_limiter() -> RateLimiter:
+    """Return the process-wide Gemini rate limiter"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
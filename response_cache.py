@@ -0,0 +1,122 @@
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# Memory budget for cached /recommend response bodies
+RESPONSE_CACHE_MAX_MB = float(os.getenv("RESPONSE_CACHE_MAX_MB", 16))
+
+PUNCTUATION = re.compile(r"[^\w\s+#]")
+
+
+def normalize_query(query: str) -> str:
+    """Case-, whitespace- and punctuation-insensitive form of a query (keeps c++ / c#)"""
+    return " ".join(PUNCTUATION.sub(" ", str(query).lower()).split())
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """RFC 9110 weak comparison against an If-None-Match header value"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU of serialized responses, keyed by normalized query.
+    Entries belong to one index/prompt version; the first lookup under a new
+    version (e.g. after the catalog was re-indexed) drops everything older.
+    """
+
+    def __init__(self, max_bytes: int = int(RESPONSE_CACHE_MAX_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self.version: Optional[str] = None
+        self._entries: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_version(self, version: str):
+        # Caller holds the lock
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+                print(f"Response cache: version changed, dropping {len(self._entries)} entries")
+            self._entries.clear()
+            self.bytes_used = 0
+            self.version = version
+
+    def get(self, query: str, version: str) -> Optional[Tuple[bytes, str]]:
+        """(body, etag) for a cached response, or None"""
+        key = normalize_query(query)
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, query: str, version: str, body: bytes) -> str:
+        """Store a serialized response; returns its ETag"""
+        key = normalize_query(query)
+        etag = make_etag(body)
+        with self._lock:
+            self._check_version(version)
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes_used -= len(previous[0])
+            if len(body) > self.max_bytes:
+                return etag
+            self._entries[key] = (body, etag)
+            self.bytes_used += len(body)
+
+            while self.bytes_used > self.max_bytes and self._entries:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.bytes_used -= len(evicted)
+                self.evictions += 1
+        return etag
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes_used': self.bytes_used,
+                'max_bytes': self.max_bytes,
+                'version': self.version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
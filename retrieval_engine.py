@@ -0,0 +1,467 @@
+import os
+import sys
+import json
+import hashlib
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import chromadb
+
+from embedding_cache import EmbeddingCache
+from encoders import ENCODER_BACKEND, ChromaEmbeddingAdapter, load_encoder
+from embedding_artifact import ARTIFACT_DIR, ARTIFACT_PRECISION, MANIFEST_FILE, load_artifact, read_manifest
+from lexical_index import HYBRID_LEXICAL_WEIGHT, LEXICAL_INDEX_FILE, LexicalIndex, load_lexical_index
+from catalog_metadata import CatalogColumns, chroma_where, tag_key
+
+# ChromaDB setup
+PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "./chroma_store")
+COLLECTION_NAME = "shl_assessments"
+EMBEDDING_MODEL = "BAAI/bge-base-en-v1.5"
+
+# "chroma" queries the persistent HNSW index, "numpy" does exact search in memory
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "chroma").lower()
+# How often the index files are checked for a rebuild (embed_and_store.py)
+INDEX_CHECK_INTERVAL_SECONDS = float(os.getenv("INDEX_CHECK_INTERVAL_SECONDS", 10))
+
+# Per-query fields of a Chroma-style result dict
+RESULT_KEYS = ('ids', 'documents', 'metadatas', 'distances')
+# Added next to them: plain cosine similarity per row. With hybrid search 'distances'
+# carry the fused (cosine + lexical) score used for ranking, which can exceed 1.0
+SIMILARITY_KEY = 'similarities'
+# Filters understood by both backends (see catalog_metadata.CatalogColumns.mask)
+FILTER_KEYS = ('test_type', 'duration_max', 'job_level', 'remote')
+
+
+def current_rss_mb() -> float:
+    """Resident set size of the current process in MB (best effort)"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except Exception:
+        pass
+
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and in KB elsewhere
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except Exception:
+        return 0.0
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row of a 2-D float32 matrix"""
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def group_by_filter(filters: List[Dict]) -> Dict[Tuple, List[int]]:
+    """Positions of each distinct filter in a list of per-query filters"""
+    groups: Dict[Tuple, List[int]] = {}
+    for position, query_filter in enumerate(filters):
+        key = tuple(query_filter.get(k) for k in FILTER_KEYS)
+        groups.setdefault(key, []).append(position)
+    return groups
+
+
+def empty_result() -> Dict:
+    return {key: [[]] for key in RESULT_KEYS}
+
+
+class ChromaBackend:
+    """
+    Top-k search through Chroma's persistent HNSW index.
+    Lexical scores can only re-rank the candidates HNSW returns.
+    """
+
+    name = "chroma"
+
+    def __init__(self, collection, lexical_ids: Optional[List[str]] = None):
+        self.collection = collection
+        # Column of each catalog id in the lexical score matrix
+        self.lexical_rows = {row_id: i for i, row_id in enumerate(lexical_ids or [])}
+
+        # Stores indexed before typed metadata only support exact test_type matches
+        sample = collection.get(limit=1, include=["metadatas"])
+        self.typed = bool(sample['metadatas']) and tag_key('K') in (sample['metadatas'][0] or {})
+        if not self.typed:
+            print("Chroma store has no typed metadata (re-run embed_and_store.py); "
+                  "falling back to exact test_type matches without filter pushdown")
+
+    def where(self, query_filter: Dict) -> Optional[Dict]:
+        if self.typed:
+            return chroma_where(**query_filter)
+        return {"test_type": query_filter['test_type']} if query_filter.get('test_type') else None
+
+    def search(self,
+               query_embeddings: np.ndarray,
+               filters: List[Dict],
+               n_results: int,
+               lexical_scores: Optional[np.ndarray] = None) -> List[Dict]:
+        # One collection.query per distinct filter, carrying every query that uses it
+        results: List[Optional[Dict]] = [None] * len(filters)
+        for _, positions in group_by_filter(filters).items():
+            response = self.collection.query(
+                query_embeddings=query_embeddings[positions].tolist(),
+                n_results=n_results,
+                where=self.where(filters[positions[0]])
+            )
+            for j, position in enumerate(positions):
+                result = {
+                    key: [response[key][j]] if response.get(key) else [[]]
+                    for key in RESULT_KEYS
+                }
+                if lexical_scores is not None:
+                    result = self._rerank(result, lexical_scores[position])
+                results[position] = result
+        return results
+
+    def _rerank(self, result: Dict, lexical: np.ndarray) -> Dict:
+        distances = np.asarray(result['distances'][0], dtype=np.float32)
+        if not len(distances):
+            return result
+        boost = np.array([lexical[self.lexical_rows[i]] if i in self.lexical_rows else 0.0
+                          for i in result['ids'][0]], dtype=np.float32)
+        fused = distances - 2.0 * boost  # d = 2 - 2 * similarity
+        order = np.argsort(fused, kind="stable")
+        reranked = {key: [[result[key][0][k] for k in order]] for key in RESULT_KEYS if key != 'distances'}
+        reranked['distances'] = [fused[order].tolist()]
+        reranked[SIMILARITY_KEY] = [(1.0 - distances[order] / 2.0).tolist()]
+        return reranked
+
+
+class NumpyBackend:
+    """
+    Exact in-memory search over the whole catalog.
+    Normalized document embeddings live in one contiguous matrix (float32 from
+    Chroma, or a memory-mapped float16/int8 artifact), metadata in parallel arrays.
+    """
+
+    name = "numpy"
+
+    def __init__(self,
+                 ids: List[str],
+                 documents: List[str],
+                 metadatas: List[Dict],
+                 embeddings: np.ndarray,
+                 scales: Optional[np.ndarray] = None):
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.embeddings = embeddings
+        # Per-vector dequantization scales for int8 embeddings
+        self.scales = scales
+        self.columns = CatalogColumns(metadatas)
+
+    @classmethod
+    def from_collection(cls, collection) -> "NumpyBackend":
+        data = collection.get(include=["embeddings", "metadatas", "documents"])
+        return cls(
+            ids=list(data['ids']),
+            documents=list(data['documents']),
+            metadatas=list(data['metadatas']),
+            embeddings=normalize_rows(np.asarray(data['embeddings'], dtype=np.float32))
+        )
+
+    @classmethod
+    def from_artifact(cls, artifact_dir: str = ARTIFACT_DIR, precision: str = ARTIFACT_PRECISION) -> "NumpyBackend":
+        artifact = load_artifact(artifact_dir, precision)
+        return cls(
+            ids=artifact['ids'],
+            documents=artifact['documents'],
+            metadatas=artifact['metadatas'],
+            embeddings=artifact['embeddings'],
+            scales=artifact['scales']
+        )
+
+    def search(self,
+               query_embeddings: np.ndarray,
+               filters: List[Dict],
+               n_results: int,
+               lexical_scores: Optional[np.ndarray] = None) -> List[Dict]:
+        # One matrix multiply scores every query against every document
+        similarities = normalize_rows(query_embeddings) @ self.embeddings.T
+        if self.scales is not None:
+            similarities = similarities * self.scales
+        # Hybrid ranking: weighted BM25 is added before top-k, in the same pass
+        scores = similarities + lexical_scores if lexical_scores is not None else similarities
+
+        results: List[Optional[Dict]] = [None] * len(filters)
+        for _, positions in group_by_filter(filters).items():
+            # Filters are applied as a row mask before top-k, not to the top-k
+            candidates = np.flatnonzero(self.columns.mask(**filters[positions[0]]))
+            k = min(n_results, len(candidates))
+            if k == 0:
+                for position in positions:
+                    results[position] = empty_result()
+                continue
+
+            # Top-k for every query of this type at once
+            candidate_scores = scores[np.ix_(positions, candidates)]
+            top = np.argpartition(-candidate_scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(candidate_scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind="stable")
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            top_similarities = np.take_along_axis(similarities[np.ix_(positions, candidates)], top, axis=1)
+
+            for j, position in enumerate(positions):
+                rows = candidates[top[j]]
+                # Report squared L2 distances like Chroma does (unit vectors: d = 2 - 2cos)
+                results[position] = {
+                    'ids': [[self.ids[r] for r in rows]],
+                    'documents': [[self.documents[r] for r in rows]],
+                    'metadatas': [[self.metadatas[r] for r in rows]],
+                    'distances': [(2.0 - 2.0 * top_scores[j]).tolist()],
+                    SIMILARITY_KEY: [top_similarities[j].tolist()]
+                }
+        return results
+
+
+class RetrievalEngine:
+    """
+    Long-lived Chroma client, collection and embedding model.
+    Built once per process and shared by every request.
+    """
+
+    def __init__(self,
+                 persist_dir: str = PERSIST_DIR,
+                 collection_name: str = COLLECTION_NAME,
+                 model_name: str = EMBEDDING_MODEL,
+                 backend: str = RETRIEVAL_BACKEND,
+                 artifact_dir: str = ARTIFACT_DIR,
+                 encoder_backend: str = ENCODER_BACKEND):
+        self.persist_dir = persist_dir
+        self.artifact_dir = artifact_dir
+        self.collection_name = collection_name
+        self.model_name = model_name
+        self.backend_name = backend
+        self.encoder_backend = encoder_backend
+
+        self.client = None
+        self.encoder = None
+        self.collection = None
+        self.backend = None
+        self.lexical: Optional[LexicalIndex] = None
+        self.index_version: Optional[str] = None
+        self.index_reloads = 0
+        self._index_stamp: Optional[Tuple] = None
+        self._index_checked_at = 0.0
+        self._reload_lock = threading.Lock()
+
+        self.loaded = False
+        self.load_time_seconds: Optional[float] = None
+        self.memory_footprint_mb: Optional[float] = None
+        self.query_count = 0
+        self.embedding_cache = EmbeddingCache()
+
+        # sentence-transformers models are not guaranteed to be re-entrant,
+        # so encoding is serialized across threads
+        self._lock = threading.Lock()
+
+    def load(self) -> "RetrievalEngine":
+        """Open the Chroma store, load the embedding model and build the search backend"""
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+
+        if self.backend_name not in ("numpy", "chroma"):
+            raise ValueError(f"Unknown RETRIEVAL_BACKEND: {self.backend_name}")
+
+        self.encoder = load_encoder(self.model_name, self.encoder_backend)
+        self._load_index()
+
+        self.load_time_seconds = time.perf_counter() - start
+        self.memory_footprint_mb = max(0.0, current_rss_mb() - rss_before)
+        self.loaded = True
+
+        print(f"Retrieval engine ({self.backend.name}) loaded in {self.load_time_seconds:.2f}s "
+              f"(+{self.memory_footprint_mb:.1f} MB RSS)")
+        return self
+
+    def _index_files_stamp(self) -> Tuple:
+        """(mtime, size) of the files a rebuild rewrites; cheap enough to check per request"""
+        paths = [
+            os.path.join(self.persist_dir, "chroma.sqlite3"),
+            os.path.join(self.persist_dir, "chroma.sqlite3-wal"),
+            os.path.join(self.artifact_dir, MANIFEST_FILE),
+            os.path.join(self.artifact_dir, LEXICAL_INDEX_FILE)
+        ]
+        stamp = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                stamp.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def _load_index(self):
+        """
+        Open the lexical index, the search backend and their version. Everything is
+        built first and swapped in at the end, so searches running during a reload
+        keep using the previous index.
+        """
+        stamp = self._index_files_stamp()
+        client, collection = self.client, self.collection
+        lexical = load_lexical_index(self.artifact_dir) if HYBRID_LEXICAL_WEIGHT > 0 else None
+
+        # The NumPy backend serves straight from the memory-mapped artifact when one
+        # was built with the same model; Chroma is only opened when needed
+        if self.backend_name == "numpy" and self._artifact_usable():
+            backend = NumpyBackend.from_artifact(self.artifact_dir)
+        else:
+            try:
+                if client is not None:
+                    # Chroma shares one system (and its loaded HNSW segments) per path;
+                    # drop it so the rebuilt collection is read from disk
+                    try:
+                        from chromadb.api.client import SharedSystemClient
+                        SharedSystemClient.clear_system_cache()
+                    except (ImportError, AttributeError):
+                        pass
+                client = chromadb.PersistentClient(path=self.persist_dir)
+                collection = client.get_collection(
+                    name=self.collection_name,
+                    embedding_function=ChromaEmbeddingAdapter(self.encoder)
+                )
+            except Exception as e:
+                print(f"Error connecting to ChromaDB: {e}")
+                raise
+
+            if self.backend_name == "numpy":
+                backend = NumpyBackend.from_collection(collection)
+            else:
+                backend = ChromaBackend(collection, lexical.ids if lexical else None)
+
+        if lexical is not None and isinstance(backend, NumpyBackend):
+            lexical = lexical.reordered(backend.ids)
+        index_version = self._index_version(backend, collection)
+
+        self.client, self.collection = client, collection
+        self.backend, self.lexical = backend, lexical
+        self.index_version = index_version
+        self._index_stamp = stamp
+        self._index_checked_at = time.monotonic()
+
+    def check_index(self) -> Optional[str]:
+        """
+        Current index version. At most every INDEX_CHECK_INTERVAL_SECONDS the index
+        files are checked and, when a rebuild changed them, the index is reopened,
+        so caches keyed on the version are invalidated without a restart.
+        """
+        if not self.loaded or time.monotonic() - self._index_checked_at < INDEX_CHECK_INTERVAL_SECONDS:
+            return self.index_version
+        with self._reload_lock:
+            now = time.monotonic()
+            if now - self._index_checked_at < INDEX_CHECK_INTERVAL_SECONDS:
+                return self.index_version
+            self._index_checked_at = now
+            if self._index_files_stamp() != self._index_stamp:
+                previous = self.index_version
+                try:
+                    self._load_index()
+                    self.index_reloads += 1
+                    print(f"Search index changed on disk; reloaded ({previous} -> {self.index_version})")
+                except Exception as e:
+                    # Keep serving the loaded index; the next check tries again
+                    print(f"Index reload failed, keeping version {previous}: {e}")
+        return self.index_version
+
+    def _artifact_usable(self) -> bool:
+        manifest = read_manifest(self.artifact_dir)
+        if manifest is None:
+            return False
+        if manifest.get('model_name') != self.model_name:
+            print(f"Embedding artifact was built with {manifest.get('model_name')}, "
+                  f"not {self.model_name}; loading from Chroma instead")
+            return False
+        return True
+
+    def _index_version(self, backend, collection) -> str:
+        """Fingerprint of every indexed row and its metadata; changes whenever the catalog is re-indexed"""
+        if isinstance(backend, NumpyBackend):
+            ids, metadatas = backend.ids, backend.metadatas
+        else:
+            data = collection.get(include=["metadatas"])
+            ids, metadatas = data['ids'], data['metadatas']
+
+        digest = hashlib.sha256()
+        for row_id, metadata in sorted(zip(ids, (json.dumps(m, sort_keys=True, default=str) for m in metadatas))):
+            digest.update(f"{row_id}:{metadata}\n".encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed query texts with the same model used for the catalog.
+        Repeated strings are served from the embedding cache without a forward pass.
+        """
+        return self.embedding_cache.encode(texts, self._encode_uncached)
+
+    def _encode_uncached(self, texts: List[str]) -> np.ndarray:
+        with self._lock:
+            return self.encoder.encode(texts)
+
+    def search(self,
+               queries: List[Tuple[str, str]],
+               n_results: int = 50,
+               filters: Optional[List[Optional[Dict]]] = None) -> List[Dict]:
+        """
+        Top-n similarity search for (query_text, test_type) pairs.
+        filters optionally adds duration_max / job_level / remote per pair.
+        Returns one Chroma-style result dict per pair.
+        """
+        texts = [text for text, _ in queries]
+        filters = filters or [None] * len(queries)
+        query_filters = [
+            {**(query_filter or {}), 'test_type': test_type}
+            for (_, test_type), query_filter in zip(queries, filters)
+        ]
+
+        query_embeddings = self.encode(texts)
+        lexical_scores = None
+        if self.lexical is not None:
+            lexical_scores = HYBRID_LEXICAL_WEIGHT * self.lexical.score(texts)
+        with self._lock:
+            self.query_count += len(queries)
+        return self.backend.search(query_embeddings, query_filters, n_results, lexical_scores)
+
+    def query(self, query_text: str, test_type: str, n_results: int = 50, **filters) -> Dict:
+        """Top-n similarity search restricted to one test type (plus optional filters)"""
+        return self.search([(query_text, test_type)], n_results=n_results, filters=[filters])[0]
+
+    def stats(self) -> Dict:
+        """Load time, memory footprint and usage counters"""
+        return {
+            'loaded': self.loaded,
+            'backend': self.backend_name,
+            'model_name': self.model_name,
+            'encoder': self.encoder_backend,
+            'hybrid_lexical_weight': HYBRID_LEXICAL_WEIGHT if self.lexical is not None else 0.0,
+            'collection': self.collection_name,
+            'index_version': self.index_version,
+            'index_reloads': self.index_reloads,
+            'load_time_seconds': round(self.load_time_seconds, 3) if self.load_time_seconds is not None else None,
+            'memory_footprint_mb': round(self.memory_footprint_mb, 1) if self.memory_footprint_mb is not None else None,
+            'process_rss_mb': round(current_rss_mb(), 1),
+            'query_count': self.query_count,
+            'embedding_cache': self.embedding_cache.stats()
+        }
+
+
+_engine: Optional[RetrievalEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> RetrievalEngine:
+    """Return the process-wide retrieval engine, loading it on first use"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = RetrievalEngine().load()
+    return _engine
@@ -1,7 +1,7 @@
 import pandas as pd
 import csv
-import time
-from rag_core import get_recommendations
+from retrieval_engine import get_engine
+from batch_analysis import get_recommendations_batch
 
 def process_dataset(input_filename: str, output_filename: str):
     """Process a dataset of queries and generate assessment recommendations"""
@@ -30,19 +30,22 @@ def process_dataset(input_filename: str, output_filename: str):
         queries = []
 
     if queries:
+        # Load the retrieval engine once and reuse it for every query
+        engine = get_engine()
+
+        # Batched LLM analysis, one encoder call and one search for all queries
+        queries = [q for q in queries if str(q).strip()]
+        print(f"Processing {len(queries)} queries in batches...")
+        all_recommendations = get_recommendations_batch(queries, engine=engine)
+
         try:
             with open(output_filename, 'w', newline='', encoding='utf-8') as f:
                 writer = csv.writer(f)
                 writer.writerow(['Query', 'Assessment_url', 'Test_Type', 'Similarity_Score'])
                 
-                for i, query in enumerate(queries):
-                    if not query.strip():
-                        continue
-                        
+                for i, (query, recommendations) in enumerate(zip(queries, all_recommendations)):
                     print("\n" + "="*80)
-                    print(f"Processing query {i+1}/{len(queries)}: {query[:70]}...")
-                    
-                    recommendations = get_recommendations(query)
+                    print(f"Query {i+1}/{len(queries)}: {query[:70]}...")
                     
                     if recommendations['status'] == 'success':
                         if recommendations['recommendations']:
@@ -59,9 +62,6 @@ def process_dataset(input_filename: str, output_filename: str):
                     else:
                         print(f"✗ ERROR: {recommendations['error_message']}")
                         writer.writerow([query, f"Error: {recommendations['error_message']}", 'N/A', 0.0])
-                    
-                    # Rate limiting
-                    time.sleep(1)
             
             print("\n" + "="*80)
             print(f"✓ Processing complete. Output saved to {output_filename}")
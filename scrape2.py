@@ -1,113 +1,321 @@
+"""
+Scrape description / job levels / length / test type for every catalog product.
+
+    python scrape2.py [--workers 8] [--restart]
+
+Product pages are fetched over a pooled HTTP session by a thread pool and parsed
+with CSS selectors; a browser is only started for pages whose content is not in
+the static HTML. Every finished page is appended to a JSONL checkpoint, so an
+interrupted run picks up where it stopped. --base-url points the scraper at a
+mirror, e.g. the local fixture site:
+
+    python -m http.server 8001 -d data/scrape_fixtures
+    python scrape2.py --base-url http://localhost:8001 --input data/scrape_fixtures/urls.csv \
+        --output /tmp/details.csv --checkpoint /tmp/details.jsonl --no-browser
+"""
+import os
+import re
 import csv
+import sys
+import json
 import time
-import re
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-
-# === Setup Chrome ===
-chrome_options = Options()
-# chrome_options.add_argument("--headless=new")  # Uncomment for silent run
-chrome_options.add_argument("--disable-gpu")
-chrome_options.add_argument("--window-size=1920,1080")
-chrome_options.add_argument("--no-sandbox")
-chrome_options.add_argument("--disable-dev-shm-usage")
-
-driver = webdriver.Chrome(options=chrome_options)
-wait = WebDriverWait(driver, 20)
-
-# === Input and Output files ===
-input_file = "Individual_Test_Solutions.csv"
-output_file = "SHL_Product_Details_Final.csv"
-
-# === Read URLs and existing fields from input CSV ===
-entries = []
-with open(input_file, "r", encoding="utf-8") as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        entries.append({
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup
+
+from html_extract import LexborHTMLParser
+from job_fetcher import REQUEST_HEADERS
+
+INPUT_FILE = "Individual_Test_Solutions.csv"
+OUTPUT_FILE = "SHL_Product_Details_Final.csv"
+CHECKPOINT_FILE = os.getenv("SCRAPE_CHECKPOINT", "SHL_Product_Details_Final.checkpoint.jsonl")
+# Scheme + host the product URLs are fetched from (the URLs in the CSV keep their original host)
+SCRAPE_BASE_URL = os.getenv("SCRAPE_BASE_URL", "")
+SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", 8))
+SCRAPE_RETRIES = int(os.getenv("SCRAPE_RETRIES", 4))
+SCRAPE_BACKOFF_SECONDS = float(os.getenv("SCRAPE_BACKOFF_SECONDS", 1.0))
+SCRAPE_TIMEOUT_SECONDS = float(os.getenv("SCRAPE_TIMEOUT_SECONDS", 20))
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# Present on every product page once its details are rendered
+READY_SELECTOR = ".product-catalogue-training-calendar__row"
+TEST_TYPE_SELECTOR = "span.product-catalogue__key"
+DURATION_NUMBER = re.compile(r"\b\d+\b")
+
+OUTPUT_COLUMNS = [
+    "Assessment Name",
+    "URL",
+    "Remote Testing",
+    "Adaptive/IRT Support",
+    "Description",
+    "Job Levels",
+    "Assessment Length (mins)",
+    "Test Type"
+]
+
+
+class NeedsBrowser(Exception):
+    """The static HTML does not contain the product details (rendered by JS)"""
+
+
+def load_entries(input_file: str) -> List[Dict]:
+    with open(input_file, "r", encoding="utf-8") as f:
+        return [{
             "name": row["Assessment Name"].strip(),
             "url": row["URL"].strip(),
             "remote": row.get("Remote Testing", "").strip(),
             "adaptive": row.get("Adaptive/IRT", "").strip(),
-        })
-
-print(f"🔹 Loaded {len(entries)} entries to scrape.\n")
-
-# === Prepare Output CSV ===
-with open(output_file, "w", newline="", encoding="utf-8") as out:
-    writer = csv.writer(out)
-    writer.writerow([
-        "Assessment Name",
-        "URL",
-        "Remote Testing",
-        "Adaptive/IRT Support",
-        "Description",
-        "Job Levels",
-        "Assessment Length (mins)",
-        "Test Type"
-    ])
-
-    for idx, entry in enumerate(entries, start=1):
-        url = entry["url"]
-        print(f"[{idx}/{len(entries)}] Scraping: {url}")
-        driver.get(url)
-
-        # Wait for product info
+        } for row in csv.DictReader(f)]
+
+
+def rebase_url(url: str, base_url: str) -> str:
+    """Same path on another scheme/host (a mirror or a local fixture server)"""
+    if not base_url:
+        return url
+    base = urlsplit(base_url)
+    parts = urlsplit(url)
+    return urlunsplit((base.scheme, base.netloc, base.path.rstrip("/") + parts.path, parts.query, ""))
+
+
+def clean_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def product_fields(labelled: Dict[str, str], test_types: List[str]) -> Dict:
+    duration_text = labelled.get("assessment length", "")
+    match = DURATION_NUMBER.search(duration_text)
+    return {
+        "description": labelled.get("description", ""),
+        "job_levels": labelled.get("job levels", ""),
+        "duration": match.group(0) if match else "",
+        "test_type": ", ".join(t for t in test_types if t)
+    }
+
+
+def first_label(labelled: Dict[str, str], heading: str, text: str):
+    # Same as the XPath lookup it replaces: first <h4> containing the label wins
+    for label in ("description", "job levels", "assessment length"):
+        if label in heading and label not in labelled:
+            labelled[label] = text
+
+
+def parse_product_page_fast(html: str) -> Dict:
+    tree = LexborHTMLParser(html)
+    if tree.css_first(READY_SELECTOR) is None:
+        raise NeedsBrowser()
+
+    labelled: Dict[str, str] = {}
+    for h4 in tree.css("h4"):
+        sibling = h4.next
+        while sibling is not None and sibling.tag != "p":
+            sibling = sibling.next
+        text = clean_text(sibling.text(separator=" ")) if sibling is not None else ""
+        first_label(labelled, h4.text().lower(), text)
+
+    return product_fields(labelled, [clean_text(span.text()) for span in tree.css(TEST_TYPE_SELECTOR)])
+
+
+def parse_product_page_bs4(html: str) -> Dict:
+    soup = BeautifulSoup(html, "html.parser")
+    if soup.select_one(READY_SELECTOR) is None:
+        raise NeedsBrowser()
+
+    labelled: Dict[str, str] = {}
+    for h4 in soup.select("h4"):
+        sibling = h4.find_next_sibling("p")
+        text = clean_text(sibling.get_text(" ")) if sibling is not None else ""
+        first_label(labelled, h4.get_text().lower(), text)
+
+    return product_fields(labelled, [clean_text(span.get_text()) for span in soup.select(TEST_TYPE_SELECTOR)])
+
+
+def parse_product_page(html: str) -> Dict:
+    """Product details from a page's HTML; raises NeedsBrowser if they are not in it"""
+    if LexborHTMLParser is not None:
+        return parse_product_page_fast(html)
+    return parse_product_page_bs4(html)
+
+
+def make_session(workers: int) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(REQUEST_HEADERS)
+    return session
+
+
+def fetch_with_retry(session: requests.Session, url: str,
+                     retries: int = SCRAPE_RETRIES, backoff: float = SCRAPE_BACKOFF_SECONDS) -> str:
+    """GET with exponential backoff + jitter on connection errors, 429 and 5xx"""
+    for attempt in range(retries + 1):
         try:
-            wait.until(EC.presence_of_element_located(
-                (By.CSS_SELECTOR, ".product-catalogue-training-calendar__row")
-            ))
-        except Exception:
-            print("⚠️ Page did not load properly, skipping.")
+            resp = session.get(url, timeout=SCRAPE_TIMEOUT_SECONDS)
+            if resp.status_code not in RETRY_STATUS:
+                resp.raise_for_status()
+                return resp.text
+            error: Exception = requests.HTTPError(f"{resp.status_code} for {url}")
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+        if attempt == retries:
+            raise error
+        delay = backoff * 2 ** attempt + random.uniform(0, backoff)
+        print(f"  retry {attempt + 1}/{retries} for {url} in {delay:.1f}s ({error})")
+        time.sleep(delay)
+
+
+class Checkpoint:
+    """Append-only JSONL of finished products, keyed by URL"""
+
+    def __init__(self, path: str, restart: bool = False):
+        self.path = path
+        self._lock = threading.Lock()
+        self.records: Dict[str, Dict] = {}
+        if restart and os.path.exists(path):
+            os.remove(path)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                lines = f.read().split("\n")
+            for line in lines:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # partial last line of a crashed run
+                self.records[record["url"]] = record
+            if lines[-1]:
+                # Start new records on a fresh line after a partial one
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write("\n")
+
+    def add(self, record: Dict):
+        with self._lock:
+            self.records[record["url"]] = record
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def scrape_entry(session: requests.Session, entry: Dict, base_url: str) -> Dict:
+    html = fetch_with_retry(session, rebase_url(entry["url"], base_url))
+    return {**entry, **parse_product_page(html)}
+
+
+def scrape_with_browser(entries: List[Dict], base_url: str, checkpoint: Checkpoint) -> List[Dict]:
+    """Serial Selenium pass for pages that need JS; returns the entries that still failed"""
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    chrome_options = Options()
+    chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--window-size=1920,1080")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+
+    failed = []
+    driver = webdriver.Chrome(options=chrome_options)
+    try:
+        wait = WebDriverWait(driver, 20)
+        for entry in entries:
+            print(f"  browser: {entry['url']}")
+            try:
+                driver.get(rebase_url(entry["url"], base_url))
+                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, READY_SELECTOR)))
+                checkpoint.add({**entry, **parse_product_page(driver.page_source)})
+            except Exception as e:
+                print(f"  browser failed for {entry['url']}: {e}")
+                failed.append(entry)
+    finally:
+        driver.quit()
+    return failed
+
+
+def write_output(entries: List[Dict], checkpoint: Checkpoint, output_file: str):
+    """Rows in input order; products that could not be scraped keep empty detail columns"""
+    with open(output_file, "w", newline="", encoding="utf-8") as out:
+        writer = csv.writer(out)
+        writer.writerow(OUTPUT_COLUMNS)
+        for entry in entries:
+            record = checkpoint.records.get(entry["url"], {})
             writer.writerow([
                 entry["name"], entry["url"], entry["remote"], entry["adaptive"],
-                "", "", "", ""
+                record.get("description", ""),
+                record.get("job_levels", ""),
+                record.get("duration", ""),
+                record.get("test_type", "")
             ])
-            continue
 
-        time.sleep(2)
 
-        def get_text_by_label(label):
-            """Find <h4> label and return text from next <p>"""
+def scrape(entries: List[Dict], checkpoint: Checkpoint, base_url: str = SCRAPE_BASE_URL,
+           workers: int = SCRAPE_WORKERS, use_browser: bool = True) -> List[Dict]:
+    """Scrape every entry not yet in the checkpoint; returns the entries that failed"""
+    pending = [e for e in entries if e["url"] not in checkpoint.records]
+    print(f"🔹 {len(entries)} entries, {len(entries) - len(pending)} already in checkpoint, {len(pending)} to scrape.\n")
+
+    session = make_session(workers)
+    needs_browser: List[Dict] = []
+    failed: List[Dict] = []
+    done = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(scrape_entry, session, entry, base_url): entry for entry in pending}
+        for future in as_completed(futures):
+            entry = futures[future]
+            done += 1
             try:
-                h4 = driver.find_element(
-                    By.XPATH,
-                    f"//h4[contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{label.lower()}')]"
-                )
-                p = h4.find_element(By.XPATH, "following-sibling::p")
-                return p.text.strip()
-            except Exception:
-                return ""
-
-        # Extract fields
-        description = get_text_by_label("Description")
-        job_levels = get_text_by_label("Job levels")
-
-        # Extract numeric duration (e.g., "10" from "Approximate Completion Time in minutes = 10")
-        duration_text = get_text_by_label("Assessment length")
-        match = re.search(r"\b\d+\b", duration_text)
-        duration = match.group(0) if match else ""
-
-        # Extract all test type tags (K, D, P, etc.)
-        test_type_elems = driver.find_elements(By.CSS_SELECTOR, "span.product-catalogue__key")
-        test_type = ", ".join([elem.text.strip() for elem in test_type_elems if elem.text.strip()])
-
-        print(f"  → {entry['name']} | Job: {job_levels or 'N/A'} | Type: {test_type or 'N/A'} | Duration: {duration or 'N/A'} mins")
-
-        # Write to CSV
-        writer.writerow([
-            entry["name"],
-            entry["url"],
-            entry["remote"],
-            entry["adaptive"],
-            description,
-            job_levels,
-            duration,
-            test_type
-        ])
-
-driver.quit()
-print(f"\n✅ Done! All details saved in '{output_file}'")
+                record = future.result()
+            except NeedsBrowser:
+                needs_browser.append(entry)
+                print(f"[{done}/{len(pending)}] needs browser: {entry['url']}")
+                continue
+            except Exception as e:
+                failed.append(entry)
+                print(f"[{done}/{len(pending)}] ⚠️ failed: {entry['url']} ({e})")
+                continue
+            checkpoint.add(record)
+            print(f"[{done}/{len(pending)}] {entry['name']} | Job: {record['job_levels'] or 'N/A'} | "
+                  f"Type: {record['test_type'] or 'N/A'} | Duration: {record['duration'] or 'N/A'} mins")
+
+    if needs_browser:
+        if use_browser:
+            print(f"\n🔹 {len(needs_browser)} pages need a browser")
+            failed += scrape_with_browser(needs_browser, base_url, checkpoint)
+        else:
+            failed += needs_browser
+    return failed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Scrape SHL product detail pages")
+    parser.add_argument("--input", default=INPUT_FILE)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE)
+    parser.add_argument("--base-url", default=SCRAPE_BASE_URL)
+    parser.add_argument("--workers", type=int, default=SCRAPE_WORKERS)
+    parser.add_argument("--no-browser", action="store_true", help="never fall back to Selenium")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    entries = load_entries(args.input)
+    checkpoint = Checkpoint(args.checkpoint, restart=args.restart)
+    start = time.perf_counter()
+    failed = scrape(entries, checkpoint, args.base_url, args.workers, use_browser=not args.no_browser)
+    write_output(entries, checkpoint, args.output)
+
+    print(f"\n✅ Done in {time.perf_counter() - start:.1f}s! {len(entries) - len(failed)}/{len(entries)} "
+          f"products saved in '{args.output}'")
+    if failed:
+        print(f"⚠️ {len(failed)} failed; run again to retry them (checkpoint: {args.checkpoint})")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
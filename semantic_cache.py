@@ -0,0 +1,173 @@
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from embedding_cache import normalize_query_text
+from query_analyzer import TOOL_LEXICON, match_terms, parse_duration, parse_job_level
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1") == "1"
+# Cosine similarity above which a past query counts as the same query
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.95))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", 2048))
+# Also reuse the stored recommendation list, not just the query analysis
+SEMANTIC_CACHE_REUSE_RECOMMENDATIONS = os.getenv("SEMANTIC_CACHE_REUSE_RECOMMENDATIONS", "0") == "1"
+
+
+def hard_constraints(query: str) -> Tuple:
+    """
+    Constraints two queries must share no matter how similar they read
+    ("40 min" vs "30 min", "Java developer" vs "Python developer")
+    """
+    return parse_duration(query), parse_job_level(query), tuple(sorted(match_terms(query, TOOL_LEXICON)))
+
+
+class SemanticCache:
+    """
+    Small in-memory vector index of past queries -> their analysis (and optionally
+    their recommendations). Vectors live in one preallocated matrix, so a lookup
+    is a single matrix-vector product; the least recently used slot is reused
+    when the cache is full. Everything is dropped when the version changes.
+    """
+
+    def __init__(self,
+                 threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.version: Optional[str] = None
+
+        self._vectors: Optional[np.ndarray] = None
+        self._last_used = np.zeros(max_entries, dtype=np.int64)
+        self._entries: List[Optional[Dict]] = [None] * max_entries
+        self._slots: Dict[str, int] = {}
+        self._size = 0
+        self._clock = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.constraint_rejects = 0
+        self.evictions = 0
+        self._hit_similarities: List[float] = []
+
+    def _check_version(self, version: str):
+        # Caller holds the lock
+        if version != self.version:
+            self._entries = [None] * self.max_entries
+            self._slots.clear()
+            self._last_used[:] = 0
+            self._size = 0
+            self.version = version
+
+    def _touch(self, slot: int):
+        self._clock += 1
+        self._last_used[slot] = self._clock
+
+    def lookup(self, query: str, vector: np.ndarray, version: str) -> Optional[Dict]:
+        """Closest past entry above the threshold with the same hard constraints, or None"""
+        constraints = hard_constraints(query)
+        with self._lock:
+            self._check_version(version)
+            if self._size == 0:
+                self.misses += 1
+                return None
+
+            similarities = self._vectors[:self._size] @ np.asarray(vector, dtype=np.float32)
+            candidates = np.flatnonzero(similarities >= self.threshold)
+            if len(candidates) == 0:
+                self.misses += 1
+                return None
+
+            # Best first; a closer entry with other constraints must not hide a valid one
+            for slot in candidates[np.argsort(-similarities[candidates], kind="stable")]:
+                slot = int(slot)
+                entry = self._entries[slot]
+                if entry['constraints'] == constraints:
+                    similarity = float(similarities[slot])
+                    break
+            else:
+                self.constraint_rejects += 1
+                self.misses += 1
+                return None
+
+            self._touch(slot)
+            self.hits += 1
+            self._hit_similarities.append(similarity)
+            if len(self._hit_similarities) > 1000:
+                del self._hit_similarities[:500]
+            return {**entry, 'similarity': round(similarity, 4)}
+
+    def store(self, query: str, vector: np.ndarray, version: str, analysis: Dict):
+        """Remember the analysis of a query (replacing an exact duplicate)"""
+        vector = np.asarray(vector, dtype=np.float32)
+        key = normalize_query_text(query)
+        with self._lock:
+            self._check_version(version)
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+
+            slot = self._slots.get(key)
+            if slot is None:
+                if self._size < self.max_entries:
+                    slot = self._size
+                    self._size += 1
+                else:
+                    slot = int(np.argmin(self._last_used[:self._size]))
+                    del self._slots[self._entries[slot]['key']]
+                    self.evictions += 1
+                self._slots[key] = slot
+
+            self._vectors[slot] = vector
+            self._entries[slot] = {
+                'key': key,
+                'query': query,
+                'constraints': hard_constraints(query),
+                'analysis': dict(analysis),
+                'recommendations': None,
+                'distribution': None
+            }
+            self._touch(slot)
+
+    def attach_recommendations(self, query: str, version: str, recommendations: List[Dict], distribution: Dict):
+        """Store the final recommendations next to an already cached analysis"""
+        with self._lock:
+            if version != self.version:
+                return
+            slot = self._slots.get(normalize_query_text(query))
+            if slot is not None:
+                self._entries[slot]['recommendations'] = recommendations
+                self._entries[slot]['distribution'] = distribution
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            similarities = np.array(self._hit_similarities) if self._hit_similarities else None
+            return {
+                'entries': self._size,
+                'max_entries': self.max_entries,
+                'threshold': self.threshold,
+                'hits': self.hits,
+                'misses': self.misses,
+                'constraint_rejects': self.constraint_rejects,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'hit_similarity_mean': round(float(similarities.mean()), 4) if similarities is not None else None,
+                'hit_similarity_min': round(float(similarities.min()), 4) if similarities is not None else None,
+                'hit_similarity_p10': round(float(np.percentile(similarities, 10)), 4) if similarities is not None else None
+            }
+
+
+_cache: Optional[SemanticCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> SemanticCache:
+    """Return the process-wide semantic query cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticCache()
+    return _cache
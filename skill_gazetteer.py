@@ -0,0 +1,371 @@
+import os
+import re
+import json
+import threading
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from embedding_artifact import ARTIFACT_DIR
+from query_analyzer import TOOL_TERMS
+
+SKILL_GAZETTEER_FILE = "skill_gazetteer.json"
+# Used to build the gazetteer when no artifact has been written yet
+SKILL_CATALOG_CSV = os.getenv("SKILL_CATALOG_CSV", "SHL_Product_Details_Final_Clean.csv")
+
+# Curated canonical skill -> aliases seen in job postings
+SKILL_SYNONYMS: Dict[str, List[str]] = {
+    'JavaScript': ['javascript', 'js', 'ecmascript', 'es6'],
+    'TypeScript': ['typescript'],
+    'Python': ['python', 'python3'],
+    'PyTorch': ['pytorch'],
+    'TensorFlow': ['tensorflow', 'keras'],
+    'Java': ['java', 'core java', 'java ee', 'j2ee'],
+    'C#': ['c#', 'csharp', 'c sharp'],
+    'C++': ['c++', 'cpp'],
+    '.NET': ['.net', 'dotnet', 'dot net', '.net core'],
+    'SQL': ['sql', 't-sql', 'pl/sql', 'plsql'],
+    'PostgreSQL': ['postgresql', 'postgres'],
+    'Node.js': ['node.js', 'nodejs'],
+    'React': ['react', 'react.js', 'reactjs'],
+    'Angular': ['angular', 'angularjs', 'angular.js'],
+    'Amazon Web Services': ['amazon web services', 'aws'],
+    'Microsoft Azure': ['microsoft azure', 'azure'],
+    'Google Cloud': ['google cloud', 'gcp', 'google cloud platform'],
+    'Kubernetes': ['kubernetes', 'k8s'],
+    'Docker': ['docker', 'containerization'],
+    'CI/CD': ['ci/cd', 'continuous integration', 'continuous delivery', 'continuous deployment'],
+    'Git': ['git', 'github', 'gitlab', 'version control'],
+    'REST APIs': ['rest api', 'rest apis', 'restful', 'restful services', 'web services'],
+    'Machine Learning': ['machine learning', 'ml', 'deep learning'],
+    'Artificial Intelligence': ['artificial intelligence', 'ai', 'generative ai', 'genai'],
+    'Natural Language Processing': ['natural language processing', 'nlp', 'large language models', 'llm', 'llms'],
+    'Data Science': ['data science', 'data scientist'],
+    'Data Analysis': ['data analysis', 'data analytics', 'analytics'],
+    'Statistics': ['statistics', 'statistical analysis', 'statistical modeling'],
+    'Microsoft Excel': ['microsoft excel', 'excel', 'ms excel', 'spreadsheets'],
+    'Microsoft Office': ['microsoft office', 'ms office', 'office 365', 'microsoft 365'],
+    'Power BI': ['power bi', 'powerbi'],
+    'Tableau': ['tableau'],
+    'Agile': ['agile', 'scrum', 'kanban'],
+    'Selenium': ['selenium', 'selenium webdriver'],
+    'Manual Testing': ['manual testing', 'test cases', 'test planning'],
+    'Automation Testing': ['automation testing', 'test automation', 'automated testing'],
+    'Linux': ['linux', 'unix', 'shell scripting', 'bash'],
+    'Search Engine Optimization': ['search engine optimization', 'seo'],
+    'Digital Marketing': ['digital marketing', 'social media marketing', 'content marketing'],
+    'Accounting': ['accounting', 'bookkeeping', 'accounts payable', 'accounts receivable'],
+    'Financial Analysis': ['financial analysis', 'financial modeling', 'financial modelling'],
+    'Communication': ['communication', 'communication skills', 'written communication', 'verbal communication',
+                      'communicate', 'communicating'],
+    'Teamwork': ['teamwork', 'team player', 'collaboration', 'collaborate', 'collaborative', 'cross-functional'],
+    'Leadership': ['leadership', 'lead a team', 'leading teams', 'people management', 'team management'],
+    'Stakeholder Management': ['stakeholder management', 'stakeholders', 'stakeholder'],
+    'Problem Solving': ['problem solving', 'problem-solving', 'troubleshooting', 'analytical thinking'],
+    'Customer Service': ['customer service', 'customer support', 'customer-facing', 'client service'],
+    'Sales': ['sales', 'selling', 'business development', 'lead generation'],
+    'Negotiation': ['negotiation', 'negotiating', 'negotiate'],
+    'Project Management': ['project management', 'project planning', 'program management'],
+    'Time Management': ['time management', 'prioritization', 'prioritisation', 'multitasking'],
+    'Attention to Detail': ['attention to detail', 'detail-oriented', 'detail oriented'],
+    'Adaptability': ['adaptability', 'adaptable', 'flexibility'],
+    'Presentation Skills': ['presentation skills', 'presentations', 'public speaking'],
+    'English Comprehension': ['written english', 'spoken english', 'english comprehension'],
+}
+
+# Catalog-derived candidates that are product names or filler, not skills
+NON_SKILL_TERMS = {
+    'new', 'test', 'tests', 'assessment', 'assessments', 'report', 'reports', 'solution', 'solutions',
+    'simulation', 'profile', 'interview', 'questionnaire', 'form', 'short form', 'verify', 'automata',
+    'opq', 'global skills', 'skills', 'knowledge', 'ability', 'basics', 'fundamentals', 'concepts',
+    'others', 'etc', 'general', 'other', 'advanced', 'basic', 'data', 'system', 'systems', 'design',
+    'development', 'application', 'applications', 'security', 'performance', 'deployment', 'architecture',
+    'the', 'and', 'or', 'of', 'in', 'to', 'for', 'a', 'an', 'with', 'using', 'it', 'its', 'their'
+}
+# Assessment names containing these are product names ("Verify Interactive G+"), not skills
+PRODUCT_NAME_WORDS = {
+    'verify', 'opq', 'opq32r', 'report', 'interview', 'questionnaire', 'profile', 'solution', 'solutions',
+    'scenarios', 'candidate', 'selection', 'smart', 'shl', 'global', 'universal', 'mfs', 'pjm', '360',
+    'apprentice', 'graduate', 'entry', 'sift', 'short', 'form', 'focus', 'automata', 'job', 'jobs'
+}
+# Description phrases with these words are prose, not topics ("concepts like data binding")
+PROSE_WORDS = {
+    'like', 'related', 'various', 'different', 'questions', 'following', 'such', 'how', 'basic', 'their',
+    'them', 'what', 'is', 'are', 'within', 'out', 'plus', 'this', 'these', 'which', 'who', 'can', 'will'
+}
+# Everyday words that catalog names or tool lists would otherwise turn into skills
+# ("About us", "based in the UK", "the rest of the team")
+COMMON_WORD_ALIASES = {
+    'us', 'uk', 'usa', 'eu', 'aus', 'it', 'go', 'rest', 'english', 'ts', 'containers', 'torch',
+    'names', 'null', 'essentials', 'canadian', 'european'
+}
+# Aliases this short must be written with a capital in the text ("AI", "SQL", "Git", "K8s")
+CASE_SENSITIVE_MAX_LEN = 3
+# Words removed from the end of assessment names ("Apache Kafka (New)" -> "apache kafka")
+NAME_SUFFIX_WORDS = {'new', 'test', 'assessment', 'simulation', 'report', 'solution', 'interactive', 'online'}
+
+PARENTHETICAL = re.compile(r"\(([^)]*)\)")
+VERSION_SUFFIX = re.compile(r"\s+v?\d+(?:\.\d+)*[a-z]?$")
+NAME_SEPARATORS = re.compile(r"\s+-\s+|:|\s+with\s+|\s+/\s+|,")
+# Topic lists in catalog descriptions: "knowledge of A, B and C", "topics: A, B, C."
+TOPIC_LIST = re.compile(r"(?:knowledge of|topics:|such as|including)\s+([^.;]+)", re.IGNORECASE)
+LIST_SEPARATORS = re.compile(r",|\band\b|&|\bor\b")
+ACRONYM = re.compile(r"^[A-Za-z][A-Za-z0-9+#.]{1,7}$")
+
+MAX_TERM_WORDS = 4
+# Characters that continue a term on the left / right (c++, .net, node.js)
+LEFT_WORD_CHARS = set(".+#")
+RIGHT_WORD_CHARS = set("+#")
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(str(text or "").lower().split())
+
+
+def clean_term(term: str) -> str:
+    term = normalize_text(term).strip(" \"'`*-–—")
+    term = term.rstrip(".")
+    if term.startswith("the "):
+        term = term[4:]
+    return term
+
+
+def is_skill_term(term: str) -> bool:
+    if len(term) < 2 or len(term) > 40 or term in NON_SKILL_TERMS:
+        return False
+    words = term.split()
+    if len(words) > MAX_TERM_WORDS or not any(ch.isalpha() for ch in term):
+        return False
+    return not all(word in NON_SKILL_TERMS for word in words)
+
+
+def is_abbreviation(acronym: str, display: str) -> bool:
+    """True when acronym abbreviates display ("DSI" for "Dependability and Safety Instrument")"""
+    acronym = acronym.lower()
+    letters = "".join(ch for ch in display.lower() if ch.isalnum())
+    if not letters or acronym[0] != letters[0]:
+        return False
+    position = 0
+    for ch in acronym:
+        position = letters.find(ch, position) + 1
+        if not position:
+            return False
+    return True
+
+
+def name_terms(name: str) -> List[Tuple[str, str]]:
+    """(alias, display) pairs from one assessment name"""
+    pairs = []
+    acronyms = [a.strip() for a in PARENTHETICAL.findall(name) if ACRONYM.match(a.strip())]
+    name = PARENTHETICAL.sub(" ", name)
+    if any(word in PRODUCT_NAME_WORDS for word in re.findall(r"[\w+]+", name.lower())):
+        return pairs
+
+    for segment in NAME_SEPARATORS.split(name):
+        display = " ".join(segment.split())
+        while True:
+            stripped = VERSION_SUFFIX.sub("", display)
+            words = stripped.split()
+            if words and words[-1].lower() in NAME_SUFFIX_WORDS:
+                stripped = " ".join(words[:-1])
+            if stripped == display:
+                break
+            display = stripped
+        term = clean_term(display)
+        if is_skill_term(term):
+            pairs.append((term, display))
+            for acronym in acronyms:
+                # "(US)", "(R1)" and "(Adaptive)" are editions, not abbreviations of the name
+                if acronym.lower() not in NON_SKILL_TERMS and is_abbreviation(acronym, display):
+                    pairs.append((acronym.lower(), display))
+    return pairs
+
+
+def description_terms(description: str) -> List[Tuple[str, str]]:
+    """(alias, display) pairs from the topic lists of one catalog description"""
+    pairs = []
+    for match in TOPIC_LIST.finditer(description or ""):
+        for item in LIST_SEPARATORS.split(match.group(1)):
+            display = " ".join(item.split()).strip(" .")
+            if display.lower().startswith("the "):
+                display = display[4:]
+            term = clean_term(display)
+            words = term.split()
+            if not is_skill_term(term) or len(words) > 3 or any(word in PROSE_WORDS for word in words):
+                continue
+            # A lone plain word ("components", "Tasks") is too generic to be a skill;
+            # keep acronyms and tool-like spellings (DAX, jQuery, MySQL, C++)
+            if len(words) == 1 and display.isalpha() and (display.islower() or display.istitle()):
+                continue
+            pairs.append((term, display))
+    return pairs
+
+
+def catalog_aliases(metadatas: List[Dict]) -> Dict[str, str]:
+    """
+    alias -> canonical display name. Curated synonyms win over catalog terms,
+    and an earlier catalog term wins over a later one.
+    """
+    aliases: Dict[str, str] = {}
+    for meta in metadatas:
+        for alias, display in name_terms(str(meta.get('assessment_name') or "")):
+            aliases.setdefault(alias, display)
+        for alias, display in description_terms(str(meta.get('description') or "")):
+            aliases.setdefault(alias, display)
+
+    for term in TOOL_TERMS:
+        aliases.setdefault(term, term)
+    for canonical, synonyms in SKILL_SYNONYMS.items():
+        for alias in synonyms + [canonical]:
+            aliases[clean_term(alias)] = canonical
+    return aliases
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: one pass over the text finds every occurrence of
+    every pattern, independent of the number of patterns.
+    """
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = patterns
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[int]] = [[]]
+
+        for index, pattern in enumerate(patterns):
+            state = 0
+            for ch in pattern:
+                next_state = self.goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][ch] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = next_state
+            self.output[state].append(index)
+
+        # Breadth-first: a state's failure link points to its longest proper suffix in the trie
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(ch, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def iter(self, text: str) -> Iterator[Tuple[int, int]]:
+        """(end position, pattern index) for every match, end exclusive"""
+        state = 0
+        goto, fail, output = self.goto, self.fail, self.output
+        for position, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index in output[state]:
+                yield position + 1, index
+
+
+class SkillGazetteer:
+    """Catalog + curated skill vocabulary compiled into one Aho-Corasick automaton"""
+
+    def __init__(self, aliases: Dict[str, str]):
+        # Filtered here as well so gazetteers saved before a stop-list change stay clean
+        self.aliases = {alias: canonical for alias, canonical in aliases.items()
+                        if alias not in COMMON_WORD_ALIASES}
+        self.terms = sorted(self.aliases)
+        self.automaton = AhoCorasick(self.terms)
+
+    @classmethod
+    def from_catalog(cls, metadatas: List[Dict]) -> "SkillGazetteer":
+        return cls(catalog_aliases(metadatas))
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.aliases, f, ensure_ascii=False, indent=0, sort_keys=True)
+
+    @classmethod
+    def load(cls, path: str) -> "SkillGazetteer":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def matches(self, text: str) -> List[Tuple[int, int, str]]:
+        """Non-overlapping (start, end, canonical) matches, longest first at each position"""
+        original = " ".join(str(text or "").split())
+        text = original.lower()
+        if len(original) != len(text):
+            # Lowercasing changed offsets (rare unicode); skip the case check
+            original = text.upper()
+        found = []
+        for end, index in self.automaton.iter(text):
+            term = self.terms[index]
+            start = end - len(term)
+            before = text[start - 1] if start > 0 else " "
+            after = text[end] if end < len(text) else " "
+            if before.isalnum() or before == "_" or before in LEFT_WORD_CHARS:
+                continue
+            if after.isalnum() or after == "_" or after in RIGHT_WORD_CHARS:
+                continue
+            if len(term) <= CASE_SENSITIVE_MAX_LEN and original[start:end] == term:
+                continue
+            found.append((start, end, self.aliases[term]))
+
+        found.sort(key=lambda m: (m[0], m[0] - m[1]))
+        kept = []
+        covered_until = 0
+        for start, end, canonical in found:
+            if start >= covered_until:
+                kept.append((start, end, canonical))
+                covered_until = end
+        return kept
+
+    def extract(self, text: str, top_k: int = 20) -> List[str]:
+        """Skills mentioned in text, most frequent first (ties: first mention first)"""
+        counts: Dict[str, int] = {}
+        first_seen: Dict[str, int] = {}
+        for start, _, canonical in self.matches(text):
+            counts[canonical] = counts.get(canonical, 0) + 1
+            first_seen.setdefault(canonical, start)
+        ranked = sorted(counts, key=lambda skill: (-counts[skill], first_seen[skill]))
+        return ranked[:top_k]
+
+
+def write_skill_gazetteer(metadatas: List[Dict], artifact_dir: str = ARTIFACT_DIR) -> SkillGazetteer:
+    os.makedirs(artifact_dir, exist_ok=True)
+    gazetteer = SkillGazetteer.from_catalog(metadatas)
+    gazetteer.save(os.path.join(artifact_dir, SKILL_GAZETTEER_FILE))
+    return gazetteer
+
+
+def load_skill_gazetteer(artifact_dir: str = ARTIFACT_DIR) -> SkillGazetteer:
+    """Saved gazetteer, else one built from the catalog CSV, else curated terms only"""
+    path = os.path.join(artifact_dir, SKILL_GAZETTEER_FILE)
+    if os.path.exists(path):
+        return SkillGazetteer.load(path)
+
+    metadatas: List[Dict] = []
+    if os.path.exists(SKILL_CATALOG_CSV):
+        import pandas as pd
+        df = pd.read_csv(SKILL_CATALOG_CSV)
+        df.columns = [c.strip().lower().replace(" ", "_") for c in df.columns]
+        metadatas = df.astype(object).where(df.notna(), "").to_dict(orient="records")
+    else:
+        print(f" No {SKILL_GAZETTEER_FILE} or catalog CSV found; skill gazetteer uses curated terms only")
+    return SkillGazetteer.from_catalog(metadatas)
+
+
+_gazetteer: Optional[SkillGazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_skill_gazetteer() -> SkillGazetteer:
+    """Return the process-wide skill gazetteer"""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = load_skill_gazetteer()
+    return _gazetteer
@@ -0,0 +1,54 @@
+import pytest
+
+from query_analyzer import LocalQueryAnalyzer, merge_parsed_constraints, parse_duration, search_text
+
+
+@pytest.mark.parametrize("query, minutes", [
+    ("Need a test under 40 minutes", 40),
+    ("assessment of 1-2 hours", 120),
+    ("30 to 45 mins max", 45),
+    ("about 2 hrs", 120),
+    ("1.5 hours", 90),
+    ("half an hour", 30),
+    ("an hour long", 60),
+    ("1 hour and 30 minutes", 90),
+    ("1 hr, 15 min", 75),
+    ("1h 30m", 90),
+    ("1h30m", 90),
+])
+def test_parse_duration(query, minutes):
+    assert parse_duration(query) == minutes
+
+
+@pytest.mark.parametrize("query", [
+    "Need a min of 3 years experience in Java",
+    "a minimum of 2 years in sales",
+    "Python 3 minimum",
+    "platform with 5m users",
+    "Java developer",
+])
+def test_parse_duration_ignores_non_durations(query):
+    assert parse_duration(query) is None
+
+
+def test_parsed_duration_does_not_override_llm_gaps_with_noise():
+    analysis = {'job_level': None, 'duration_max': None}
+    local = LocalQueryAnalyzer(use_embeddings=False).analyze("Need a min of 3 years experience in Java")
+    assert merge_parsed_constraints(analysis, local)['duration_max'] is None
+
+
+def test_search_text_drops_duration_and_level():
+    assert search_text("Senior Java Developer with Spring Boot and Kafka microservices, 40 minutes") == \
+        "Java Developer with Spring Boot and Kafka microservices"
+    assert search_text("Java developer, test within 40 mins") == "Java developer, test"
+
+
+def test_local_analysis_searches_with_query_words():
+    analysis = LocalQueryAnalyzer(use_embeddings=False).analyze(
+        "Senior Java Developer with Spring Boot and Kafka microservices, 40 minutes"
+    )
+    assert analysis['primary_focus'] == 'TECHNICAL'
+    assert analysis['job_level'] == 'Senior'
+    assert analysis['duration_max'] == 40
+    assert "Spring Boot" in analysis['technical_skills']
+    assert "Kafka microservices" in analysis['technical_skills']
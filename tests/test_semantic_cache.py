@@ -0,0 +1,23 @@
+import numpy as np
+
+from semantic_cache import SemanticCache
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_named_tools_are_hard_constraints():
+    cache = SemanticCache(threshold=0.95, max_entries=8)
+    cache.store("Senior Java developer, 40 min", unit(1, 0, 0), "v1", {'technical_skills': 'java'})
+    assert cache.lookup("Senior Python developer, 40 min", unit(1, 0, 0), "v1") is None
+    assert cache.lookup("Senior Java developer , 40 min", unit(1, 0, 0), "v1")['analysis'] == {'technical_skills': 'java'}
+
+
+def test_lookup_tries_every_entry_above_threshold():
+    cache = SemanticCache(threshold=0.95, max_entries=8)
+    cache.store("Java developer, 30 min", unit(1, 0, 0), "v1", {'technical_skills': 'java 30'})
+    cache.store("Java developer, 40 min", unit(1, 0.2, 0), "v1", {'technical_skills': 'java 40'})
+    hit = cache.lookup("Java dev, 40 min", unit(1, 0.01, 0), "v1")
+    assert hit['query'] == "Java developer, 40 min"
@@ -0,0 +1,19 @@
+from skill_gazetteer import SkillGazetteer, name_terms
+
+
+def test_common_words_are_not_skills():
+    gazetteer = SkillGazetteer.from_catalog([{'assessment_name': "Reviewing Forms - US (R1)"}])
+    text = "About us: join us in the UK. You will support the rest of the team, in English."
+    assert gazetteer.extract(text) == []
+
+
+def test_short_acronyms_need_a_capital():
+    gazetteer = SkillGazetteer.from_catalog([])
+    assert gazetteer.extract("Git, SQL and AWS; some ML") == ['Git', 'SQL', 'Amazon Web Services', 'Machine Learning']
+    assert gazetteer.extract("we aim to sql the aws") == []
+
+
+def test_name_parentheticals_must_abbreviate_the_name():
+    assert ('dsi', 'Dependability and Safety Instrument') in \
+        name_terms("Dependability and Safety Instrument (DSI)")
+    assert [alias for alias, _ in name_terms("Business Communication (adaptive)")] == ['business communication']
@@ -0,0 +1,67 @@
+import os
+from typing import Iterable, List
+
+from html_extract import visible_text_lines
+from rate_limiter import estimate_tokens
+
+# Input budgets (estimated tokens) for the job-URL prompts
+JOB_DATA_TOKEN_BUDGET = int(os.getenv("JOB_DATA_TOKEN_BUDGET", 1500))
+SKILLS_TOKEN_BUDGET = int(os.getenv("SKILLS_TOKEN_BUDGET", 1200))
+
+# estimate_tokens counts ~4 characters per token
+CHARS_PER_TOKEN = 4
+
+
+def dedupe_lines(lines: Iterable[str]) -> List[str]:
+    """Drop repeated lines (case-insensitive) and lines without any letter or digit"""
+    seen = set()
+    kept = []
+    for line in lines:
+        line = " ".join(line.split())
+        key = line.casefold()
+        if not line or key in seen or not any(ch.isalnum() for ch in line):
+            continue
+        seen.add(key)
+        kept.append(line)
+    return kept
+
+
+def fit_token_budget(lines: List[str], max_tokens: int) -> str:
+    """Join lines until max_tokens; the last line that does not fit is cut at a word boundary"""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    kept = []
+    used = 0
+    for line in lines:
+        cost = len(line) + (1 if kept else 0)
+        if used + cost <= max_chars:
+            kept.append(line)
+            used += cost
+            continue
+        room = max_chars - used - (1 if kept else 0)
+        cut = line[:room].rsplit(" ", 1)[0] if room > 0 else ""
+        if cut:
+            kept.append(cut)
+        break
+    return "\n".join(kept)
+
+
+def log_token_savings(label: str, raw_text: str, reduced_text: str):
+    raw_tokens = estimate_tokens(raw_text) if raw_text else 0
+    reduced_tokens = estimate_tokens(reduced_text) if reduced_text else 0
+    print(f" Token budget [{label}]: {raw_tokens} -> {reduced_tokens} tokens "
+          f"(saved {raw_tokens - reduced_tokens})")
+
+
+def budget_html(html: str, max_tokens: int = JOB_DATA_TOKEN_BUDGET, label: str = "job_data") -> str:
+    """Compact visible text of a page, deduplicated and cut to max_tokens"""
+    text = fit_token_budget(dedupe_lines(visible_text_lines(html)), max_tokens)
+    log_token_savings(label, html, text)
+    return text
+
+
+def budget_text(text: str, max_tokens: int = SKILLS_TOKEN_BUDGET, label: str = "skills") -> str:
+    """Same reduction for text that is already plain (e.g. an extracted description)"""
+    text = text or ""
+    reduced = fit_token_budget(dedupe_lines(text.splitlines()), max_tokens)
+    log_token_savings(label, text, reduced)
+    return reduced
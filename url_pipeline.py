@@ -0,0 +1,181 @@
+"""
+Multi-URL recommendation pipeline: fetch -> analyze -> search as concurrent
+stages connected by bounded queues, so one posting is being fetched while
+another is analyzed and a third is searched.
+
+    python url_pipeline.py URL [URL ...]
+    python url_pipeline.py --file urls.txt [--output results.csv]
+"""
+import os
+import sys
+import csv
+import asyncio
+import argparse
+from collections import defaultdict
+from typing import AsyncIterator, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from async_pipeline import FETCH_CONCURRENCY, SEARCH_CONCURRENCY, aclose_http_client, run_blocking
+from job_fetcher import canonicalize_url
+from job_rag_new import (
+    URL_ANALYSIS_MODE,
+    analyze_job_posting_async,
+    fetch_job_description_async,
+    posting_text
+)
+from rag_core import get_recommendations_async
+from retrieval_engine import RetrievalEngine, get_engine
+
+# Simultaneous fetches per host (LinkedIn, a careers site, ...)
+PER_DOMAIN_FETCH_LIMIT = int(os.getenv("PER_DOMAIN_FETCH_LIMIT", 2))
+# Items waiting between two stages; a full queue makes the earlier stage wait
+URL_PIPELINE_QUEUE_SIZE = int(os.getenv("URL_PIPELINE_QUEUE_SIZE", 8))
+URL_ANALYSIS_WORKERS = int(os.getenv("URL_ANALYSIS_WORKERS", 8))
+# Postings shorter than this are login walls or error pages
+MIN_POSTING_CHARS = 50
+
+
+class DomainLimiter:
+    """One semaphore per host; created inside the running event loop"""
+
+    def __init__(self, limit: int = PER_DOMAIN_FETCH_LIMIT):
+        self._slots: Dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(limit))
+
+    def slot(self, url: str) -> asyncio.Semaphore:
+        return self._slots[urlsplit(canonicalize_url(url)).netloc]
+
+
+async def fetch_stage(inbox: asyncio.Queue, outbox: asyncio.Queue, results: asyncio.Queue, limiter: DomainLimiter):
+    while True:
+        item = await inbox.get()
+        try:
+            async with limiter.slot(item['url']):
+                job_data = await fetch_job_description_async(item['url'], llm_fallback=URL_ANALYSIS_MODE == "sequential")
+            if len(posting_text(job_data)) < MIN_POSTING_CHARS:
+                raise RuntimeError("Could not extract sufficient text from URL.")
+            item['job_data'] = job_data
+            await outbox.put(item)
+        except Exception as e:
+            await results.put({**item, 'error': str(e)})
+
+
+async def analyze_stage(inbox: asyncio.Queue, outbox: asyncio.Queue, results: asyncio.Queue,
+                        engine: Optional[RetrievalEngine]):
+    while True:
+        item = await inbox.get()
+        try:
+            item['job_analysis'] = await analyze_job_posting_async(item['job_data'], top_k=20, engine=engine)
+            await outbox.put(item)
+        except Exception as e:
+            await results.put({**item, 'error': str(e)})
+
+
+async def search_stage(inbox: asyncio.Queue, results: asyncio.Queue, engine: Optional[RetrievalEngine]):
+    while True:
+        item = await inbox.get()
+        job_analysis = item['job_analysis']
+        try:
+            response = await get_recommendations_async(
+                job_analysis['skills_query'], engine=engine, query_analysis=job_analysis['query_analysis']
+            )
+        except Exception as e:
+            response = {'status': 'error', 'error_message': str(e)}
+        if response['status'] == 'error':
+            await results.put({**item, 'error': response.get('error_message')})
+        else:
+            await results.put({**item, 'recommendations': response.get('recommendations', [])})
+
+
+def pipeline_result(item: Dict) -> Dict:
+    """Public shape of one finished URL"""
+    job_analysis = item.get('job_analysis') or {}
+    result = {
+        'index': item['index'],
+        'url': item['url'],
+        'title': job_analysis.get('title') or (item.get('job_data') or {}).get('title'),
+        'skills_query': job_analysis.get('skills_query'),
+        'recommendations': item.get('recommendations', []),
+        'status': 'error' if item.get('error') else 'success'
+    }
+    if item.get('error'):
+        result['error_message'] = item['error']
+    return result
+
+
+async def run_url_pipeline(urls: List[str], engine: Optional[RetrievalEngine] = None) -> AsyncIterator[Dict]:
+    """
+    Yield one result per URL as soon as it finishes (completion order; 'index'
+    is the position in urls). Stops all stages when the consumer goes away.
+    """
+    limiter = DomainLimiter()
+    fetch_queue: asyncio.Queue = asyncio.Queue(maxsize=URL_PIPELINE_QUEUE_SIZE)
+    analyze_queue: asyncio.Queue = asyncio.Queue(maxsize=URL_PIPELINE_QUEUE_SIZE)
+    search_queue: asyncio.Queue = asyncio.Queue(maxsize=URL_PIPELINE_QUEUE_SIZE)
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def feed():
+        for index, url in enumerate(urls):
+            await fetch_queue.put({'index': index, 'url': url})
+
+    tasks = [asyncio.create_task(feed())]
+    tasks += [asyncio.create_task(fetch_stage(fetch_queue, analyze_queue, results, limiter))
+              for _ in range(FETCH_CONCURRENCY)]
+    tasks += [asyncio.create_task(analyze_stage(analyze_queue, search_queue, results, engine))
+              for _ in range(URL_ANALYSIS_WORKERS)]
+    tasks += [asyncio.create_task(search_stage(search_queue, results, engine))
+              for _ in range(SEARCH_CONCURRENCY)]
+    try:
+        for _ in range(len(urls)):
+            yield pipeline_result(await results.get())
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def process_job_urls(urls: List[str], output_file: str) -> int:
+    """CLI counterpart of job_rag_new.process_job_url for many URLs; returns the number of failures"""
+    engine = await run_blocking(get_engine)
+    failures = 0
+    try:
+        with open(output_file, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Source_URL", "Assessment_url"])
+            async for result in run_url_pipeline(urls, engine):
+                if result['status'] == 'success' and result['recommendations']:
+                    for rec in result['recommendations']:
+                        writer.writerow([result['url'], rec.get("url", "N/A")])
+                    print(f"[{result['index'] + 1}/{len(urls)}] {result['title']}: "
+                          f"{len(result['recommendations'])} assessments")
+                else:
+                    failures += 1
+                    writer.writerow([result['url'], f"Error: {result.get('error_message', 'No results')}"])
+                    print(f"[{result['index'] + 1}/{len(urls)}] failed: {result['url']} "
+                          f"({result.get('error_message', 'No results')})")
+                f.flush()
+    finally:
+        await aclose_http_client()
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Recommend assessments for many job posting URLs")
+    parser.add_argument("urls", nargs="*", help="job posting URLs")
+    parser.add_argument("--file", help="text file with one URL per line")
+    parser.add_argument("--output", default=os.path.join("output", "url_batch_results.csv"))
+    args = parser.parse_args()
+
+    urls = list(args.urls)
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            urls += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if not urls:
+        parser.error("no URLs given")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    failures = asyncio.run(process_job_urls(urls, args.output))
+    print(f"\nResults for {len(urls)} URLs ({failures} failed) saved to: {args.output}")
+    return 1 if failures == len(urls) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())